@@ -0,0 +1,90 @@
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+from datetime import datetime, timezone
+from typing import Optional
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; keyword fields passed via extra={"fields": {...}}"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "msg": record.getMessage()
+        }
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    Like QueueHandler, but leaves formatting to the writer thread: the stock
+    prepare() folds the traceback into the message, which breaks JSON output.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            # Send the text; a traceback object would keep frames alive in the queue
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(f"app.{name}")
+
+
+def log_event(logger: logging.Logger, level: int, msg: str, **fields):
+    """Log msg with structured fields"""
+    if logger.isEnabledFor(level):
+        logger.log(level, msg, extra={"fields": fields})
+
+
+def setup_logging():
+    """
+    Route the app's loggers through a queue: request handlers only enqueue
+    records, and a background thread formats and writes them, so logging
+    never blocks the event loop on a slow stdout/stderr.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    stream = logging.StreamHandler(sys.stdout)
+    if os.getenv("LOG_FORMAT", "json").lower() == "json":
+        stream.setFormatter(JsonFormatter())
+    else:
+        stream.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(records, stream, respect_handler_level=True)
+    _listener.start()
+
+    logger = logging.getLogger("app")
+    logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    logger.handlers = [_QueueHandler(records)]
+    logger.propagate = False
+
+
+def shutdown_logging():
+    """Flush queued records and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -1,7 +1,8 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, Response
+from contextlib import asynccontextmanager
 import os
 from pathlib import Path
 from dotenv import load_dotenv
@@ -9,13 +10,73 @@ from dotenv import load_dotenv
 # Load environment variables before importing routers that might use them
 load_dotenv()
 
+from app.logging_config import setup_logging, shutdown_logging
 from app.routers import chat
 from app.routers import auth
+from app.services.http_client import http_pool
+from app.services.image_preprocess import image_preprocessor
+from app.services.document_normalize import document_normalizer
+from app.services.ingestion_queue import ingestion_queue
+from app.services.openai_service import openai_service
+from app.services.session_service import session_service
+from app.services.session_vector_stores import session_vector_stores
+from app.services.upload_index import upload_index
+from app.services.search_index import search_index
+from app.services.auth_service import auth_service
+from app.services.warmup import warmup
+from app.services.thread_pool import thread_pool
+from app.services.resilience import openai_resilience, CLOSED
+from app.services.admission import run_admission, upload_admission, chat_rate_limiter, upload_rate_limiter
+from app.services.metrics import registry, Registry
+
+# Scrape-time gauges for state that already lives on the services
+registry.gauge("admission_runs_in_flight", "Admitted assistant runs", function=lambda: run_admission.in_flight)
+registry.gauge("admission_runs_queued", "Chat requests waiting for a run slot", function=lambda: run_admission.queued)
+registry.gauge("admission_uploads_in_flight", "Admitted uploads", function=lambda: upload_admission.in_flight)
+registry.gauge("admission_uploads_queued", "Uploads waiting for a slot", function=lambda: upload_admission.queued)
+registry.gauge("ingestion_queue_depth", "Files waiting for vector store ingestion",
+               function=lambda: ingestion_queue.stats()["queue_depth"])
+registry.gauge("openai_circuit_open", "1 while the OpenAI circuit breaker rejects calls",
+               function=lambda: 0 if openai_resilience.breaker.state == CLOSED else 1)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Log records are written by a background thread, off the event loop
+    setup_logging()
+    # Build the service singletons once, before serving; missing
+    # configuration fails startup here rather than at import
+    for provider in (openai_service, session_service, upload_index, search_index, auth_service):
+        provider.resolve()
+    # One keep-alive connection pool for every outbound call
+    http_pool.start()
+    # Pre-create threads so new sessions skip the threads.create round trip
+    thread_pool.start()
+    # Delete session vector stores (and their files) once they go unused
+    session_vector_stores.start()
+    # Share this worker's metrics with the others (production profile)
+    registry.start()
+    # Optional: validate the assistant and vector store, prefill caches
+    warmup.start()
+    yield
+    await warmup.close()
+    await session_vector_stores.close()
+    # uvicorn has already waited for in-flight requests (chat runs) to finish;
+    # give background indexing the same budget before cancelling it
+    await ingestion_queue.drain(timeout=float(os.getenv("GRACEFUL_SHUTDOWN_TIMEOUT", 90)))
+    await ingestion_queue.close()
+    session_service.flush()
+    image_preprocessor.close()
+    document_normalizer.close()
+    await thread_pool.close()
+    await http_pool.close()
+    await registry.close()
+    shutdown_logging()
 
 app = FastAPI(
     title="QA Learning Platform Chat API",
     description="Chat API using OpenAI Assistants for document-based Q&A",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -47,6 +108,40 @@ app.include_router(auth.router, prefix="/api/v1", tags=["auth"])
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/metrics")
+async def metrics():
+    """
+    Prometheus metrics: per-stage latency histograms, OpenAI calls, queues.
+    With several workers the totals cover all of them (gauges per worker).
+    """
+    return Response(registry.render(), media_type=Registry.CONTENT_TYPE)
+
+@app.get("/health/ready")
+async def readiness():
+    """200 once startup (and the optional warm-up) has finished, 503 until then"""
+    stats = warmup.stats()
+    return JSONResponse(stats, status_code=200 if stats["ready"] else 503)
+
+@app.get("/health/http-pool")
+async def http_pool_stats():
+    """Outbound connection pool statistics"""
+    return http_pool.stats()
+
+@app.get("/health/openai")
+async def openai_health():
+    """Circuit breaker state, retries and hedged requests for OpenAI calls"""
+    return openai_resilience.stats()
+
+@app.get("/health/admission")
+async def admission_stats():
+    """Concurrency limits, queue depth, wait times and rate limiting"""
+    return {
+        "runs": run_admission.stats(),
+        "uploads": upload_admission.stats(),
+        "chat_rate_limit": chat_rate_limiter.stats(),
+        "upload_rate_limit": upload_rate_limiter.stats()
+    }
+
 # Serve frontend static files in production
 DIST_DIR = Path(__file__).parent.parent.parent / "dist"
 if DIST_DIR.exists():
@@ -1,19 +1,41 @@
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 
+class Citation(BaseModel):
+    file_id: str
+    filename: Optional[str] = None
+    quote: Optional[str] = None
+    start_index: int  # Span of the marker in the message content
+    end_index: int
+    marker: str  # e.g. 【4:9†book310453.pdf】
+
 class Message(BaseModel):
     role: str  # "user" or "assistant"
     content: str
     timestamp: Optional[datetime] = None
+    citations: Optional[List[Citation]] = None  # Sources cited in content (assistant messages)
 
 class ChatSession(BaseModel):
     id: str
-    thread_id: str
+    thread_id: Optional[str] = None  # None until needed, for sessions answered from the cache
+    user_id: Optional[str] = None  # Google user id of the owner, if logged in
+    thread_cursor: Optional[str] = None  # Newest OpenAI thread message already in messages
+    # Messages ({"role", "content"}) to post to the thread before its next
+    # run: a cached exchange that was answered without one
+    thread_seed: Optional[List[Dict[str, str]]] = None
     messages: List[Message] = []
     created_at: datetime
     updated_at: datetime
 
+class SessionSummary(BaseModel):
+    id: str
+    thread_id: Optional[str] = None
+    title: Optional[str] = None  # First user message
+    message_count: int
+    created_at: datetime
+    updated_at: datetime
+
 class SendMessageRequest(BaseModel):
     message: str
     session_id: Optional[str] = None  # If None, create new session
@@ -1,10 +1,10 @@
 from fastapi import APIRouter, Request, Response, Depends
 from fastapi.responses import RedirectResponse, JSONResponse
 import os
-import httpx
 import urllib.parse
 from dotenv import load_dotenv
 from app.services.auth_service import auth_service
+from app.services.http_client import http_pool
 
 load_dotenv()
 
@@ -60,22 +60,22 @@ async def google_callback(request: Request, response: Response):
         'grant_type': 'authorization_code'
     }
 
-    async with httpx.AsyncClient() as client:
-        token_resp = await client.post(token_url, data=data, headers={'Accept': 'application/json'})
-        if token_resp.status_code != 200:
-            return JSONResponse({'error': 'Failed to fetch token', 'details': token_resp.text}, status_code=500)
-        token_data = token_resp.json()
+    client = http_pool.client
+    token_resp = await client.post(token_url, data=data, headers={'Accept': 'application/json'})
+    if token_resp.status_code != 200:
+        return JSONResponse({'error': 'Failed to fetch token', 'details': token_resp.text}, status_code=500)
+    token_data = token_resp.json()
 
-        access_token = token_data.get('access_token')
-        if not access_token:
-            return JSONResponse({'error': 'No access token in response'}, status_code=500)
+    access_token = token_data.get('access_token')
+    if not access_token:
+        return JSONResponse({'error': 'No access token in response'}, status_code=500)
 
-        # Fetch user info
-        userinfo_url = 'https://www.googleapis.com/oauth2/v2/userinfo'
-        user_resp = await client.get(userinfo_url, headers={'Authorization': f'Bearer {access_token}'})
-        if user_resp.status_code != 200:
-            return JSONResponse({'error': 'Failed to fetch user info', 'details': user_resp.text}, status_code=500)
-        user_info = user_resp.json()
+    # Fetch user info
+    userinfo_url = 'https://www.googleapis.com/oauth2/v2/userinfo'
+    user_resp = await client.get(userinfo_url, headers={'Authorization': f'Bearer {access_token}'})
+    if user_resp.status_code != 200:
+        return JSONResponse({'error': 'Failed to fetch user info', 'details': user_resp.text}, status_code=500)
+    user_info = user_resp.json()
 
     # Create a local session and store user info
     session_id = auth_service.create_user_session({
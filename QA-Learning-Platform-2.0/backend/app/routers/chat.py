@@ -1,6 +1,15 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks, UploadFile, File
-from typing import List
+from fastapi import APIRouter, HTTPException, BackgroundTasks, UploadFile, File, Request, Query
+from fastapi.responses import StreamingResponse, Response
+from fastapi.encoders import jsonable_encoder
+from starlette.background import BackgroundTask
+from typing import List, Optional, Tuple
 from datetime import datetime
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from app.logging_config import get_logger, log_event
 from app.models.chat import (
     SendMessageRequest,
     SendMessageResponse,
@@ -10,15 +19,75 @@ from app.models.chat import (
     ChatSession
 )
 from app.services.session_service import session_service
-from app.services.openai_service import OpenAIService
+from app.services.thread_pool import thread_pool
+from app.services.resilience import CircuitOpen
+from app.services.admission import (
+    Overloaded,
+    run_admission,
+    upload_admission,
+    chat_rate_limiter,
+    upload_rate_limiter
+)
+from app.services.auth_service import auth_service
+from app.routers.auth import SESSION_COOKIE_NAME
+from app.services.openai_service import openai_service
+from app.services.upload_index import upload_index
+from app.services.ingestion_queue import ingestion_queue, FAILED
+from app.services.session_vector_stores import session_vector_stores
+from app.services.upload_stream import scan_upload, UploadRejected
+from app.services.image_preprocess import image_preprocessor
+from app.services.document_normalize import document_normalizer
+from app.services.suggestion_cache import suggestion_cache, FALLBACK_SUGGESTIONS
+from app.services.answer_cache import answer_cache
+from app.services.file_metadata import file_metadata, resolve_citations
+from app.services.search_index import search_index, extract_text, is_indexable
+from app.services.metrics import chat_stage_seconds, upload_stage_seconds
 
 router = APIRouter()
-openai_service = OpenAIService()
+logger = get_logger("chat")
+
+# Background tasks adding uploads to the local search index
+_search_indexing = set()
+# Background tasks recording the cursor of threads created with the first message in them
+_initial_cursors = set()
+
+def _current_user_id(request: Request) -> Optional[str]:
+    """Google user id of the logged-in user, from the auth session cookie"""
+    auth_session_id = request.cookies.get(SESSION_COOKIE_NAME)
+    if not auth_session_id:
+        return None
+    user = auth_service.get_user_by_session(auth_session_id)
+    return user.get("id") if user else None
+
+def _client_key(request: Request) -> str:
+    """Rate limit key: the auth session cookie, else the client address"""
+    auth_session_id = request.cookies.get(SESSION_COOKIE_NAME)
+    if auth_session_id:
+        return f"session:{auth_session_id}"
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+def _too_many_requests(e: Overloaded) -> HTTPException:
+    return HTTPException(status_code=429, detail=e.detail, headers={"Retry-After": str(e.retry_after)})
+
+def _upstream_unavailable(e: CircuitOpen) -> HTTPException:
+    """OpenAI is failing; answer at once instead of waiting for another timeout"""
+    return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+def _etag_response(request: Request, payload: dict) -> Response:
+    """JSON response with an ETag; returns 304 if the client already has it"""
+    body = json.dumps(jsonable_encoder(payload), ensure_ascii=False, separators=(",", ":"))
+    etag = '"' + hashlib.sha256(body.encode()).hexdigest()[:32] + '"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 @router.post("/sessions", response_model=CreateSessionResponse)
-async def create_session():
+async def create_session(http_request: Request):
     """Create a new chat session"""
-    session = session_service.create_session()
+    session = await session_service.create_session(user_id=_current_user_id(http_request))
     return CreateSessionResponse(
         session_id=session.id,
         thread_id=session.thread_id
@@ -26,30 +95,26 @@ async def create_session():
 
 @router.post("/chat/initialize")
 async def initialize_chat():
-    """Generate initial suggestions for the chat interface"""
+    """Return initial suggestions for the chat interface (cached server-side)"""
     try:
-        thread_id, suggestions = openai_service.generate_initial_suggestions()
-        return {
-            "thread_id": thread_id,
-            "suggestions": suggestions
-        }
+        suggestions = await suggestion_cache.get(
+            (openai_service.assistant_id, openai_service.vector_store_id),
+            openai_service.generate_initial_suggestions
+        )
     except Exception as e:
-        print(f"Error in initialize: {str(e)}")
-        # Fallback suggestions
-        return {
-            "thread_id": None,
-            "suggestions": [
-                "นิยามการประมวลผลภาพ และความสำคัญของมัน",
-                "Unitary และ Fourier transform ต่างกันอย่างไร",
-                "จะคำนวณสถิติภาพได้อย่างไร",
-                "Sharpen Filters ใช้เพื่ออะไร"
-            ]
-        }
+        log_event(logger, logging.WARNING, "initial suggestions failed", error=str(e))
+        suggestions = None
+
+    return {
+        # Suggestions are shared across visitors, so there is no per-visitor thread
+        "thread_id": None,
+        "suggestions": suggestions or FALLBACK_SUGGESTIONS
+    }
 
 @router.delete("/sessions/{session_id}", response_model=DeleteSessionResponse)
 async def delete_session(session_id: str):
     """Delete a chat session and its thread"""
-    deleted = session_service.delete_session(session_id)
+    deleted = await session_service.delete_session(session_id)
     if not deleted:
         raise HTTPException(status_code=404, detail="Session not found")
 
@@ -58,91 +123,412 @@ async def delete_session(session_id: str):
         deleted=deleted
     )
 
+def _extract_and_index(file_id: str, filename: Optional[str], content: bytes, parse_as: Optional[str]):
+    # Runs on a worker thread: decoding, HTML/JSON parsing and indexing are all CPU-bound
+    text = extract_text(content, parse_as or filename)
+    if text:
+        search_index.add_file(file_id, filename, text)
+
+async def _index_for_search(file_id: str, filename: Optional[str], content: bytes, parse_as: Optional[str] = None):
+    """Add an upload's text to the local search index off the event loop"""
+    try:
+        # parse_as: name of the normalized upload whose content this is
+        await asyncio.to_thread(_extract_and_index, file_id, filename, content, parse_as)
+    except Exception:
+        logger.exception("search indexing failed", extra={"fields": {"file_id": file_id, "filename": filename}})
+
 @router.post("/upload")
-async def upload_file(file: UploadFile = File(...)):
-    """Upload a file for the assistant"""
+async def upload_file(http_request: Request, file: UploadFile = File(...), session_id: Optional[str] = Query(None)):
+    """
+    Upload a file for the assistant (identical content is only uploaded once).
+    With session_id, indexing into the session's vector store starts at once;
+    otherwise it starts when the file is first sent in a chat.
+    """
+    started = time.perf_counter()
+    session = session_service.get_session(session_id) if session_id else None
+    if session_id and not session:
+        raise HTTPException(status_code=404, detail="Session not found")
     try:
-        content = await file.read()
-        file_id = openai_service.upload_file(content, file.filename, file.content_type)
-        
-        # Determine file type
-        is_image = file.content_type and file.content_type.startswith("image/")
-        file_type = "image" if is_image else "file"
+        upload_rate_limiter.check(_client_key(http_request))
+        with upload_stage_seconds.time(stage="admission_wait"):
+            slot = await upload_admission.acquire()
+    except Overloaded as e:
+        raise _too_many_requests(e)
+
+    try:
+        # Hash and validate in one chunked pass over the spooled temp file
+        with upload_stage_seconds.time(stage="scan"):
+            scanned = await scan_upload(file)
+        file_type = "image" if scanned.is_image else "file"
+
+        # Reuse the existing OpenAI file if this exact content was uploaded before
+        existing = upload_index.lookup(scanned.sha256)
+        image = document = None
+        if existing:
+            file_id = existing["file_id"]
+        else:
+            # Stream the temp file to OpenAI instead of reading it into memory
+            content, filename, content_type = file.file, file.filename, file.content_type
+            if scanned.is_image:
+                # Downscaled, metadata-free copy (keyed by the original's hash)
+                with upload_stage_seconds.time(stage="image_preprocess"):
+                    image = await image_preprocessor.process(file.file, scanned.sha256, file.filename, scanned.size)
+                if image.content is not None:
+                    content, filename, content_type = image.content, image.filename, image.content_type
+            elif document_normalizer.handles(file.filename):
+                # CSV/HTML as clean text, Thai text normalized (keyed by the original's hash)
+                with upload_stage_seconds.time(stage="normalize"):
+                    document = await document_normalizer.process(file.file, scanned.sha256, file.filename, scanned.size)
+                if document.content is not None:
+                    content, filename, content_type = document.content, document.filename, "text/markdown"
+            with upload_stage_seconds.time(stage="upload"):
+                file_id = await openai_service.upload_file(content, filename, content_type)
+            upload_index.record(scanned.sha256, file_id, file.filename, scanned.size, kind=file_type)
+
+        # Start vector store indexing now so it overlaps with the user typing
+        ingestion_status = vector_store_id = None
+        if session and not scanned.is_image:
+            with upload_stage_seconds.time(stage="vector_store"):
+                session = await session_service.ensure_thread(session)
+                vector_store_id = await session_vector_stores.for_thread(session.thread_id)
+            ingestion_status = ingestion_queue.enqueue(file_id, vector_store_id).status
+
+        # Local search index (the spooled file is gone once the request ends,
+        # so the content is read here; files over SEARCH_INDEX_MAX_BYTES are skipped)
+        indexed = None
+        if is_indexable(file.filename) and not search_index.has_file(file_id):
+            if document and document.content is not None:
+                if search_index.accepts(len(document.content)):
+                    indexed = _index_for_search(file_id, file.filename, document.content, parse_as=document.filename)
+            elif search_index.accepts(scanned.size):
+                await file.seek(0)
+                indexed = _index_for_search(file_id, file.filename, await file.read())
+        if indexed is not None:
+            task = asyncio.create_task(indexed)
+            _search_indexing.add(task)
+            task.add_done_callback(_search_indexing.discard)
         
         return {
             "file_id": file_id, 
             "filename": file.filename,
-            "type": file_type
+            "type": file_type,
+            "deduplicated": existing is not None,
+            "ingestion_status": ingestion_status,
+            "vector_store_id": vector_store_id,
+            "image": image.summary() if image else None,
+            "document": document.summary() if document else None
         }
+    except UploadRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except CircuitOpen as e:
+        raise _upstream_unavailable(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        slot.release()
+        upload_stage_seconds.observe(time.perf_counter() - started, stage="total")
+
+@router.get("/files/{file_id}/status")
+async def get_file_status(file_id: str):
+    """Report vector store ingestion progress for an uploaded file"""
+    job = ingestion_queue.get(file_id)
+    if job:
+        return job.to_dict()
+
+    # Jobs are pruned from memory once finished, and with several workers the
+    # job may live in another process; fall back to the shared index
+    vector_store_ids = upload_index.vector_stores_for(file_id)
+    if vector_store_ids:
+        return {"file_id": file_id, "vector_store_id": vector_store_ids[0], "status": "completed"}
+    if upload_index.has_file(file_id):
+        # Indexed in another worker, or not sent in a session yet
+        return {"file_id": file_id, "vector_store_id": None, "status": "pending"}
+    raise HTTPException(status_code=404, detail="File not found")
+
+@router.get("/chat/answer-cache/stats")
+async def get_answer_cache_stats():
+    """Answer cache hit rate and latency saved"""
+    return answer_cache.stats()
+
+@router.get("/citations/file-metadata/stats")
+async def get_file_metadata_stats():
+    """Cited file metadata cache hit rate and API lookups"""
+    return file_metadata.stats()
+
+@router.get("/search")
+async def search_documents(
+    q: str = Query(..., min_length=1, max_length=500),
+    limit: int = Query(10, ge=1, le=50),
+    file_id: Optional[List[str]] = Query(None)
+):
+    """
+    Ranked passages from uploaded files (local BM25 index, no assistant run).
+    Covers text, Markdown, CSV, HTML, JSON, source files and, when pypdf is
+    installed, the text layer of PDFs; scanned PDFs, Office files and images
+    are not searchable here.
+    """
+    started = time.perf_counter()
+    # BM25 scoring holds the index lock; keep it off the event loop
+    results = await asyncio.to_thread(search_index.search, q, limit=limit, file_ids=file_id)
+    return {
+        "query": q,
+        "results": results,
+        "took_ms": round((time.perf_counter() - started) * 1000, 2)
+    }
+
+@router.get("/search/stats")
+async def get_search_stats():
+    return search_index.stats()
+
+@router.get("/threads/pool/stats")
+async def get_thread_pool_stats():
+    """Pre-created thread pool usage"""
+    return thread_pool.stats()
+
+@router.get("/upload/images/stats")
+async def get_image_preprocess_stats():
+    """Image downscaling/recompression counts and bytes saved"""
+    return image_preprocessor.stats()
+
+@router.get("/upload/documents/stats")
+async def get_document_normalize_stats():
+    """CSV/HTML/text conversion counts and bytes before and after"""
+    return document_normalizer.stats()
+
+@router.get("/vector-stores/stats")
+async def get_vector_store_stats():
+    """Per-session vector stores, reaper activity and the shared store's file count"""
+    return session_vector_stores.stats()
+
+@router.get("/upload/index/stats")
+async def get_upload_index_stats():
+    """Deduplication index size and hit rate"""
+    return upload_index.stats()
+
+@router.delete("/upload/index/{file_id}")
+async def invalidate_upload(file_id: str):
+    """Forget a file in the deduplication index so the next upload re-sends it"""
+    removed = upload_index.invalidate(file_id=file_id)
+    search_index.remove_file(file_id)
+    file_metadata.invalidate(file_id)
+    if not removed:
+        raise HTTPException(status_code=404, detail="File not found in upload index")
+    return {"file_id": file_id, "invalidated": True}
+
+def _answer_cache_scope() -> tuple:
+    """Cached answers are only valid for this assistant and vector store contents"""
+    vector_store_id = openai_service.vector_store_id
+    return (openai_service.assistant_id, vector_store_id, upload_index.vector_store_version(vector_store_id))
+
+def _is_first_turn(request: SendMessageRequest) -> bool:
+    """Stateless first-turn question without attachments (answer cache eligible)"""
+    if request.file_ids or request.image_file_ids:
+        return False
+    if not request.session_id:
+        return True
+    session = session_service.get_session(request.session_id)
+    # Files uploaded into the session beforehand can change the answer
+    return session is not None and not session.messages and not session_vector_stores.has_store(session.thread_id)
+
+async def _answer_from_cache(request: SendMessageRequest, user_id: Optional[str]) -> Optional[Tuple[str, Message, Message]]:
+    """
+    Serve a first-turn question from the answer cache without any OpenAI
+    call. The exchange is saved to the session as usual and recorded as the
+    session's thread seed, posted by whichever worker next uses the thread.
+    """
+    started = time.perf_counter()
+    entry = answer_cache.lookup(request.message, _answer_cache_scope())
+    if entry is None:
+        return None
+
+    seed = [{"role": "user", "content": request.message}, {"role": "assistant", "content": entry.answer}]
+    if request.session_id:
+        session = session_service.get_session(request.session_id)
+        if not session:
+            return None
+        session_service.set_thread_seed(session.id, seed)
+    else:
+        session = await session_service.create_session(user_id=user_id, thread_seed=seed)
+
+    user_message = Message(role="user", content=request.message, timestamp=datetime.now())
+    assistant_message = Message(role="assistant", content=entry.answer, timestamp=datetime.now(), citations=entry.citations)
+    session_service.add_message_to_session(session.id, user_message)
+    session_service.add_message_to_session(session.id, assistant_message)
+
+    answer_cache.record_saved(entry, time.perf_counter() - started)
+    return session.id, user_message, assistant_message
+
+async def _prepare_chat(
+    request: SendMessageRequest,
+    user_id: Optional[str] = None,
+    endpoint: str = "chat"
+) -> Tuple[str, ChatSession, Message]:
+    """
+    Resolve (or create) the session, record the user message, wait for
+    attached files to be indexed and post the message to the OpenAI thread.
+    """
+    with chat_stage_seconds.time(endpoint=endpoint, stage="session"):
+        session_id, session, message_posted = await _resolve_session(request, user_id)
+
+    # Add user message to session
+    user_message = Message(
+        role="user",
+        content=request.message,
+        timestamp=datetime.now()
+    )
+    session_service.add_message_to_session(session_id, user_message)
+
+    # Make sure attached files are in the session's vector store before sending message
+    if request.file_ids:
+        with chat_stage_seconds.time(endpoint=endpoint, stage="file_wait"):
+            await _wait_for_attachments(request, session.thread_id)
+    else:
+        # Keeps the session's store (if any) from being reaped while in use
+        session_vector_stores.touch(session.thread_id)
+
+    # Send message to OpenAI thread
+    if not message_posted:
+        with chat_stage_seconds.time(endpoint=endpoint, stage="message_create"):
+            thread_message_id = await openai_service.send_message(
+                session.thread_id, 
+                request.message, 
+                file_ids=None,  # Don't pass file_ids as attachments anymore
+                image_file_ids=request.image_file_ids
+            )
+        session_service.set_thread_cursor(session_id, thread_message_id)
+
+    return session_id, session, user_message
+
+async def _resolve_session(request: SendMessageRequest, user_id: Optional[str]) -> Tuple[str, ChatSession, bool]:
+    """The request's session, or a new one; also whether the message is already in its thread"""
+    session_id = request.session_id
+    message_posted = False
+
+    # Create new session if not provided
+    if not session_id:
+        thread_id = thread_pool.acquire()
+        if thread_id is None and thread_pool.lazy_create:
+            # Pool is empty: create the thread with the message already in it,
+            # one round trip instead of two. The cursor is set in the
+            # background (or by the run's answer, whichever comes first).
+            thread_id = await openai_service.create_thread(initial_messages=[{
+                "role": "user",
+                "content": openai_service.message_content(request.message, request.image_file_ids)
+            }])
+            message_posted = True
+        elif thread_id is None:
+            # create_session() would try the pool again, counting a second miss
+            thread_id = await openai_service.create_thread()
+        session = await session_service.create_session(user_id=user_id, thread_id=thread_id)
+        session_id = session.id
+        if message_posted:
+            task = asyncio.create_task(_record_initial_message(session_id, thread_id))
+            _initial_cursors.add(task)
+            task.add_done_callback(_initial_cursors.discard)
+    else:
+        session = session_service.get_session(session_id)
+        if not session:
+            raise HTTPException(status_code=404, detail="Session not found")
+        # Posts a cached exchange first, so the run sees it
+        session = await session_service.ensure_thread(session)
+
+    return session_id, session, message_posted
+
+async def _record_initial_message(session_id: str, thread_id: str):
+    """Set the cursor of a session whose thread was created with the user's message in it"""
+    try:
+        await session_service.record_initial_messages(session_id, thread_id, 1)
+    except Exception as e:
+        # Without a cursor, /sync skips the messages the session already has
+        log_event(logger, logging.WARNING, "recording thread cursor failed", thread_id=thread_id, error=str(e))
+
+async def _wait_for_attachments(request: SendMessageRequest, thread_id: str):
+    """
+    Wait for attached (non-image) files whose ingestion into the thread's
+    vector store has not finished (creating the store on first use)
+    """
+    # Filter out image files (only add non-image files to vector store)
+    non_image_file_ids = []
+    for file_id in request.file_ids:
+        # If file_id exists and it's not in image_file_ids, add to batch
+        if file_id not in (request.image_file_ids or []):
+            non_image_file_ids.append(file_id)
+    
+    # Wait only for files whose background ingestion has not finished yet
+    if non_image_file_ids:
+        vector_store_id = await session_vector_stores.for_thread(thread_id)
+        jobs = await ingestion_queue.wait_for(
+            non_image_file_ids, vector_store_id, timeout=ingestion_queue.job_timeout
+        )
+        failed = [job for job in jobs.values() if job.status == FAILED]
+        not_ready = [job for job in jobs.values() if not job.finished]
+        if not_ready:
+            log_event(logger, logging.WARNING, "files still indexing, sending message anyway",
+                      files=[job.file_id for job in not_ready])
+        if failed:
+            raise HTTPException(
+                status_code=400, 
+                detail=f"Failed to process {len(failed)} file(s)"
+            )
 
 @router.post("/chat", response_model=SendMessageResponse)
-async def send_message(request: SendMessageRequest, background_tasks: BackgroundTasks):
+async def send_message(request: SendMessageRequest, background_tasks: BackgroundTasks, http_request: Request):
     """Send a message and get assistant response"""
     try:
-        session_id = request.session_id
+        chat_rate_limiter.check(_client_key(http_request))
+    except Overloaded as e:
+        raise _too_many_requests(e)
 
-        # Create new session if not provided
-        if not session_id:
-            session = session_service.create_session()
-            session_id = session.id
-        else:
-            session = session_service.get_session(session_id)
-            if not session:
-                raise HTTPException(status_code=404, detail="Session not found")
-
-        # Add user message to session
-        user_message = Message(
-            role="user",
-            content=request.message,
-            timestamp=datetime.now()
-        )
-        session_service.add_message_to_session(session_id, user_message)
-
-        # Add files to DemoVector before sending message
-        if request.file_ids:
-            # Filter out image files (only add non-image files to vector store)
-            non_image_file_ids = []
-            for file_id in request.file_ids:
-                # If file_id exists and it's not in image_file_ids, add to batch
-                if file_id not in (request.image_file_ids or []):
-                    non_image_file_ids.append(file_id)
-            
-            # Add files to vector store in batch
-            if non_image_file_ids:
-                batch_result = openai_service.add_files_to_vector_store_batch(non_image_file_ids)
-                if not batch_result["success"]:
-                    print(f"Warning: Failed to add files to vector store: {batch_result['status']}")
-                    if batch_result.get("failed_files", 0) > 0:
-                        raise HTTPException(
-                            status_code=400, 
-                            detail=f"Failed to process {batch_result['failed_files']} file(s)"
-                        )
-
-        # Send message to OpenAI thread
-        openai_service.send_message(
-            session.thread_id, 
-            request.message, 
-            file_ids=None,  # Don't pass file_ids as attachments anymore
-            image_file_ids=request.image_file_ids
-        )
+    slot = None
+    try:
+        user_id = _current_user_id(http_request)
+        first_turn = _is_first_turn(request)
+        if first_turn:
+            with chat_stage_seconds.time(endpoint="chat", stage="cache_lookup"):
+                cached = await _answer_from_cache(request, user_id)
+            if cached:
+                session_id, user_message, assistant_message = cached
+                return SendMessageResponse(
+                    session_id=session_id,
+                    message=user_message,
+                    assistant_response=assistant_message
+                )
+
+        # Bound concurrent assistant runs; nothing is recorded until admitted
+        with chat_stage_seconds.time(endpoint="chat", stage="admission_wait"):
+            slot = await run_admission.acquire()
+        started = time.perf_counter()
+        scope = _answer_cache_scope() if first_turn else None
+        session_id, session, user_message = await _prepare_chat(request, user_id)
 
         # Create and run the assistant
-        run_id = openai_service.create_and_run(session.thread_id)
+        with chat_stage_seconds.time(endpoint="chat", stage="run_create"):
+            run_id = await openai_service.create_and_run(session.thread_id)
 
-        # Wait for completion (in production, this should be async)
-        if openai_service.wait_for_run_completion(session.thread_id, run_id):
-            # Get assistant response
-            assistant_content = openai_service.get_assistant_response(session.thread_id)
+        # Wait for completion without blocking the event loop
+        with chat_stage_seconds.time(endpoint="chat", stage="run_wait"):
+            completed = await openai_service.wait_for_run_completion(session.thread_id, run_id)
+        if completed:
+            # Get the assistant response created by this run only
+            with chat_stage_seconds.time(endpoint="chat", stage="response_fetch"):
+                assistant_response = await openai_service.get_run_response(session.thread_id, run_id)
 
-            if assistant_content:
+            if assistant_response:
+                with chat_stage_seconds.time(endpoint="chat", stage="citations"):
+                    citations = await resolve_citations(assistant_response["citations"])
                 assistant_message = Message(
                     role="assistant",
-                    content=assistant_content,
-                    timestamp=datetime.now()
+                    content=assistant_response["content"],
+                    timestamp=datetime.now(),
+                    citations=citations
                 )
                 session_service.add_message_to_session(session_id, assistant_message)
+                session_service.set_thread_cursor(session_id, assistant_response["id"])
+                if first_turn:
+                    answer_cache.store(
+                        request.message, assistant_message.content, scope, time.perf_counter() - started, citations
+                    )
+                chat_stage_seconds.observe(time.perf_counter() - started, endpoint="chat", stage="total")
 
                 return SendMessageResponse(
                     session_id=session_id,
@@ -152,42 +538,190 @@ async def send_message(request: SendMessageRequest, background_tasks: Background
 
         # If we get here, something went wrong
         raise HTTPException(status_code=500, detail="Failed to get assistant response")
+    except Overloaded as e:
+        raise _too_many_requests(e)
+    except CircuitOpen as e:
+        raise _upstream_unavailable(e)
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error in send_message: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("chat request failed")
         raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
+    finally:
+        if slot:
+            slot.release()
+
+def _sse_event(event: str, data: dict) -> str:
+    """Format a Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+async def _cached_event_stream(session_id: str, user_message: Message, assistant_message: Message):
+    """The same events as /chat/stream, for an answer served from the cache"""
+    yield _sse_event("session", {"session_id": session_id, "message": user_message.model_dump(mode="json")})
+    yield _sse_event("delta", {"text": assistant_message.content})
+    yield _sse_event("done", {"session_id": session_id, "message": assistant_message.model_dump(mode="json")})
+
+@router.post("/chat/stream")
+async def stream_message(request: SendMessageRequest, http_request: Request):
+    """
+    Send a message and stream the assistant response as Server-Sent Events.
+
+    Events:
+      - session: {"session_id", "message"} once the user message is posted
+      - delta:   {"text"} for each chunk of assistant text
+      - done:    {"session_id", "message"} with the saved assistant message,
+                 including its resolved citations
+      - error:   {"detail"} if the run fails
+    """
+    try:
+        chat_rate_limiter.check(_client_key(http_request))
+    except Overloaded as e:
+        raise _too_many_requests(e)
+
+    slot = None
+    try:
+        user_id = _current_user_id(http_request)
+        first_turn = _is_first_turn(request)
+        cached = None
+        if first_turn:
+            with chat_stage_seconds.time(endpoint="stream", stage="cache_lookup"):
+                cached = await _answer_from_cache(request, user_id)
+        if cached:
+            return StreamingResponse(
+                _cached_event_stream(*cached),
+                media_type="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+            )
+
+        # The run slot is held until the stream ends
+        with chat_stage_seconds.time(endpoint="stream", stage="admission_wait"):
+            slot = await run_admission.acquire()
+        started = time.perf_counter()
+        scope = _answer_cache_scope() if first_turn else None
+        session_id, session, user_message = await _prepare_chat(request, user_id, endpoint="stream")
+    except Overloaded as e:
+        raise _too_many_requests(e)
+    except CircuitOpen as e:
+        if slot:
+            slot.release()
+        raise _upstream_unavailable(e)
+    except HTTPException:
+        if slot:
+            slot.release()
+        raise
+    except Exception as e:
+        if slot:
+            slot.release()
+        logger.exception("stream request failed")
+        raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
+
+    async def event_stream():
+        try:
+            yield _sse_event("session", {
+                "session_id": session_id,
+                "message": user_message.model_dump(mode="json")
+            })
+
+            chunks = []
+            run_info = {}
+            try:
+                async for text in openai_service.stream_run(session.thread_id, run_info):
+                    if not chunks:
+                        chat_stage_seconds.observe(time.perf_counter() - started, endpoint="stream", stage="first_token")
+                    chunks.append(text)
+                    yield _sse_event("delta", {"text": text})
+            except Exception as e:
+                log_event(logger, logging.WARNING, "stream run failed", session_id=session_id, error=str(e))
+                yield _sse_event("error", {"detail": str(e)})
+                return
+
+            assistant_content = "".join(chunks)
+            if not assistant_content:
+                yield _sse_event("error", {"detail": "Failed to get assistant response"})
+                return
+
+            with chat_stage_seconds.time(endpoint="stream", stage="citations"):
+                citations = await resolve_citations(run_info.get("citations"))
+            assistant_message = Message(
+                role="assistant",
+                content=assistant_content,
+                timestamp=datetime.now(),
+                citations=citations
+            )
+            session_service.add_message_to_session(session_id, assistant_message)
+            session_service.set_thread_cursor(session_id, run_info.get("message_id"))
+            if first_turn:
+                answer_cache.store(request.message, assistant_content, scope, time.perf_counter() - started, citations)
+            chat_stage_seconds.observe(time.perf_counter() - started, endpoint="stream", stage="total")
+            yield _sse_event("done", {
+                "session_id": session_id,
+                "message": assistant_message.model_dump(mode="json")
+            })
+        finally:
+            slot.release()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # Also release if the client disconnects before the stream starts
+        background=BackgroundTask(slot.release)
+    )
 
 @router.get("/sessions/{session_id}/messages")
-async def get_session_messages(session_id: str):
-    """Get all messages from a session"""
+async def get_session_messages(
+    session_id: str,
+    http_request: Request,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None
+):
+    """Get one page of messages from a session (oldest first)"""
     session = session_service.get_session(session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
 
-    return {"session_id": session_id, "messages": session.messages}
+    try:
+        messages, next_cursor = session_service.get_messages_page(session, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return _etag_response(http_request, {
+        "session_id": session_id,
+        "messages": messages,
+        "next_cursor": next_cursor
+    })
+
+@router.post("/sessions/{session_id}/sync")
+async def sync_session(session_id: str):
+    """Pull messages added to the session's OpenAI thread since the last sync"""
+    try:
+        synced = await session_service.sync_from_thread(session_id)
+    except Exception as e:
+        log_event(logger, logging.WARNING, "thread sync failed", session_id=session_id, error=str(e))
+        raise HTTPException(status_code=502, detail=f"Failed to sync thread: {str(e)}")
+
+    if synced is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return {"session_id": session_id, "synced": synced}
 
 @router.get("/sessions")
-async def get_all_sessions():
-    """Get all active sessions"""
-    sessions = session_service.get_all_sessions()
-    # Convert sessions to the format expected by frontend
-    formatted_sessions = []
-    for session in sessions.values():
-        formatted_sessions.append({
-            "id": session.id,
-            "thread_id": session.thread_id,
-            "messages": [
-                {
-                    "role": msg.role,
-                    "content": msg.content,
-                    "timestamp": msg.timestamp.isoformat() if msg.timestamp else datetime.now().isoformat()
-                }
-                for msg in session.messages
-            ],
-            "created_at": session.created_at.isoformat(),
-            "updated_at": session.updated_at.isoformat()
-        })
-    return {"sessions": formatted_sessions}
+async def get_all_sessions(
+    http_request: Request,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None
+):
+    """
+    List the current user's sessions as summaries, most recently updated first.
+    Pass next_cursor back as cursor to get the next page.
+    """
+    try:
+        summaries, next_cursor = session_service.list_session_summaries(
+            _current_user_id(http_request), limit, cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return _etag_response(http_request, {
+        "sessions": summaries,
+        "next_cursor": next_cursor
+    })
@@ -0,0 +1,27 @@
+import math
+import os
+
+
+def server_profile() -> str:
+    """Server profile selected by run.py via SERVER_PROFILE (development or production)"""
+    return os.getenv("SERVER_PROFILE", "development").lower()
+
+
+def is_production() -> bool:
+    """
+    True when running the production profile, which may use several worker
+    processes; per-process state that must be shared then lives in SQLite.
+    """
+    return server_profile() == "production"
+
+
+def worker_count() -> int:
+    """Worker processes sharing the load (WEB_CONCURRENCY in production, as in run.py)"""
+    if not is_production():
+        return 1
+    return max(1, int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)))
+
+
+def per_worker(total: int) -> int:
+    """This worker's share of a limit configured for the whole server"""
+    return max(1, math.ceil(total / worker_count()))
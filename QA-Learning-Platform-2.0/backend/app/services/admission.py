@@ -0,0 +1,269 @@
+import asyncio
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Optional
+
+from app.runtime import is_production, per_worker
+
+DEFAULT_RATE_LIMIT_DB_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "data", "rate_limits.db")
+
+
+class Overloaded(Exception):
+    """Raised when a request is rejected; the router answers 429 with Retry-After"""
+
+    def __init__(self, detail: str, retry_after: float):
+        super().__init__(detail)
+        self.detail = detail
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class TokenBucket:
+    def __init__(self, capacity: float, now: float):
+        self.tokens = capacity
+        self.updated = now
+
+
+class RateLimiter:
+    """
+    Per-key token buckets: each key (user) may burst up to `burst` requests
+    and then gets `per_minute` requests per minute. Only the max_keys most
+    recently seen keys are kept; a forgotten key starts with a full bucket.
+
+    In shared mode (the production profile, where a user's requests are
+    spread over several worker processes) the buckets live in SQLite, so
+    the limits apply to the whole server rather than to each worker.
+    Buckets idle long enough to have refilled are pruned instead.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        per_minute: float,
+        burst: float,
+        max_keys: int = 10000,
+        shared: Optional[bool] = None,
+        path: Optional[str] = None
+    ):
+        self.name = name
+        self.rate = per_minute / 60.0
+        self.burst = burst
+        self.max_keys = max_keys
+        self.shared = shared if shared is not None else is_production()
+        self.path = path or os.getenv("RATE_LIMIT_DB_PATH", DEFAULT_RATE_LIMIT_DB_PATH)
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        # Opened on first use, so importing the module does not touch the disk
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+        # Counters
+        self.allowed = 0
+        self.limited = 0
+
+    def check(self, key: str):
+        """Take one token for key, or raise Overloaded with the time until the next one"""
+        if self.rate <= 0:
+            return
+        tokens = self._take_shared(key) if self.shared else self._take(key)
+        if tokens < 1:
+            self.limited += 1
+            raise Overloaded(f"Too many {self.name} requests, slow down", (1 - tokens) / self.rate)
+        self.allowed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "per_minute": self.rate * 60,
+            "burst": self.burst,
+            "shared": self.shared,
+            "keys": self._shared_key_count() if self.shared else len(self._buckets),
+            "allowed": self.allowed,
+            "limited": self.limited
+        }
+
+    def _take(self, key: str) -> float:
+        """Refill key's bucket and take a token if there is one; returns the tokens before taking"""
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self.burst, now)
+        else:
+            bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated) * self.rate)
+            bucket.updated = now
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+
+        tokens = bucket.tokens
+        if tokens >= 1:
+            bucket.tokens -= 1
+        return tokens
+
+    def _take_shared(self, key: str) -> float:
+        """_take() on the bucket in SQLite, in one write transaction across all workers"""
+        with self._lock:
+            conn = self._connection()
+            now = time.time()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT tokens, updated FROM rate_buckets WHERE limiter = ? AND key = ?", (self.name, key)
+                ).fetchone()
+                tokens = self.burst if row is None else min(self.burst, row[0] + max(0.0, now - row[1]) * self.rate)
+                conn.execute(
+                    "INSERT OR REPLACE INTO rate_buckets (limiter, key, tokens, updated) VALUES (?, ?, ?, ?)",
+                    (self.name, key, tokens - 1 if tokens >= 1 else tokens, now)
+                )
+                if (self.allowed + self.limited) % 1000 == 0:
+                    # Buckets idle for this long are full again, the same as a new one
+                    conn.execute(
+                        "DELETE FROM rate_buckets WHERE limiter = ? AND updated < ?",
+                        (self.name, now - self.burst / self.rate)
+                    )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return tokens
+
+    def _shared_key_count(self) -> int:
+        with self._lock:
+            return self._connection().execute(
+                "SELECT COUNT(*) FROM rate_buckets WHERE limiter = ?", (self.name,)
+            ).fetchone()[0]
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            # Autocommit mode; _take_shared() manages its own transaction
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=5)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS rate_buckets (
+                    limiter TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    tokens REAL NOT NULL,
+                    updated REAL NOT NULL,
+                    PRIMARY KEY (limiter, key)
+                )
+            """)
+        return self._conn
+
+
+class Slot:
+    """An admitted operation; release() is idempotent"""
+
+    def __init__(self, controller: "AdmissionController"):
+        self._controller = controller
+        self._admitted_at = time.monotonic()
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._controller._release(time.monotonic() - self._admitted_at)
+
+
+class AdmissionController:
+    """
+    Bounds how many operations of one kind (assistant runs, uploads) run at
+    once. Up to max_queue callers wait for a slot, each for at most max_wait
+    seconds; anyone beyond that is rejected immediately, so under overload
+    admitted requests keep a bounded latency instead of all timing out.
+
+    Slots are per process: the global instances below take their share
+    (per_worker) of the server-wide limits, so the total across worker
+    processes stays at the configured value.
+    """
+
+    def __init__(self, name: str, limit: int, max_queue: int, max_wait: float):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._semaphore = asyncio.Semaphore(limit)
+        self.in_flight = 0
+        self.queued = 0
+
+        # Recent wait and hold times (seconds) for metrics and Retry-After
+        self._waits: Deque[float] = deque(maxlen=1000)
+        self._holds: Deque[float] = deque(maxlen=200)
+
+        # Counters
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    async def acquire(self) -> Slot:
+        """Wait for a slot, or raise Overloaded if the queue is full or the wait too long"""
+        if self.in_flight >= self.limit and self.queued >= self.max_queue:
+            self.rejected += 1
+            raise Overloaded(f"Server is busy ({self.name}), please retry", self._retry_after())
+
+        started = time.monotonic()
+        self.queued += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.max_wait)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise Overloaded(f"Server is busy ({self.name}), please retry", self._retry_after())
+        finally:
+            self.queued -= 1
+
+        self._waits.append(time.monotonic() - started)
+        self.in_flight += 1
+        self.admitted += 1
+        return Slot(self)
+
+    def _release(self, held: float):
+        self._holds.append(held)
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    def _retry_after(self) -> float:
+        """Rough time until the current queue drains"""
+        hold = sum(self._holds) / len(self._holds) if self._holds else 1.0
+        return hold * (self.queued + 1) / self.limit
+
+    def stats(self) -> Dict[str, Any]:
+        waits = sorted(self._waits)
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "wait_avg_ms": 1000 * sum(waits) / len(waits) if waits else 0.0,
+            "wait_p95_ms": 1000 * waits[int(len(waits) * 0.95)] if waits else 0.0
+        }
+
+
+# Global instances
+run_admission = AdmissionController(
+    "assistant runs",
+    limit=per_worker(int(os.getenv("ADMISSION_MAX_RUNS", 32))),
+    max_queue=per_worker(int(os.getenv("ADMISSION_RUN_QUEUE", 64))),
+    max_wait=float(os.getenv("ADMISSION_RUN_MAX_WAIT", 20))
+)
+upload_admission = AdmissionController(
+    "uploads",
+    limit=per_worker(int(os.getenv("ADMISSION_MAX_UPLOADS", 8))),
+    max_queue=per_worker(int(os.getenv("ADMISSION_UPLOAD_QUEUE", 32))),
+    max_wait=float(os.getenv("ADMISSION_UPLOAD_MAX_WAIT", 20))
+)
+chat_rate_limiter = RateLimiter(
+    "chat",
+    per_minute=float(os.getenv("RATE_LIMIT_CHAT_PER_MINUTE", 20)),
+    burst=float(os.getenv("RATE_LIMIT_CHAT_BURST", 5))
+)
+upload_rate_limiter = RateLimiter(
+    "upload",
+    per_minute=float(os.getenv("RATE_LIMIT_UPLOADS_PER_MINUTE", 30)),
+    burst=float(os.getenv("RATE_LIMIT_UPLOADS_BURST", 10))
+)
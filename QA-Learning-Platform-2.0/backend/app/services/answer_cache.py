@@ -0,0 +1,259 @@
+import hashlib
+import os
+import random
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Hashable, List, Optional, Set
+
+# Zero-width characters that Thai keyboards and copy/paste often leave behind
+_ZERO_WIDTH = dict.fromkeys(map(ord, "\u200b\u200c\u200d\u2060\ufeff"))
+_PUNCTUATION = re.compile(r"[\s?!.,;:'\"()\[\]{}…“”‘’ฯ]+")
+# Polite particles that do not change the question ("... ครับ", "... คะ")
+_TRAILING_PARTICLES = ("ครับผม", "ครับ", "คับ", "ค่ะ", "คะ", "จ้า", "จ้ะ", "นะ")
+
+_MERSENNE_PRIME = (1 << 61) - 1
+
+
+def normalize_question(text: str) -> str:
+    """
+    Canonical form of a question for exact matching: NFKC, no zero-width
+    characters, "เเ" typed as two characters folded to "แ", case-folded,
+    punctuation collapsed to single spaces and trailing polite particles
+    removed.
+    """
+    text = unicodedata.normalize("NFKC", text).translate(_ZERO_WIDTH)
+    text = text.replace("เเ", "แ").casefold()
+    text = _PUNCTUATION.sub(" ", text).strip()
+    stripped = True
+    while stripped:
+        stripped = False
+        for particle in _TRAILING_PARTICLES:
+            if text.endswith(particle) and len(text) > len(particle):
+                text = text[:-len(particle)].rstrip()
+                stripped = True
+    return text
+
+
+def shingles(normalized: str, size: int = 3) -> FrozenSet[str]:
+    """
+    Character shingles of a normalized question. Spaces are dropped first
+    because Thai does not separate words, so spacing differences are noise.
+    """
+    compact = normalized.replace(" ", "")
+    if len(compact) <= size:
+        return frozenset([compact]) if compact else frozenset()
+    return frozenset(compact[i:i + size] for i in range(len(compact) - size + 1))
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class MinHasher:
+    """MinHash signatures with num_perm universal hash functions, split into LSH bands"""
+
+    def __init__(self, num_perm: int = 64, bands: int = 16, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        rng = random.Random(seed)
+        self._params = [
+            (rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+            for _ in range(num_perm)
+        ]
+
+    def signature(self, items: FrozenSet[str]) -> List[int]:
+        hashed = [
+            int.from_bytes(hashlib.blake2b(item.encode(), digest_size=8).digest(), "big")
+            for item in items
+        ]
+        if not hashed:
+            return [_MERSENNE_PRIME] * self.num_perm
+        return [min((a * h + b) % _MERSENNE_PRIME for h in hashed) for a, b in self._params]
+
+    def band_keys(self, signature: List[int]) -> List[Hashable]:
+        return [
+            (band, tuple(signature[band * self.rows:(band + 1) * self.rows]))
+            for band in range(self.bands)
+        ]
+
+
+class CachedAnswer:
+    def __init__(
+        self,
+        key: str,
+        question: str,
+        answer: str,
+        shingle_set: FrozenSet[str],
+        band_keys: List[Hashable],
+        latency: float,
+        citations: Optional[List[Any]] = None
+    ):
+        self.key = key
+        self.question = question
+        self.answer = answer
+        self.citations = citations  # Resolved citations, spans index into answer
+        self.shingles = shingle_set
+        self.band_keys = band_keys
+        self.latency = latency  # How long the assistant run that produced it took
+        self.stored_at = time.monotonic()
+
+
+class AnswerCache:
+    """
+    In-process cache of assistant answers to stateless first-turn questions.
+
+    Questions are matched exactly after normalize_question(), then as
+    near-duplicates through a MinHash/LSH index over character shingles
+    (candidates are confirmed with the exact Jaccard similarity).
+
+    Every entry belongs to a scope, e.g. (assistant_id, vector_store_id,
+    vector store version); a lookup or store with a different scope drops
+    the whole cache, so answers never outlive the documents they came from.
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        ttl: Optional[float] = None,
+        similarity: Optional[float] = None,
+        num_perm: int = 64,
+        bands: int = 16
+    ):
+        self.max_entries = max_entries or int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", 1000))
+        self.ttl = ttl if ttl is not None else float(os.getenv("ANSWER_CACHE_TTL", 86400))
+        self.similarity = similarity if similarity is not None else float(os.getenv("ANSWER_CACHE_SIMILARITY", 0.9))
+        self.enabled = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+        self.hasher = MinHasher(num_perm=num_perm, bands=bands)
+
+        self._scope: Optional[Hashable] = None
+        self._entries: "OrderedDict[str, CachedAnswer]" = OrderedDict()
+        self._buckets: Dict[Hashable, Set[str]] = {}
+
+        # Counters
+        self.exact_hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.invalidations = 0
+        self.saved_seconds = 0.0
+
+    def lookup(self, question: str, scope: Hashable) -> Optional[CachedAnswer]:
+        """Return the cached answer for question (or a near-duplicate of it)"""
+        if not self.enabled:
+            return None
+        self._check_scope(scope)
+
+        key = normalize_question(question)
+        entry = self._live_entry(key)
+        if entry:
+            self.exact_hits += 1
+        else:
+            entry = self._nearest(key)
+            if entry:
+                self.near_hits += 1
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(entry.key)
+        return entry
+
+    def store(self, question: str, answer: str, scope: Hashable, latency: float = 0.0, citations: Optional[List[Any]] = None):
+        """Remember the answer to a first-turn question"""
+        if not self.enabled or not answer:
+            return
+        self._check_scope(scope)
+
+        key = normalize_question(question)
+        if not key:
+            return
+        self._remove(key)
+        shingle_set = shingles(key)
+        entry = CachedAnswer(
+            key, question, answer, shingle_set, self.hasher.band_keys(self.hasher.signature(shingle_set)), latency, citations
+        )
+        self._entries[key] = entry
+        for band_key in entry.band_keys:
+            self._buckets.setdefault(band_key, set()).add(key)
+        self.stores += 1
+
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+    def record_saved(self, entry: CachedAnswer, served_in: float):
+        """Account latency saved by serving entry instead of running the assistant"""
+        self.saved_seconds += max(entry.latency - served_in, 0.0)
+
+    def invalidate(self):
+        """Drop every entry (e.g. after the vector store changed)"""
+        if self._entries:
+            self.invalidations += 1
+        self._entries.clear()
+        self._buckets.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        hits = self.exact_hits + self.near_hits
+        lookups = hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "exact_hits": self.exact_hits,
+            "near_hits": self.near_hits,
+            "misses": self.misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "stores": self.stores,
+            "invalidations": self.invalidations,
+            "saved_seconds": round(self.saved_seconds, 3)
+        }
+
+    def _check_scope(self, scope: Hashable):
+        if scope != self._scope:
+            self.invalidate()
+            self._scope = scope
+
+    def _live_entry(self, key: str) -> Optional[CachedAnswer]:
+        entry = self._entries.get(key)
+        if entry and time.monotonic() - entry.stored_at >= self.ttl:
+            self._remove(key)
+            return None
+        return entry
+
+    def _nearest(self, key: str) -> Optional[CachedAnswer]:
+        shingle_set = shingles(key)
+        if not shingle_set:
+            return None
+        candidates: Set[str] = set()
+        for band_key in self.hasher.band_keys(self.hasher.signature(shingle_set)):
+            candidates |= self._buckets.get(band_key, set())
+
+        best, best_score = None, self.similarity
+        for candidate in candidates:
+            entry = self._live_entry(candidate)
+            if entry is None:
+                continue
+            score = jaccard(shingle_set, entry.shingles)
+            if score >= best_score:
+                best, best_score = entry, score
+        return best
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for band_key in entry.band_keys:
+            bucket = self._buckets.get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band_key]
+
+
+# Global instance
+answer_cache = AnswerCache()
@@ -1,24 +1,73 @@
+import json
+import os
+import sqlite3
+import threading
+import time
 import uuid
 from typing import Dict, Optional
 
+from app.runtime import is_production
+from app.services.provider import Provider
+
+DEFAULT_AUTH_DB_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "data", "auth_sessions.db")
+
 class AuthService:
-    def __init__(self):
+    def __init__(self, backend: Optional[str] = None):
+        # "memory" keeps login sessions in this process only; "sqlite" shares
+        # them between worker processes (default for the production profile)
+        self.backend = (backend or os.getenv("AUTH_STORE") or ("sqlite" if is_production() else "memory")).lower()
+
         # Simple in-memory store mapping session_id -> user info
         self.sessions: Dict[str, dict] = {}
 
+        self._conn = None
+        self._lock = threading.Lock()
+        if self.backend == "sqlite":
+            path = os.getenv("AUTH_DB_PATH", DEFAULT_AUTH_DB_PATH)
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS auth_sessions (
+                    id TEXT PRIMARY KEY,
+                    user_info TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+            self._conn.commit()
+
     def create_user_session(self, user_info: dict) -> str:
         session_id = str(uuid.uuid4())
-        self.sessions[session_id] = user_info
+        if self._conn is not None:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT INTO auth_sessions (id, user_info, created_at) VALUES (?, ?, ?)",
+                    (session_id, json.dumps(user_info), time.time())
+                )
+                self._conn.commit()
+        else:
+            self.sessions[session_id] = user_info
         return session_id
 
     def get_user_by_session(self, session_id: str) -> Optional[dict]:
+        if self._conn is not None:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT user_info FROM auth_sessions WHERE id = ?", (session_id,)
+                ).fetchone()
+            return json.loads(row[0]) if row else None
         return self.sessions.get(session_id)
 
     def delete_session(self, session_id: str) -> bool:
+        if self._conn is not None:
+            with self._lock:
+                deleted = self._conn.execute("DELETE FROM auth_sessions WHERE id = ?", (session_id,)).rowcount
+                self._conn.commit()
+            return deleted > 0
         if session_id in self.sessions:
             del self.sessions[session_id]
             return True
         return False
 
 # global instance
-auth_service = AuthService()
+auth_service: Provider[AuthService] = Provider("auth_service", AuthService)
@@ -0,0 +1,44 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def message_text_and_citations(message: Any) -> Tuple[str, List[Dict[str, Any]]]:
+    """
+    Concatenated text blocks of a thread message, and its file citations as
+    {"file_id", "quote", "start_index", "end_index", "marker"} with the
+    annotation spans shifted to index into the concatenated text.
+    """
+    parts: List[str] = []
+    citations: List[Dict[str, Any]] = []
+    offset = 0
+    for content in message.content or []:
+        if content.type != "text" or not hasattr(content, "text"):
+            continue
+        text = content.text.value or ""
+        for annotation in content.text.annotations or []:
+            if annotation.type != "file_citation":
+                continue
+            citations.append({
+                "file_id": annotation.file_citation.file_id,
+                "quote": getattr(annotation.file_citation, "quote", None),
+                "start_index": offset + annotation.start_index,
+                "end_index": offset + annotation.end_index,
+                "marker": annotation.text
+            })
+        parts.append(text)
+        offset += len(text)
+    return "".join(parts), citations
+
+
+def strip_citations(text: str, citations: List[Dict[str, Any]]) -> str:
+    """text with the cited spans (the 【…†…】 markers) removed"""
+    for citation in sorted(citations, key=lambda c: c["start_index"], reverse=True):
+        text = text[:citation["start_index"]] + text[citation["end_index"]:]
+    return text
+
+
+def filename_from_marker(marker: str) -> Optional[str]:
+    """Source name the model wrote in a marker: 【4:9†book310453.pdf】 -> book310453.pdf"""
+    if "†" not in marker:
+        return None
+    name = marker.split("†", 1)[1].rstrip("】").strip()
+    return name or None
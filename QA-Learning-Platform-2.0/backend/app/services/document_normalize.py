@@ -0,0 +1,384 @@
+import asyncio
+import csv
+import io
+import logging
+import multiprocessing
+import os
+import re
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from html.parser import HTMLParser
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
+
+from app.logging_config import get_logger, log_event
+from app.services.metrics import document_normalize_bytes
+
+# Converted to Markdown (tables and pages); plain text is only re-encoded
+CONVERTED_EXTENSIONS = {".csv", ".tsv", ".html", ".htm"}
+TEXT_EXTENSIONS = {".txt", ".md"}
+
+_ZERO_WIDTH = dict.fromkeys(map(ord, "\u200b\u200c\u200d\u2060\ufeff\u00ad"))
+# A tone mark typed before an above/below vowel (renders the same, compares differently)
+_THAI_TONE_BEFORE_VOWEL = re.compile(r"([\u0e48-\u0e4b])([\u0e31\u0e34-\u0e3a\u0e47])")
+_THAI_REPEATED_MARK = re.compile(r"([\u0e31\u0e34-\u0e3a\u0e47-\u0e4e])\1+")
+# Nikhahit + sara aa (optionally around a tone mark) is how some keyboards type sara am
+_THAI_SARA_AM = re.compile(r"\u0e4d([\u0e48-\u0e4b]?)\u0e32")
+_BLANK_LINES = re.compile(r"\n{3,}")
+_SPACES = re.compile(r"[ \t\r\f\v]+")
+
+# Elements whose content is never document text
+_SKIP_TAGS = {
+    "script", "style", "noscript", "template", "svg", "canvas", "iframe", "object",
+    "nav", "footer", "aside", "form", "button", "select", "head"
+}
+_SKIP_ROLES = {"navigation", "banner", "contentinfo", "search", "complementary"}
+_BLOCK_TAGS = {
+    "p", "div", "section", "article", "main", "header", "br", "hr", "ul", "ol", "li", "dl", "dt", "dd",
+    "table", "thead", "tbody", "tr", "blockquote", "pre", "figure", "figcaption", "caption",
+    "h1", "h2", "h3", "h4", "h5", "h6"
+}
+_VOID_TAGS = {"br", "hr", "img", "input", "meta", "link", "area", "base", "col", "embed", "source", "track", "wbr"}
+_KEEP_INDENT = "\x01"  # Marks lines inside <pre> whose leading whitespace is kept
+
+logger = get_logger("documents")
+
+
+def normalize_thai(text: str) -> str:
+    """
+    NFC with the Thai fixes NFC does not make: nikhahit + sara aa composed
+    into sara am, tone marks after the vowel they sit on, no doubled marks,
+    and no zero-width characters (common in copy/pasted Thai).
+    """
+    text = unicodedata.normalize("NFC", text).translate(_ZERO_WIDTH)
+    text = _THAI_SARA_AM.sub(lambda m: m.group(1) + "\u0e33", text)
+    text = _THAI_TONE_BEFORE_VOWEL.sub(r"\2\1", text)
+    return _THAI_REPEATED_MARK.sub(r"\1", text)
+
+
+def decode_text(content: bytes) -> str:
+    """UTF-8 (with or without BOM), else Windows Thai (cp874, a superset of TIS-620)"""
+    for encoding in ("utf-8-sig", "cp874"):
+        try:
+            return content.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+    return content.decode("utf-8", errors="replace")
+
+
+def csv_to_text(text: str, title: str, delimiter: Optional[str] = None) -> Optional[str]:
+    """
+    One line per row with every value labelled by its column, so each
+    chunk the vector store cuts is self-describing. None if not a table.
+    """
+    if delimiter is None:
+        try:
+            delimiter = csv.Sniffer().sniff(text[:4096], delimiters=",;\t|").delimiter
+        except csv.Error:
+            delimiter = ","
+    try:
+        rows = [row for row in csv.reader(io.StringIO(text), delimiter=delimiter) if any(c.strip() for c in row)]
+    except csv.Error:
+        return None
+    if not rows:
+        return None
+
+    header = [name.strip() or f"Column {i + 1}" for i, name in enumerate(rows[0])]
+    lines = [f"# {title}", "", f"Columns: {', '.join(header)}", ""]
+    for number, row in enumerate(rows[1:], 1):
+        cells = [
+            f"{header[i] if i < len(header) else f'Column {i + 1}'}: {value.strip()}"
+            for i, value in enumerate(row)
+            if value.strip()
+        ]
+        lines.append(f"Row {number}: " + "; ".join(cells))
+    return "\n".join(lines) + "\n"
+
+
+class _HTMLText(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self.title: List[str] = []
+        self._skip: List[str] = []  # Open skipped elements
+        self._in_title = False
+        self._pre = 0
+        self._content = 0  # Inside <main> or <article>
+        self._cells = 0  # Cells already written in the current table row
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]):
+        if tag == "title":
+            self._in_title = True
+            return
+        attributes = dict(attrs)
+        if self._skip or self._is_boilerplate(tag, attributes):
+            if tag not in _VOID_TAGS:
+                self._skip.append(tag)
+            return
+        if tag in ("main", "article"):
+            self._content += 1
+        if tag == "pre":
+            self._pre += 1
+        if tag in _BLOCK_TAGS:
+            self.parts.append("\n" + _KEEP_INDENT if tag == "pre" else "\n")
+        if tag in ("h1", "h2", "h3", "h4", "h5", "h6"):
+            self.parts.append("#" * int(tag[1]) + " ")
+        elif tag == "li":
+            self.parts.append("- ")
+        elif tag == "tr":
+            self._cells = 0
+        elif tag in ("td", "th"):
+            if self._cells:
+                self.parts.append(" | ")
+            self._cells += 1
+        elif tag == "img" and attributes.get("alt"):
+            self.parts.append(f" {attributes['alt']} ")
+
+    def handle_endtag(self, tag: str):
+        if tag == "title":
+            self._in_title = False
+            return
+        if self._skip:
+            if tag in self._skip:
+                # Also closes skipped elements left open inside it
+                while self._skip.pop() != tag:
+                    pass
+            return
+        if tag in ("main", "article"):
+            self._content = max(self._content - 1, 0)
+        if tag == "pre":
+            self._pre = max(self._pre - 1, 0)
+        if tag in _BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_data(self, data: str):
+        if self._in_title:
+            self.title.append(data)
+        elif self._skip:
+            return
+        elif self._pre:
+            self.parts.append(data.replace("\n", "\n" + _KEEP_INDENT))
+        else:
+            self.parts.append(_SPACES.sub(" ", data.replace("\n", " ")))
+
+    def _is_boilerplate(self, tag: str, attributes: Dict[str, Optional[str]]) -> bool:
+        if tag in _SKIP_TAGS or attributes.get("role") in _SKIP_ROLES:
+            return True
+        if attributes.get("aria-hidden") == "true" or "hidden" in attributes:
+            return True
+        # A page header is site chrome; an article's header is content
+        return tag == "header" and not self._content
+
+
+def html_to_text(text: str) -> str:
+    """Readable text of an HTML page as Markdown-ish lines, without markup and page chrome"""
+    parser = _HTMLText()
+    parser.feed(text)
+    parser.close()
+
+    lines = []
+    for line in "".join(parser.parts).split("\n"):
+        if line.startswith(_KEEP_INDENT):
+            lines.append(line[1:].rstrip())
+        else:
+            lines.append(line.strip())
+    body = _BLANK_LINES.sub("\n\n", "\n".join(lines)).strip()
+
+    title = _SPACES.sub(" ", "".join(parser.title)).strip()
+    if title and not body.lstrip("# ").startswith(title):
+        body = f"# {title}\n\n{body}"
+    return body + "\n"
+
+
+def normalize_document(content: bytes, filename: str) -> Optional[Tuple[bytes, str]]:
+    """
+    (content, filename) to upload instead of an upload: CSV/TSV as labelled
+    rows and HTML as clean text (both as .md, which file_search accepts),
+    plain text re-encoded as normalized UTF-8. None to upload the original.
+    Runs in worker processes, so it only uses its arguments.
+    """
+    base, ext = os.path.splitext(filename)
+    ext = ext.lower()
+    if ext not in CONVERTED_EXTENSIONS and ext not in TEXT_EXTENSIONS:
+        return None
+
+    text = normalize_thai(decode_text(content))
+    if ext in (".csv", ".tsv"):
+        text = csv_to_text(text, filename, "\t" if ext == ".tsv" else None)
+        if text is None:
+            return None
+    elif ext in (".html", ".htm"):
+        text = html_to_text(text)
+
+    normalized = text.encode("utf-8")
+    if ext in TEXT_EXTENSIONS:
+        return (normalized, filename) if normalized != content else None
+    return normalized, base + ".md"
+
+
+class NormalizedDocument:
+    """Result of normalizing one upload; content is None when the original should be sent"""
+
+    def __init__(self, original_size: int, content: Optional[bytes] = None, filename: Optional[str] = None):
+        self.original_size = original_size
+        self.content = content
+        self.filename = filename
+
+    @property
+    def size(self) -> int:
+        return len(self.content) if self.content is not None else self.original_size
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "normalized": self.content is not None,
+            "original_bytes": self.original_size,
+            "bytes": self.size,
+            "uploaded_as": self.filename
+        }
+
+
+class DocumentNormalizer:
+    """
+    Converts text-like uploads before they go to OpenAI (see
+    normalize_document). Small files are converted on a thread; files of
+    at least process_min_bytes go to a process pool so a large CSV or page
+    does not hold the GIL the event loop needs. Results are cached by the
+    SHA-256 of the original (LRU, bounded in bytes), and concurrent
+    uploads of the same content share one job.
+    """
+
+    def __init__(
+        self,
+        process_min_bytes: Optional[int] = None,
+        workers: Optional[int] = None,
+        cache_max_bytes: Optional[int] = None
+    ):
+        self.enabled = os.getenv("DOCUMENT_NORMALIZE_ENABLED", "true").lower() == "true"
+        self.process_min_bytes = process_min_bytes if process_min_bytes is not None else int(
+            os.getenv("DOCUMENT_PROCESS_MIN_BYTES", 256 * 1024)
+        )
+        self.workers = workers or int(os.getenv("DOCUMENT_PROCESS_WORKERS", 2))
+        self.cache_max_bytes = cache_max_bytes if cache_max_bytes is not None else int(
+            os.getenv("DOCUMENT_CACHE_MAX_BYTES", 32 * 1024 * 1024)
+        )
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._cache: "OrderedDict[str, NormalizedDocument]" = OrderedDict()
+        self._cache_bytes = 0
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+        # Counters
+        self.processed = 0
+        self.normalized = 0
+        self.in_process_pool = 0
+        self.errors = 0
+        self.cache_hits = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def handles(self, filename: Optional[str]) -> bool:
+        ext = os.path.splitext(filename or "")[1].lower()
+        return self.enabled and (ext in CONVERTED_EXTENSIONS or ext in TEXT_EXTENSIONS)
+
+    async def process(self, file: BinaryIO, sha256: str, filename: str, size: int) -> NormalizedDocument:
+        """Normalize the upload in file (seekable, size bytes with this hash)"""
+        if not self.handles(filename):
+            return NormalizedDocument(size)
+
+        cached = self._cache.get(sha256)
+        if cached is not None:
+            self.cache_hits += 1
+            self._cache.move_to_end(sha256)
+            return self._renamed(cached, filename)
+
+        future = self._inflight.get(sha256)
+        if future is None:
+            future = asyncio.ensure_future(self._normalize(file, filename, size))
+            self._inflight[sha256] = future
+            future.add_done_callback(lambda done: self._finish(sha256, done))
+        else:
+            self.cache_hits += 1
+        # shield() keeps the shared job running if this caller disconnects
+        return self._renamed(await asyncio.shield(future), filename)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "processed": self.processed,
+            "normalized": self.normalized,
+            "in_process_pool": self.in_process_pool,
+            "errors": self.errors,
+            "cache_hits": self.cache_hits,
+            "cache_entries": len(self._cache),
+            "cache_bytes": self._cache_bytes,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out
+        }
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def _normalize(self, file: BinaryIO, filename: str, size: int) -> NormalizedDocument:
+        try:
+            data = await asyncio.to_thread(self._read, file)
+            if size >= self.process_min_bytes:
+                self.in_process_pool += 1
+                if self._pool is None:
+                    # spawn: forking a process that runs threads (logging, SQLite) is unsafe
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                    )
+                result = await asyncio.get_running_loop().run_in_executor(self._pool, normalize_document, data, filename)
+            else:
+                result = await asyncio.to_thread(normalize_document, data, filename)
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                self._pool = None
+            self.errors += 1
+            log_event(logger, logging.WARNING, "document normalization failed, uploading the original",
+                      filename=filename, bytes=size, error=str(e))
+            return NormalizedDocument(size)
+        if result is None:
+            return NormalizedDocument(size)
+        return NormalizedDocument(size, *result)
+
+    @staticmethod
+    def _read(file: BinaryIO) -> bytes:
+        try:
+            file.seek(0)
+            return file.read()
+        finally:
+            file.seek(0)
+
+    def _finish(self, sha256: str, future: asyncio.Future):
+        self._inflight.pop(sha256, None)
+        if future.cancelled():
+            return
+        result = future.result()
+        self.processed += 1
+        self.bytes_in += result.original_size
+        self.bytes_out += result.size
+        document_normalize_bytes.inc(result.original_size, kind="original")
+        document_normalize_bytes.inc(result.size, kind="uploaded")
+        if result.content is not None:
+            self.normalized += 1
+
+        self._cache[sha256] = result
+        self._cache_bytes += len(result.content or b"")
+        while self._cache_bytes > self.cache_max_bytes and self._cache:
+            _, evicted = self._cache.popitem(last=False)
+            self._cache_bytes -= len(evicted.content or b"")
+
+    @staticmethod
+    def _renamed(result: NormalizedDocument, filename: str) -> NormalizedDocument:
+        """result under the upload's own name (with the converted extension)"""
+        if result.content is None:
+            return result
+        extension = os.path.splitext(result.filename)[1]
+        return NormalizedDocument(result.original_size, result.content, os.path.splitext(filename)[0] + extension)
+
+
+# Global instance
+document_normalizer = DocumentNormalizer()
@@ -0,0 +1,172 @@
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.logging_config import get_logger, log_event
+from app.models.chat import Citation
+from app.services.citations import filename_from_marker
+from app.services.metrics import file_metadata_lookups
+from app.services.openai_service import openai_service
+from app.services.upload_index import upload_index
+
+FileMetadata = Dict[str, Any]  # {"filename", "bytes"}
+MetadataFetcher = Callable[[str], Awaitable[FileMetadata]]
+LocalLookup = Callable[[List[str]], Dict[str, FileMetadata]]
+
+logger = get_logger("file_metadata")
+
+
+class FileMetadataCache:
+    """
+    Process-wide LRU cache (with TTL) of OpenAI file metadata for citations.
+
+    resolve() answers a whole batch of file_ids at once: entries in memory
+    first, then one query on the upload index (files uploaded through this
+    app), and only then one files.retrieve per remaining file, bounded by a
+    semaphore. Concurrent lookups of the same file share a single retrieve,
+    and files that no longer exist are remembered for negative_ttl.
+    """
+
+    def __init__(
+        self,
+        fetch: Optional[MetadataFetcher] = None,
+        local_lookup: Optional[LocalLookup] = None,
+        max_entries: Optional[int] = None,
+        ttl: Optional[float] = None,
+        negative_ttl: Optional[float] = None,
+        concurrency: Optional[int] = None
+    ):
+        self._fetch = fetch or (lambda file_id: openai_service.retrieve_file(file_id))
+        self._local_lookup = local_lookup or (lambda file_ids: upload_index.file_metadata(file_ids))
+        self.max_entries = max_entries or int(os.getenv("FILE_METADATA_CACHE_SIZE", 1000))
+        self.ttl = ttl if ttl is not None else float(os.getenv("FILE_METADATA_TTL", 86400))
+        self.negative_ttl = negative_ttl if negative_ttl is not None else float(os.getenv("FILE_METADATA_NEGATIVE_TTL", 300))
+        self._semaphore = asyncio.Semaphore(concurrency or int(os.getenv("FILE_METADATA_CONCURRENCY", 4)))
+        # file_id -> (metadata or None for a missing file, expires_at)
+        self._entries: "OrderedDict[str, Tuple[Optional[FileMetadata], float]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+        # Counters
+        self.hits = 0
+        self.index_hits = 0
+        self.fetches = 0
+        self.not_found = 0
+        self.errors = 0
+
+    async def resolve(self, file_ids: List[str]) -> Dict[str, Optional[FileMetadata]]:
+        """Metadata for each distinct file_id (None if unknown or the lookup failed)"""
+        result: Dict[str, Optional[FileMetadata]] = {}
+        missing = []
+        for file_id in dict.fromkeys(file_ids):
+            cached = self._get(file_id)
+            if cached is not None:
+                self.hits += 1
+                file_metadata_lookups.inc(source="memory")
+                result[file_id] = cached[0]
+            else:
+                missing.append(file_id)
+        if not missing:
+            return result
+
+        local = self._local_lookup(missing)
+        for file_id, metadata in local.items():
+            self.index_hits += 1
+            file_metadata_lookups.inc(source="index")
+            self._put(file_id, metadata, self.ttl)
+            result[file_id] = metadata
+
+        remaining = [file_id for file_id in missing if file_id not in local]
+        fetched = await asyncio.gather(*(self._fetch_shared(file_id) for file_id in remaining))
+        result.update(zip(remaining, fetched))
+        return result
+
+    def invalidate(self, file_id: Optional[str] = None):
+        """Drop one file, or every entry when file_id is None"""
+        if file_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(file_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.index_hits + self.fetches
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "index_hits": self.index_hits,
+            "fetches": self.fetches,
+            "not_found": self.not_found,
+            "errors": self.errors,
+            "hit_rate": (self.hits + self.index_hits) / lookups if lookups else 0.0,
+            "fetching": len(self._inflight)
+        }
+
+    def _get(self, file_id: str) -> Optional[Tuple[Optional[FileMetadata], float]]:
+        entry = self._entries.get(file_id)
+        if entry is None:
+            return None
+        if entry[1] <= time.monotonic():
+            del self._entries[file_id]
+            return None
+        self._entries.move_to_end(file_id)
+        return entry
+
+    def _put(self, file_id: str, metadata: Optional[FileMetadata], ttl: float):
+        self._entries[file_id] = (metadata, time.monotonic() + ttl)
+        self._entries.move_to_end(file_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def _fetch_shared(self, file_id: str) -> Optional[FileMetadata]:
+        task = self._inflight.get(file_id)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(self._fetch_one(file_id))
+            self._inflight[file_id] = task
+        # shield() keeps the shared fetch running if this caller is cancelled
+        return await asyncio.shield(task)
+
+    async def _fetch_one(self, file_id: str) -> Optional[FileMetadata]:
+        try:
+            async with self._semaphore:
+                self.fetches += 1
+                metadata = await self._fetch(file_id)
+            file_metadata_lookups.inc(source="api")
+            self._put(file_id, metadata, self.ttl)
+            return metadata
+        except Exception as e:
+            if getattr(e, "status_code", None) == 404:
+                self.not_found += 1
+                file_metadata_lookups.inc(source="not_found")
+                self._put(file_id, None, self.negative_ttl)
+            else:
+                # Not cached: the next answer citing the file tries again
+                self.errors += 1
+                file_metadata_lookups.inc(source="error")
+                log_event(logger, logging.WARNING, "file metadata lookup failed", file_id=file_id, error=str(e))
+            return None
+        finally:
+            self._inflight.pop(file_id, None)
+
+
+async def resolve_citations(citations: Optional[List[Dict[str, Any]]], cache: Optional[FileMetadataCache] = None) -> Optional[List[Citation]]:
+    """
+    Citation models for raw citations (see message_text_and_citations), with
+    filenames from the metadata cache; unknown files keep the name written
+    in the marker. Returns None when there is nothing to cite.
+    """
+    if not citations:
+        return None
+    metadata = await (cache or file_metadata).resolve([c["file_id"] for c in citations])
+    return [
+        Citation(
+            filename=(metadata.get(c["file_id"]) or {}).get("filename") or filename_from_marker(c["marker"]),
+            **c
+        )
+        for c in citations
+    ]
+
+
+# Global instance
+file_metadata = FileMetadataCache()
@@ -0,0 +1,96 @@
+import importlib.util
+import os
+from typing import Any, Dict, Optional
+
+import httpx
+
+
+class HttpClientPool:
+    """
+    Application-wide httpx.AsyncClient shared by the OpenAI SDK and raw
+    REST calls (vector store batches, Google OAuth), so connections are
+    kept alive and reused instead of paying TCP/TLS setup per request.
+
+    The client is created on first use (or in the FastAPI lifespan) and
+    closed on shutdown.
+    """
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+        self.requests = 0
+        self.new_connections = 0
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = self._build_client()
+        return self._client
+
+    def start(self) -> httpx.AsyncClient:
+        """Create the pool eagerly (called from the app lifespan)"""
+        return self.client
+
+    async def close(self):
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool statistics for monitoring"""
+        open_connections = 0
+        idle_connections = 0
+        http2_enabled = False
+        if self._client is not None and not self._client.is_closed:
+            http2_enabled = self._http2_available()
+            # httpcore does not expose pool state publicly; read it defensively
+            pool = getattr(getattr(self._client, "_transport", None), "_pool", None)
+            for connection in getattr(pool, "connections", []):
+                if not connection.is_closed():
+                    open_connections += 1
+                    if connection.is_idle():
+                        idle_connections += 1
+
+        return {
+            "open_connections": open_connections,
+            "idle_connections": idle_connections,
+            "requests": self.requests,
+            "new_connections": self.new_connections,
+            "reuse_ratio": (
+                1 - self.new_connections / self.requests if self.requests else 0.0
+            ),
+            "http2": http2_enabled
+        }
+
+    def _build_client(self) -> httpx.AsyncClient:
+        limits = httpx.Limits(
+            max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", 100)),
+            max_keepalive_connections=int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", 20)),
+            keepalive_expiry=float(os.getenv("HTTP_KEEPALIVE_EXPIRY", 30))
+        )
+        timeout = httpx.Timeout(
+            float(os.getenv("HTTP_TIMEOUT", 60)),
+            connect=float(os.getenv("HTTP_CONNECT_TIMEOUT", 10))
+        )
+        return httpx.AsyncClient(
+            limits=limits,
+            timeout=timeout,
+            # HTTP/2 needs the optional h2 package (httpx[http2])
+            http2=self._http2_available(),
+            event_hooks={"request": [self._on_request]}
+        )
+
+    @staticmethod
+    def _http2_available() -> bool:
+        return importlib.util.find_spec("h2") is not None
+
+    async def _on_request(self, request: httpx.Request):
+        self.requests += 1
+        request.extensions["trace"] = self._trace
+
+    async def _trace(self, event_name: str, info: Dict[str, Any]):
+        if event_name == "connection.connect_tcp.complete":
+            self.new_connections += 1
+
+
+# Global instance
+http_pool = HttpClientPool()
@@ -0,0 +1,264 @@
+import asyncio
+import io
+import logging
+import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, BinaryIO, Dict, Optional, Tuple
+
+from app.logging_config import get_logger, log_event
+from app.services.metrics import image_preprocess_bytes
+
+# format name -> (Pillow format, content type, extension)
+OUTPUT_FORMATS = {
+    "webp": ("WEBP", "image/webp", ".webp"),
+    "jpeg": ("JPEG", "image/jpeg", ".jpg"),
+}
+
+logger = get_logger("images")
+
+
+@lru_cache(maxsize=None)
+def _pillow() -> Optional[Tuple[Any, Any]]:
+    """(Image, ImageOps) from Pillow, imported on first image; None if not installed"""
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:  # Images are uploaded unchanged
+        return None
+    return Image, ImageOps
+
+
+class ProcessedImage:
+    """Result of preprocessing one upload; content is None when the original should be sent"""
+
+    def __init__(
+        self,
+        original_size: int,
+        content: Optional[bytes] = None,
+        filename: Optional[str] = None,
+        content_type: Optional[str] = None,
+        width: Optional[int] = None,
+        height: Optional[int] = None
+    ):
+        self.original_size = original_size
+        self.content = content
+        self.filename = filename
+        self.content_type = content_type
+        self.width = width
+        self.height = height
+
+    @property
+    def size(self) -> int:
+        return len(self.content) if self.content is not None else self.original_size
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "recompressed": self.content is not None,
+            "original_bytes": self.original_size,
+            "bytes": self.size,
+            "width": self.width,
+            "height": self.height,
+            "content_type": self.content_type
+        }
+
+
+class ImagePreprocessor:
+    """
+    Downscales and recompresses image uploads before they go to OpenAI.
+
+    Images larger than max_dimension on either side are resized to fit
+    (vision models scale them down to 2048px anyway, so the extra pixels
+    only cost upload time). Images are re-encoded as JPEG (default) or
+    WebP without their EXIF metadata, after applying the EXIF orientation.
+    The original is kept when re-encoding gains nothing: animated images,
+    formats Pillow cannot read, images below min_bytes that need neither
+    (checked from the header, without decoding), and images whose
+    re-encoded form is not smaller. WebP files are about half the size of
+    JPEG but take ~1.5x the CPU time to encode
+    (benchmarks/bench_images.py).
+
+    Decoding and encoding run on a small dedicated thread pool. Results
+    are cached by the SHA-256 of the original (LRU, bounded in bytes), and
+    concurrent uploads of the same content share one job.
+    """
+
+    def __init__(
+        self,
+        max_dimension: Optional[int] = None,
+        output_format: Optional[str] = None,
+        quality: Optional[int] = None,
+        min_bytes: Optional[int] = None,
+        workers: Optional[int] = None,
+        cache_max_bytes: Optional[int] = None
+    ):
+        self.enabled = os.getenv("IMAGE_PREPROCESS_ENABLED", "true").lower() == "true"
+        self.max_dimension = max_dimension or int(os.getenv("IMAGE_MAX_DIMENSION", 2048))
+        self.output_format = (output_format or os.getenv("IMAGE_OUTPUT_FORMAT", "jpeg")).lower()
+        if self.output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"IMAGE_OUTPUT_FORMAT must be one of {', '.join(OUTPUT_FORMATS)}")
+        self.quality = quality or int(os.getenv("IMAGE_QUALITY", 85))
+        self.min_bytes = min_bytes if min_bytes is not None else int(os.getenv("IMAGE_RECOMPRESS_MIN_BYTES", 512 * 1024))
+        self.workers = workers or int(os.getenv("IMAGE_PREPROCESS_WORKERS", 2))
+        self.cache_max_bytes = cache_max_bytes if cache_max_bytes is not None else int(
+            os.getenv("IMAGE_CACHE_MAX_BYTES", 32 * 1024 * 1024)
+        )
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._cache: "OrderedDict[str, ProcessedImage]" = OrderedDict()
+        self._cache_bytes = 0
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+        # Counters
+        self.processed = 0
+        self.recompressed = 0
+        self.kept = 0
+        self.errors = 0
+        self.cache_hits = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    async def process(self, file: BinaryIO, sha256: str, filename: Optional[str], size: int) -> ProcessedImage:
+        """Preprocess the image in file (a seekable upload of size bytes with this hash)"""
+        if not self.enabled or _pillow() is None:
+            return ProcessedImage(size)
+
+        cached = self._cache.get(sha256)
+        if cached is not None:
+            self.cache_hits += 1
+            self._cache.move_to_end(sha256)
+            return self._renamed(cached, filename)
+
+        future = self._inflight.get(sha256)
+        if future is None:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="image")
+            future = asyncio.get_running_loop().run_in_executor(self._executor, self._process_file, file, size)
+            self._inflight[sha256] = future
+            future.add_done_callback(lambda done: self._finish(sha256, done))
+        else:
+            self.cache_hits += 1
+        # shield() keeps the shared job running if this caller disconnects
+        return self._renamed(await asyncio.shield(future), filename)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "available": _pillow() is not None,
+            "max_dimension": self.max_dimension,
+            "output_format": self.output_format,
+            "processed": self.processed,
+            "recompressed": self.recompressed,
+            "kept_original": self.kept,
+            "errors": self.errors,
+            "cache_hits": self.cache_hits,
+            "cache_entries": len(self._cache),
+            "cache_bytes": self._cache_bytes,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "saved_ratio": 1 - self.bytes_out / self.bytes_in if self.bytes_in else 0.0
+        }
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _finish(self, sha256: str, future: asyncio.Future):
+        self._inflight.pop(sha256, None)
+        if not future.cancelled():
+            self._record(sha256, future.result())
+
+    def _record(self, sha256: str, result: ProcessedImage):
+        self.processed += 1
+        self.bytes_in += result.original_size
+        self.bytes_out += result.size
+        image_preprocess_bytes.inc(result.original_size, kind="original")
+        image_preprocess_bytes.inc(result.size, kind="uploaded")
+        if result.content is None:
+            self.kept += 1
+        else:
+            self.recompressed += 1
+
+        self._cache[sha256] = result
+        self._cache_bytes += len(result.content or b"")
+        while self._cache_bytes > self.cache_max_bytes and self._cache:
+            _, evicted = self._cache.popitem(last=False)
+            self._cache_bytes -= len(evicted.content or b"")
+
+    def _renamed(self, result: ProcessedImage, filename: Optional[str]) -> ProcessedImage:
+        """result with the upload's own name and the output format's extension"""
+        if result.content is None:
+            return result
+        extension = OUTPUT_FORMATS[self.output_format][2]
+        return ProcessedImage(
+            result.original_size, result.content, os.path.splitext(filename or "image")[0] + extension,
+            result.content_type, result.width, result.height
+        )
+
+    def _process_file(self, file: BinaryIO, size: int) -> ProcessedImage:
+        # Runs on the image thread pool
+        try:
+            file.seek(0)
+            data = file.read()
+            return self.recompress(data)
+        except Exception as e:
+            self.errors += 1
+            log_event(logger, logging.WARNING, "image preprocessing failed, uploading the original",
+                      bytes=size, error=str(e))
+            return ProcessedImage(size)
+        finally:
+            file.seek(0)
+
+    def recompress(self, data: bytes) -> ProcessedImage:
+        """Downscale and re-encode image bytes (blocking; see the class docstring)"""
+        Image, ImageOps = _pillow()
+        pil_format, content_type, _ = OUTPUT_FORMATS[self.output_format]
+        with Image.open(io.BytesIO(data)) as original:
+            if getattr(original, "n_frames", 1) > 1:
+                return ProcessedImage(len(data))
+            width, height = original.size
+            needs_resize = max(width, height) > self.max_dimension
+            has_metadata = "exif" in original.info or bool(original.getexif())
+            if not needs_resize and not has_metadata and len(data) < self.min_bytes:
+                return ProcessedImage(len(data))
+            if needs_resize and original.format == "JPEG":
+                # Let the decoder skip detail we are about to throw away (1/2, 1/4, 1/8 scale)
+                scale = self.max_dimension / max(width, height)
+                original.draft("RGB", (int(width * scale) + 1, int(height * scale) + 1))
+            icc_profile = original.info.get("icc_profile")
+
+            image = ImageOps.exif_transpose(original)
+            if needs_resize:
+                image.thumbnail((self.max_dimension, self.max_dimension), Image.Resampling.LANCZOS, reducing_gap=3.0)
+            image = self._output_mode(image, pil_format)
+
+            buffer = io.BytesIO()
+            options: Dict[str, Any] = {"quality": self.quality}
+            if pil_format == "JPEG":
+                options["optimize"] = True
+            if icc_profile:
+                options["icc_profile"] = icc_profile
+            image.save(buffer, pil_format, **options)
+
+        content = buffer.getvalue()
+        if not needs_resize and not has_metadata and len(content) >= len(data):
+            return ProcessedImage(len(data))
+        return ProcessedImage(len(data), content, None, content_type, image.width, image.height)
+
+    @staticmethod
+    def _output_mode(image: Any, pil_format: str) -> Any:
+        """RGB, or RGBA for WebP images that really use transparency"""
+        if image.mode in ("RGBA", "LA", "PA") or (image.mode == "P" and "transparency" in image.info):
+            image = image.convert("RGBA")
+            if image.getchannel("A").getextrema()[0] < 255:
+                if pil_format == "WEBP":
+                    return image
+                Image, _ = _pillow()
+                background = Image.new("RGB", image.size, (255, 255, 255))
+                background.paste(image, mask=image.getchannel("A"))
+                return background
+        return image.convert("RGB") if image.mode != "RGB" else image
+
+
+# Global instance
+image_preprocessor = ImagePreprocessor()
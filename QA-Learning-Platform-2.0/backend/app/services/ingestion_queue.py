@@ -0,0 +1,223 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.logging_config import get_logger, log_event
+from app.services.upload_index import upload_index
+from app.services.vector_store_batcher import vector_store_batcher
+
+QUEUED = "queued"
+IN_PROGRESS = "in_progress"
+COMPLETED = "completed"
+FAILED = "failed"
+
+logger = get_logger("ingestion")
+
+
+class IngestionJob:
+    def __init__(self, file_id: str, vector_store_id: str):
+        self.file_id = file_id
+        self.vector_store_id = vector_store_id
+        self.status = QUEUED
+        self.attempts = 0
+        self.error: Optional[str] = None
+        self.created_at = datetime.now()
+        self.enqueued_at = time.monotonic()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.done = asyncio.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (COMPLETED, FAILED)
+
+    def to_dict(self) -> Dict[str, Any]:
+        def ms(start: Optional[float], end: Optional[float]) -> Optional[int]:
+            if start is None:
+                return None
+            return int(((end or time.monotonic()) - start) * 1000)
+
+        return {
+            "file_id": self.file_id,
+            "vector_store_id": self.vector_store_id,
+            "status": self.status,
+            "attempts": self.attempts,
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "queue_wait_ms": ms(self.enqueued_at, self.started_at),
+            "indexing_ms": ms(self.started_at, self.finished_at),
+            "total_ms": ms(self.enqueued_at, self.finished_at)
+        }
+
+
+class IngestionQueue:
+    """
+    Background queue that adds uploaded files to session vector stores.
+
+    /upload enqueues a job straight away when it knows the session, so
+    indexing overlaps with the user typing; /chat only waits for the files
+    it references that are not ready. A file has one job per vector store.
+    Jobs run with bounded concurrency and are retried with backoff; jobs that
+    run at the same time share file_batches calls via vector_store_batcher.
+    """
+
+    def __init__(
+        self,
+        concurrency: Optional[int] = None,
+        max_attempts: Optional[int] = None,
+        job_timeout: Optional[int] = None,
+        max_finished_jobs: int = 1000
+    ):
+        self.concurrency = concurrency or int(os.getenv("INGESTION_CONCURRENCY", 16))
+        self.max_attempts = max_attempts or int(os.getenv("INGESTION_MAX_ATTEMPTS", 3))
+        self.job_timeout = job_timeout or int(os.getenv("INGESTION_JOB_TIMEOUT", 120))
+        self.max_finished_jobs = max_finished_jobs
+
+        # (file_id, vector_store_id) -> job
+        self.jobs: Dict[Tuple[str, str], IngestionJob] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+
+    def enqueue(self, file_id: str, vector_store_id: str) -> IngestionJob:
+        """Queue a file for indexing; returns the existing job if one is pending or done"""
+        job = self.jobs.get((file_id, vector_store_id))
+        if job and job.status != FAILED:
+            return job
+
+        job = IngestionJob(file_id, vector_store_id)
+        self.jobs[(file_id, vector_store_id)] = job
+
+        if not upload_index.filter_not_in_vector_store([file_id], vector_store_id):
+            # Already indexed (e.g. a deduplicated upload)
+            job.started_at = job.enqueued_at
+            self._finish(job, COMPLETED)
+        else:
+            self._ensure_workers()
+            self._queue.put_nowait(job)
+
+        self._prune()
+        return job
+
+    def get(self, file_id: str, vector_store_id: Optional[str] = None) -> Optional[IngestionJob]:
+        """The file's job for vector_store_id, or its most recent job for any store"""
+        if vector_store_id is not None:
+            return self.jobs.get((file_id, vector_store_id))
+        jobs = [job for (fid, _), job in self.jobs.items() if fid == file_id]
+        return max(jobs, key=lambda job: job.enqueued_at) if jobs else None
+
+    async def wait_for(self, file_ids: List[str], vector_store_id: str, timeout: float) -> Dict[str, IngestionJob]:
+        """
+        Make sure every file is queued for the vector store and wait until all
+        of them finish or the timeout expires. Files that are already ready
+        return immediately.
+        """
+        jobs = {file_id: self.enqueue(file_id, vector_store_id) for file_id in file_ids}
+        pending = [job.done.wait() for job in jobs.values() if not job.finished]
+        if pending:
+            try:
+                await asyncio.wait_for(asyncio.gather(*pending), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+        return jobs
+
+    def stats(self) -> Dict[str, Any]:
+        counts: Dict[str, int] = {QUEUED: 0, IN_PROGRESS: 0, COMPLETED: 0, FAILED: 0}
+        for job in self.jobs.values():
+            counts[job.status] += 1
+        return {
+            "concurrency": self.concurrency,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "jobs": counts
+        }
+
+    def forget_vector_store(self, vector_store_id: str):
+        """Drop the finished jobs of a deleted vector store"""
+        for key, job in list(self.jobs.items()):
+            if key[1] == vector_store_id and job.finished:
+                del self.jobs[key]
+
+    async def drain(self, timeout: float):
+        """Wait for queued and running jobs to finish (used on shutdown)"""
+        if self._queue is None or not self._workers:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            log_event(logger, logging.WARNING, "jobs still queued after drain",
+                      queued=self._queue.qsize(), timeout=timeout)
+
+    async def close(self):
+        for worker in self._workers:
+            worker.cancel()
+        if self._workers:
+            await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+
+    def _ensure_workers(self):
+        self._workers = [w for w in self._workers if not w.done()]
+        if self._queue is None or not self._workers:
+            loop = asyncio.get_running_loop()
+            if self._queue is None:
+                self._queue = asyncio.Queue()
+            self._workers = [loop.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            except Exception as e:
+                logger.exception("ingestion job failed", extra={"fields": {"file_id": job.file_id}})
+                job.error = str(e)
+                self._finish(job, FAILED)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: IngestionJob):
+        job.status = IN_PROGRESS
+        job.started_at = time.monotonic()
+
+        while job.attempts < self.max_attempts:
+            job.attempts += 1
+            # Concurrent jobs are coalesced into shared file_batches calls
+            result = await vector_store_batcher.add(job.file_id, job.vector_store_id)
+            if result["success"] and result.get("failed_files", 0) == 0:
+                upload_index.mark_in_vector_store([job.file_id], job.vector_store_id)
+                self._finish(job, COMPLETED)
+                return
+
+            job.error = result.get("error_message") or result["status"]
+            log_event(logger, logging.WARNING, "ingestion attempt failed",
+                      file_id=job.file_id, attempt=job.attempts, error=job.error)
+            if result["success"]:
+                # The batch completed but the file itself could not be processed
+                break
+            if job.attempts < self.max_attempts:
+                await asyncio.sleep(2 ** job.attempts)
+
+        self._finish(job, FAILED)
+
+    def _finish(self, job: IngestionJob, status: str):
+        job.status = status
+        job.finished_at = time.monotonic()
+        job.done.set()
+
+    def _prune(self):
+        """Drop the oldest finished jobs; completion is also recorded in upload_index"""
+        overflow = len(self.jobs) - self.max_finished_jobs
+        if overflow <= 0:
+            return
+        finished = sorted(
+            (job for job in self.jobs.values() if job.finished),
+            key=lambda job: job.finished_at
+        )
+        for job in finished[:overflow]:
+            del self.jobs[(job.file_id, job.vector_store_id)]
+
+
+# Global instance
+ingestion_queue = IngestionQueue()
@@ -0,0 +1,382 @@
+import asyncio
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from app.runtime import is_production
+
+DEFAULT_METRICS_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "data", "metrics")
+
+# Seconds; covers sub-millisecond cache hits up to multi-minute batches
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, float("inf"))
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        return self._header() + self._lines(self.snapshot())
+
+    def snapshot(self) -> List[list]:
+        """JSON-serializable [label values, value] entries"""
+        raise NotImplementedError
+
+    def merge(self, snapshots: List[List[list]]) -> List[list]:
+        """One set of entries from several workers' snapshots (summed)"""
+        merged: Dict[LabelValues, float] = {}
+        for entries in snapshots:
+            for key, value in entries:
+                merged[tuple(key)] = merged.get(tuple(key), 0) + value
+        return [[list(key), value] for key, value in merged.items()]
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def _lines(self, entries: List[list], labelnames: Optional[Sequence[str]] = None) -> List[str]:
+        names = self.labelnames if labelnames is None else labelnames
+        return [f"{self.name}{_labels(names, key)} {_format_value(value)}" for key, value in entries]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def snapshot(self) -> List[list]:
+        with self._lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+
+class Gauge(_Metric):
+    """A settable value, or one read from `function` at scrape time"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), function: Optional[Callable[[], float]] = None):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._function = function
+
+    def set(self, value: float, **labels: str):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: str):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def snapshot(self) -> List[list]:
+        if self._function is not None:
+            return [[[], float(self._function())]]
+        with self._lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        if self.buckets[-1] != float("inf"):
+            self.buckets += (float("inf"),)
+        # label values -> [per-bucket counts, sum]
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * len(self.buckets), [0.0]))
+            counts[index] += 1
+            total[0] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observe the duration of the with-block (also when it raises)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels: str) -> int:
+        entry = self._values.get(self._key(labels))
+        return sum(entry[0]) if entry else 0
+
+    def snapshot(self) -> List[list]:
+        """[label values, per-bucket counts, sum] entries"""
+        with self._lock:
+            return [[list(key), list(counts), total[0]] for key, (counts, total) in self._values.items()]
+
+    def merge(self, snapshots: List[List[list]]) -> List[list]:
+        merged: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+        for entries in snapshots:
+            for key, counts, total in entries:
+                if len(counts) != len(self.buckets):
+                    continue  # Written with other buckets (an older release)
+                merged_counts, merged_total = merged.setdefault(tuple(key), ([0] * len(self.buckets), [0.0]))
+                for index, count in enumerate(counts):
+                    merged_counts[index] += count
+                merged_total[0] += total
+        return [[list(key), counts, total[0]] for key, (counts, total) in merged.items()]
+
+    def _lines(self, entries: List[list], labelnames: Optional[Sequence[str]] = None) -> List[str]:
+        lines = []
+        for key, counts, total in entries:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = ("le", _format_value(bound))
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    """
+    Collects metrics and renders them in the Prometheus text format (0.0.4).
+
+    With a directory (the production profile, where several worker
+    processes each keep their own metrics) every worker writes a snapshot
+    of its metrics there, on a timer and whenever it answers a scrape, and
+    render() merges all snapshots: counters and histograms are summed over
+    every worker that has run since startup (run.py clears the directory),
+    and gauges are reported per live worker with a "worker" label. A scrape
+    therefore covers the whole server, up to write_interval behind for the
+    other workers.
+    """
+
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        worker: Optional[str] = None,
+        write_interval: Optional[float] = None
+    ):
+        self._metrics: Dict[str, _Metric] = {}
+        self.directory = directory
+        self.worker = worker or str(os.getpid())
+        self.write_interval = write_interval if write_interval is not None else float(
+            os.getenv("METRICS_WRITE_INTERVAL", 5)
+        )
+        self._writer_task: Optional[asyncio.Task] = None
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = (), function: Optional[Callable[[], float]] = None) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames, function))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        if not self.directory:
+            for metric in self._metrics.values():
+                lines.extend(metric.render())
+            return "\n".join(lines) + "\n"
+
+        self.write_snapshot()
+        snapshots = self._read_snapshots()
+        live = {worker: snapshot for worker, snapshot in snapshots.items() if _is_alive(worker)}
+        for metric in self._metrics.values():
+            lines.extend(metric._header())
+            if isinstance(metric, Gauge):
+                # Point-in-time values of one process: one series per worker
+                entries = [[key + [worker], value] for worker, snapshot in live.items()
+                           for key, value in snapshot.get(metric.name, [])]
+                lines.extend(metric._lines(entries, metric.labelnames + ("worker",)))
+            else:
+                lines.extend(metric._lines(metric.merge([s.get(metric.name, []) for s in snapshots.values()])))
+        return "\n".join(lines) + "\n"
+
+    def write_snapshot(self):
+        """Write this worker's metrics for the others to merge (atomically replaced)"""
+        if not self.directory:
+            return
+        snapshot = {name: metric.snapshot() for name, metric in self._metrics.items()}
+        path = os.path.join(self.directory, f"{self.worker}.json")
+        with open(path + ".tmp", "w") as f:
+            json.dump(snapshot, f)
+        os.replace(path + ".tmp", path)
+
+    def clear_snapshots(self):
+        """Remove every worker's snapshot (before starting a new set of workers)"""
+        if not self.directory:
+            return
+        for filename in os.listdir(self.directory):
+            if filename.endswith((".json", ".tmp")):
+                os.remove(os.path.join(self.directory, filename))
+
+    def start(self):
+        """Write snapshots periodically (call from the running event loop)"""
+        if self.directory and self.write_interval > 0 and self._writer_task is None:
+            self._writer_task = asyncio.get_running_loop().create_task(self._write_loop())
+
+    async def close(self):
+        if self._writer_task is not None:
+            self._writer_task.cancel()
+            await asyncio.gather(self._writer_task, return_exceptions=True)
+            self._writer_task = None
+        # Final counts, kept in the totals after this worker exits
+        self.write_snapshot()
+
+    def _read_snapshots(self) -> Dict[str, Dict[str, Any]]:
+        snapshots = {}
+        for filename in os.listdir(self.directory):
+            if not filename.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, filename)) as f:
+                    snapshots[filename[:-len(".json")]] = json.load(f)
+            except (OSError, ValueError):
+                continue
+        return snapshots
+
+    async def _write_loop(self):
+        while True:
+            await asyncio.sleep(self.write_interval)
+            try:
+                self.write_snapshot()
+            except OSError:
+                pass
+
+
+def _is_alive(worker: str) -> bool:
+    """Whether the worker process (named by pid) is still running"""
+    try:
+        os.kill(int(worker), 0)
+    except (ValueError, OverflowError, ProcessLookupError):
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+# Global registry and the chat pipeline metrics
+registry = Registry(os.getenv("METRICS_DIR", DEFAULT_METRICS_DIR) if is_production() else None)
+
+chat_stage_seconds = registry.histogram(
+    "chat_stage_seconds",
+    "Time spent in each stage of a chat request",
+    ["endpoint", "stage"]
+)
+upload_stage_seconds = registry.histogram(
+    "upload_stage_seconds",
+    "Time spent in each stage of an upload",
+    ["stage"]
+)
+vector_store_batch_seconds = registry.histogram(
+    "vector_store_batch_seconds",
+    "Time to add a file batch to the vector store, by stage",
+    ["stage"]
+)
+run_stage_seconds = registry.histogram(
+    "assistant_run_stage_seconds",
+    "Assistant run time split into queued, in_progress (model) and poll_delay",
+    ["stage"]
+)
+suggestions_seconds = registry.histogram(
+    "suggestions_generation_seconds",
+    "Time to generate initial suggestions",
+    ["result"]
+)
+openai_request_seconds = registry.histogram(
+    "openai_request_seconds",
+    "Latency of individual OpenAI API calls (each attempt)",
+    ["endpoint", "outcome"]
+)
+poll_iterations = registry.counter(
+    "status_poll_iterations_total",
+    "Status polls made by the shared poller",
+    ["kind"]
+)
+runs_in_flight = registry.gauge(
+    "assistant_runs_in_flight",
+    "Assistant runs currently being waited on or streamed"
+)
+file_metadata_lookups = registry.counter(
+    "file_metadata_lookups_total",
+    "Cited file lookups by where the metadata came from",
+    ["source"]
+)
+image_preprocess_bytes = registry.counter(
+    "image_preprocess_bytes_total",
+    "Image upload bytes before (original) and after (uploaded) preprocessing",
+    ["kind"]
+)
+document_normalize_bytes = registry.counter(
+    "document_normalize_bytes_total",
+    "Text document upload bytes before (original) and after (uploaded) normalization",
+    ["kind"]
+)
+session_vector_store_events = registry.counter(
+    "session_vector_store_events_total",
+    "Per-session vector stores created, released (session deleted) and reaped, and files deleted with them",
+    ["event"]
+)
@@ -1,99 +1,235 @@
 import os
-from openai import OpenAI
-from typing import List, Optional, Dict, Any, Tuple
-import time
+import httpx
+from typing import List, Optional, Dict, Any, AsyncIterator
 from datetime import datetime
 import json
-import httpx
+import logging
+import time
+from app.logging_config import get_logger, log_event
+from app.services.citations import message_text_and_citations, strip_citations
+from app.services.http_client import http_pool
+from app.services.provider import Provider
+from app.services.run_poller import run_poller
+from app.services.resilience import openai_resilience, UpstreamStatusError, RETRYABLE_STATUS
+from app.services.metrics import (
+    openai_request_seconds,
+    run_stage_seconds,
+    runs_in_flight,
+    suggestions_seconds,
+    vector_store_batch_seconds
+)
+
+logger = get_logger("openai")
 
 class OpenAIService:
     def __init__(self):
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise ValueError("OPENAI_API_KEY environment variable is not set")
-        self.client = OpenAI(api_key=api_key)
+        # Imported here: the SDK alone takes ~0.3s to import
+        from openai import AsyncOpenAI
+        # Retries are done by openai_resilience, so the SDK's own are disabled;
+        # the timeout bounds how long a degraded upstream can hold a request
+        self.client = AsyncOpenAI(
+            api_key=api_key,
+            http_client=http_pool.client,
+            max_retries=0,
+            timeout=httpx.Timeout(float(os.getenv("OPENAI_TIMEOUT", 60)), connect=5.0)
+        )
+        # OPENAI_BASE_URL (read by the SDK) also redirects the REST calls below
+        self.api_base = str(self.client.base_url).rstrip("/")
         self.assistant_id = os.getenv("ASSISTANT_ID")
         if not self.assistant_id:
             raise ValueError("ASSISTANT_ID environment variable is not set")
+        # DemoVector, the course material (read-only: attachments go to
+        # per-session stores, see session_vector_stores)
         self.vector_store_id = "vs_6937893e6974819181cb9f7400fd25e9"
 
-    def create_thread(self, initial_messages: Optional[List[Dict[str, Any]]] = None) -> str:
+    async def retrieve_assistant(self) -> Dict[str, Any]:
+        """The configured assistant (raises if it does not exist)"""
+        assistant = await openai_resilience.call(
+            lambda: self.client.beta.assistants.retrieve(self.assistant_id), endpoint="assistants.retrieve"
+        )
+        return {"id": assistant.id, "model": assistant.model}
+
+    async def retrieve_vector_store(self) -> Dict[str, Any]:
+        """The DemoVector store (raises if it does not exist)"""
+        vector_store = await openai_resilience.call(
+            lambda: self.client.vector_stores.retrieve(self.vector_store_id), endpoint="vector_stores.retrieve"
+        )
+        return {"id": vector_store.id, "status": vector_store.status}
+
+    async def retrieve_file(self, file_id: str) -> Dict[str, Any]:
+        """Name and size of an uploaded file (raises if it does not exist)"""
+        file = await openai_resilience.call(lambda: self.client.files.retrieve(file_id), endpoint="files.retrieve")
+        return {"filename": file.filename, "bytes": file.bytes}
+
+    async def delete_file(self, file_id: str) -> bool:
+        """Delete an uploaded file (also removes it from every vector store); True if gone"""
+        try:
+            await openai_resilience.call(lambda: self.client.files.delete(file_id), endpoint="files.delete")
+            return True
+        except Exception as e:
+            if getattr(e, "status_code", None) == 404:
+                return True
+            log_event(logger, logging.WARNING, "file delete failed", file_id=file_id, error=str(e))
+            return False
+
+    async def create_session_vector_store(self, thread_id: str, expires_after_days: int) -> str:
+        """
+        Create an empty vector store for one thread's attachments. OpenAI
+        expires it after expires_after_days without use.
+        """
+        # Not retried: a retried create could leave a second, untracked store
+        vector_store = await openai_resilience.call(
+            lambda: self.client.vector_stores.create(
+                name=f"session {thread_id}",
+                expires_after={"anchor": "last_active_at", "days": expires_after_days},
+                metadata={"thread_id": thread_id}
+            ),
+            idempotent=False,
+            endpoint="vector_stores.create"
+        )
+        return vector_store.id
+
+    async def attach_vector_store(self, thread_id: str, vector_store_id: Optional[str]):
+        """
+        Make file_search on the thread use vector_store_id (None detaches it)
+        in addition to the assistant's own DemoVector store.
+        """
+        vector_store_ids = [vector_store_id] if vector_store_id else []
+        await openai_resilience.call(
+            lambda: self.client.beta.threads.update(
+                thread_id, tool_resources={"file_search": {"vector_store_ids": vector_store_ids}}
+            ),
+            endpoint="threads.update"
+        )
+
+    async def delete_vector_store(self, vector_store_id: str) -> bool:
+        """Delete a vector store (its files are kept); True if gone"""
+        try:
+            await openai_resilience.call(
+                lambda: self.client.vector_stores.delete(vector_store_id), endpoint="vector_stores.delete"
+            )
+            return True
+        except Exception as e:
+            if getattr(e, "status_code", None) == 404:
+                return True
+            log_event(logger, logging.WARNING, "vector store delete failed", vector_store_id=vector_store_id, error=str(e))
+            return False
+
+    async def create_thread(self, initial_messages: Optional[List[Dict[str, Any]]] = None) -> str:
         """Create a new thread, optionally with initial messages"""
         if initial_messages:
-            thread = self.client.beta.threads.create(messages=initial_messages)
+            # Not retried: a retry after a create that did commit would leave
+            # a second thread holding the user's message that nothing deletes
+            thread = await openai_resilience.call(
+                lambda: self.client.beta.threads.create(messages=initial_messages),
+                endpoint="threads.create",
+                idempotent=False
+            )
         else:
-            thread = self.client.beta.threads.create()
+            # An empty duplicate thread from a retried create is never used
+            thread = await openai_resilience.call(lambda: self.client.beta.threads.create(), endpoint="threads.create")
         return thread.id
 
-    def delete_thread(self, thread_id: str) -> bool:
+    async def delete_thread(self, thread_id: str) -> bool:
         """Delete a thread"""
         try:
-            response = self.client.beta.threads.delete(thread_id)
+            response = await openai_resilience.call(
+                lambda: self.client.beta.threads.delete(thread_id), endpoint="threads.delete"
+            )
             return response.deleted
         except Exception as e:
-            print(f"Error deleting thread {thread_id}: {e}")
+            log_event(logger, logging.WARNING, "thread delete failed", thread_id=thread_id, error=str(e))
             return False
 
-    def send_message(self, thread_id: str, message: str, file_ids: Optional[List[str]] = None, image_file_ids: Optional[List[str]] = None) -> str:
+    @staticmethod
+    def message_content(message: str, image_file_ids: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Content parts of a thread message: the text plus any images"""
+        content = [{"type": "text", "text": message}]
+        for image_id in image_file_ids or []:
+            content.append({
+                "type": "image_file",
+                "image_file": {"file_id": image_id}
+            })
+        return content
+
+    async def send_message(self, thread_id: str, message: str, file_ids: Optional[List[str]] = None, image_file_ids: Optional[List[str]] = None, role: str = "user") -> str:
         """
-        Send a message to a thread.
+        Send a message to a thread (role="assistant" records an answer that
+        was served without a run, so follow-up runs see it).
         Note: file_ids parameter is kept for compatibility but files should be 
-        added to DemoVector via add_files_to_vector_store_batch() before sending.
-        The Assistant will search from DemoVector directly.
+        added to the thread's session vector store via
+        add_files_to_vector_store_batch() before sending.
         """
-        # Prepare content
-        content = [{"type": "text", "text": message}]
-        
-        # Add images to content if provided
-        if image_file_ids:
-            for image_id in image_file_ids:
-                content.append({
-                    "type": "image_file",
-                    "image_file": {"file_id": image_id}
-                })
-
         # Note: We no longer use attachments for file_search
-        # Files are added to DemoVector and Assistant searches there directly
-        thread_message = self.client.beta.threads.messages.create(
-            thread_id=thread_id,
-            role="user",
-            content=content
+        # Files are added to the session's vector store, which the thread's
+        # file_search searches alongside DemoVector
+        thread_message = await openai_resilience.call(
+            lambda: self.client.beta.threads.messages.create(
+                thread_id=thread_id,
+                role=role,
+                content=self.message_content(message, image_file_ids)
+            ),
+            idempotent=False,
+            endpoint="messages.create"
         )
         return thread_message.id
 
-    def upload_file(self, file_content: Any, filename: str, mime_type: Optional[str] = None) -> str:
+    async def upload_file(self, file_content: Any, filename: str, mime_type: Optional[str] = None) -> str:
         """
         Upload a file to OpenAI.
         Note: Files are NOT automatically added to vector store here.
-        Use add_files_to_vector_store_batch() after uploading to add files to DemoVector.
+        Use add_files_to_vector_store_batch() after uploading to add files to a session's store.
         """
-        # file_content should be a file-like object (bytes)
-        response = self.client.files.create(
-            file=(filename, file_content),
-            purpose="assistants"
+        # file_content may be bytes or a binary file object; file objects are
+        # streamed in chunks by httpx rather than loaded into memory
+        # Not retried: a file object stream cannot be replayed
+        response = await openai_resilience.call(
+            lambda: self.client.files.create(
+                file=(filename, file_content),
+                purpose="assistants"
+            ),
+            idempotent=False,
+            endpoint="files.create"
         )
         return response.id
 
-    def add_files_to_vector_store_batch(
+    async def _rest(self, method: str, url: str, endpoint: str, hedge: bool = False, **kwargs) -> httpx.Response:
+        """
+        Raw REST call through the shared pool and the resilience policy.
+        Transient statuses (429/5xx) are retried; other responses are returned.
+        """
+        async def request() -> httpx.Response:
+            response = await http_pool.client.request(method, url, **kwargs)
+            if response.status_code in RETRYABLE_STATUS:
+                raise UpstreamStatusError(response)
+            return response
+
+        return await openai_resilience.call(request, hedge=hedge, endpoint=endpoint)
+
+    async def add_files_to_vector_store_batch(
         self, 
         file_ids: List[str], 
         timeout: int = 120,
-        poll_interval: int = 2
+        vector_store_id: Optional[str] = None
     ) -> Dict[str, Any]:
         """
-        Add multiple files to the DemoVector store using OpenAI REST API.
+        Add multiple files to a vector store using OpenAI REST API.
         Waits for batch processing to complete before returning.
         
         Args:
             file_ids: List of file IDs to add to vector store
             timeout: Maximum time to wait for batch completion (seconds)
-            poll_interval: Time between status checks (seconds)
+            vector_store_id: Target store (default: DemoVector)
             
         Returns:
             Dict with 'success', 'batch_id', 'status', and 'failed_files' info
         """
         if not file_ids:
             return {"success": True, "batch_id": None, "status": "no_files", "failed_files": 0}
+        vector_store_id = vector_store_id or self.vector_store_id
         
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
@@ -113,81 +249,94 @@ class OpenAIService:
             }
             
             # Create batch to add files to vector store using REST API
-            batch_url = f"https://api.openai.com/v1/vector_stores/{self.vector_store_id}/file_batches"
+            batch_url = f"{self.api_base}/vector_stores/{vector_store_id}/file_batches"
             batch_data = {"file_ids": file_ids}
             
-            with httpx.Client() as client:
-                batch_response = client.post(batch_url, json=batch_data, headers=headers)
+            # Re-adding the same files is harmless, so the create is retried too
+            started = time.perf_counter()
+            batch_response = await self._rest(
+                "POST", batch_url, endpoint="file_batches.create", json=batch_data, headers=headers
+            )
+            created = time.perf_counter()
+            vector_store_batch_seconds.observe(created - started, stage="create")
+            
+            if batch_response.status_code != 200:
+                error_detail = batch_response.text
+                log_event(logger, logging.WARNING, "file batch create failed",
+                          status_code=batch_response.status_code, detail=error_detail[:500])
+                return {
+                    "success": False,
+                    "batch_id": None,
+                    "status": "error",
+                    "error_message": error_detail,
+                    "failed_files": len(file_ids),
+                    "total_files": len(file_ids)
+                }
+            
+            batch_data = batch_response.json()
+            batch_id = batch_data.get("id")
+            
+            retrieve_url = f"{self.api_base}/vector_stores/{vector_store_id}/file_batches/{batch_id}"
+
+            async def check_batch() -> Optional[Dict[str, Any]]:
+                batch_status_response = await self._rest(
+                    "GET", retrieve_url, endpoint="file_batches.retrieve", headers=headers, hedge=True
+                )
+                
+                if batch_status_response.status_code != 200:
+                    log_event(logger, logging.WARNING, "file batch status failed",
+                              batch_id=batch_id, status_code=batch_status_response.status_code)
+                    return None
+                
+                status_data = batch_status_response.json()
+                status = status_data.get("status")
                 
-                if batch_response.status_code != 200:
-                    error_detail = batch_response.text
-                    print(f"Error creating batch: {batch_response.status_code} - {error_detail}")
+                if status == "completed":
+                    failed_count = status_data.get("file_counts", {}).get("failed", 0)
+                    if failed_count > 0:
+                        log_event(logger, logging.WARNING, "file batch completed with failures",
+                                  batch_id=batch_id, failed_files=failed_count)
+                    return {
+                        "success": True,
+                        "batch_id": batch_id,
+                        "status": status,
+                        "failed_files": failed_count,
+                        "total_files": len(file_ids)
+                    }
+                elif status in ["failed", "cancelled"]:
+                    failed_count = status_data.get("file_counts", {}).get("failed", len(file_ids))
+                    log_event(logger, logging.WARNING, "file batch ended", batch_id=batch_id, status=status)
                     return {
                         "success": False,
-                        "batch_id": None,
-                        "status": "error",
-                        "error_message": error_detail,
-                        "failed_files": len(file_ids),
+                        "batch_id": batch_id,
+                        "status": status,
+                        "failed_files": failed_count,
                         "total_files": len(file_ids)
                     }
                 
-                batch_data = batch_response.json()
-                batch_id = batch_data.get("id")
-                
-                # Poll for batch completion
-                start_time = time.time()
-                while time.time() - start_time < timeout:
-                    retrieve_url = f"https://api.openai.com/v1/vector_stores/{self.vector_store_id}/file_batches/{batch_id}"
-                    
-                    batch_status_response = client.get(retrieve_url, headers=headers)
-                    
-                    if batch_status_response.status_code != 200:
-                        print(f"Error retrieving batch status: {batch_status_response.status_code}")
-                        time.sleep(poll_interval)
-                        continue
-                    
-                    status_data = batch_status_response.json()
-                    status = status_data.get("status")
-                    
-                    if status == "completed":
-                        failed_count = status_data.get("file_counts", {}).get("failed", 0)
-                        if failed_count > 0:
-                            print(f"Batch {batch_id} completed with {failed_count} failed files")
-                        return {
-                            "success": True,
-                            "batch_id": batch_id,
-                            "status": status,
-                            "failed_files": failed_count,
-                            "total_files": len(file_ids)
-                        }
-                    elif status in ["failed", "cancelled"]:
-                        failed_count = status_data.get("file_counts", {}).get("failed", len(file_ids))
-                        print(f"Batch {batch_id} ended with status: {status}")
-                        return {
-                            "success": False,
-                            "batch_id": batch_id,
-                            "status": status,
-                            "failed_files": failed_count,
-                            "total_files": len(file_ids)
-                        }
-                    
-                    # Still processing (in_progress or other)
-                    time.sleep(poll_interval)
-            
-            # Timeout reached
-            print(f"Batch {batch_id} timed out after {timeout} seconds")
-            return {
-                "success": False,
-                "batch_id": batch_id,
-                "status": "timeout",
-                "failed_files": -1,
-                "total_files": len(file_ids)
-            }
-            
+                # Still processing (in_progress or other)
+                return None
+
+            # Poll for batch completion through the shared poller
+            result = await run_poller.wait(
+                f"file_batch:{batch_id}",
+                check_batch,
+                timeout=timeout,
+                timeout_result={
+                    "success": False,
+                    "batch_id": batch_id,
+                    "status": "timeout",
+                    "failed_files": -1,
+                    "total_files": len(file_ids)
+                }
+            )
+            finished = time.perf_counter()
+            vector_store_batch_seconds.observe(finished - created, stage="processing")
+            vector_store_batch_seconds.observe(finished - started, stage="total")
+            return result
+        
         except Exception as e:
-            print(f"Error adding files to vector store batch: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("adding files to vector store batch failed", extra={"fields": {"files": len(file_ids)}})
             return {
                 "success": False,
                 "batch_id": None,
@@ -197,37 +346,173 @@ class OpenAIService:
                 "total_files": len(file_ids)
             }
 
-    def create_and_run(self, thread_id: str) -> str:
+    async def list_failed_batch_files(self, batch_id: str, vector_store_id: Optional[str] = None) -> Optional[List[str]]:
+        """
+        List the file IDs that failed in a vector store file batch
+        (of vector_store_id, default DemoVector).
+        Returns None if the listing itself could not be fetched.
+        """
+        api_key = os.getenv("OPENAI_API_KEY")
+        headers = {
+            "Authorization": f"Bearer {api_key}",
+            "OpenAI-Beta": "assistants=v2"
+        }
+        url = f"{self.api_base}/vector_stores/{vector_store_id or self.vector_store_id}/file_batches/{batch_id}/files"
+        params = {"filter": "failed", "limit": 100}
+
+        failed_ids = []
+        try:
+            while True:
+                response = await self._rest(
+                    "GET", url, endpoint="file_batches.list_files", params=dict(params), headers=headers
+                )
+                if response.status_code != 200:
+                    log_event(logger, logging.WARNING, "listing failed batch files failed",
+                              batch_id=batch_id, status_code=response.status_code)
+                    return None
+                page = response.json()
+                failed_ids.extend(item["id"] for item in page.get("data", []))
+                if not page.get("has_more") or not page.get("last_id"):
+                    return failed_ids
+                params["after"] = page["last_id"]
+        except Exception as e:
+            log_event(logger, logging.WARNING, "listing failed batch files failed", batch_id=batch_id, error=str(e))
+            return None
+
+    async def create_and_run(self, thread_id: str) -> str:
         """Create a run for the assistant on the thread"""
-        run = self.client.beta.threads.runs.create(
-            thread_id=thread_id,
-            assistant_id=self.assistant_id
+        run = await openai_resilience.call(
+            lambda: self.client.beta.threads.runs.create(
+                thread_id=thread_id,
+                assistant_id=self.assistant_id
+            ),
+            idempotent=False,
+            endpoint="runs.create"
         )
         return run.id
 
-    def wait_for_run_completion(self, thread_id: str, run_id: str, timeout: int = 60) -> bool:
-        """Wait for a run to complete"""
-        start_time = time.time()
-        while time.time() - start_time < timeout:
-            run = self.client.beta.threads.runs.retrieve(
+    async def stream_run(self, thread_id: str, run_info: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        """
+        Create a run on the thread and yield the assistant's text deltas as they arrive.
+        If run_info is given, the run and final message IDs and the message's
+        raw citations (see get_run_response) are stored in it.
+        Raises RuntimeError if the run ends in a failed, cancelled or expired state.
+        """
+        # Streams cannot be retried, but they feed (and respect) the breaker
+        openai_resilience.breaker.before_call()
+        started = time.perf_counter()
+        runs_in_flight.inc()
+        try:
+            async with self.client.beta.threads.runs.stream(
                 thread_id=thread_id,
-                run_id=run_id
+                assistant_id=self.assistant_id
+            ) as stream:
+                async for event in self._stream_events(stream, run_info):
+                    yield event
+        except Exception as e:
+            openai_resilience.record(e)
+            openai_request_seconds.observe(time.perf_counter() - started, endpoint="runs.stream", outcome="error")
+            raise
+        except BaseException:
+            # Client went away mid-stream; no verdict on upstream health
+            openai_resilience.breaker.cancel_probe()
+            raise
+        finally:
+            runs_in_flight.dec()
+        openai_resilience.record()
+        openai_request_seconds.observe(time.perf_counter() - started, endpoint="runs.stream", outcome="ok")
+
+    async def _stream_events(self, stream: Any, run_info: Optional[Dict[str, Any]]) -> AsyncIterator[str]:
+        async for event in stream:
+            if event.event == "thread.message.delta":
+                for content in event.data.delta.content or []:
+                    if content.type == "text" and content.text and content.text.value:
+                        yield content.text.value
+            elif event.event == "thread.run.created" and run_info is not None:
+                run_info["run_id"] = event.data.id
+            elif event.event == "thread.message.completed" and run_info is not None:
+                run_info["message_id"] = event.data.id
+                run_info["citations"] = message_text_and_citations(event.data)[1]
+            elif event.event == "thread.run.completed":
+                self._observe_run_stages(event.data)
+            elif event.event in ["thread.run.failed", "thread.run.cancelled", "thread.run.expired"]:
+                log_event(logger, logging.WARNING, "run ended", run_id=event.data.id, status=event.data.status)
+                raise RuntimeError(f"Run ended with status: {event.data.status}")
+
+    async def wait_for_run_completion(self, thread_id: str, run_id: str, timeout: int = 60) -> bool:
+        """Wait for a run to complete"""
+        async def check_run() -> Optional[bool]:
+            run = await openai_resilience.call(
+                lambda: self.client.beta.threads.runs.retrieve(
+                    thread_id=thread_id,
+                    run_id=run_id
+                ),
+                hedge=True,
+                endpoint="runs.retrieve"
             )
 
             if run.status == "completed":
+                self._observe_run_stages(run, polled=True)
                 return True
             elif run.status in ["failed", "cancelled", "expired"]:
-                print(f"Run {run_id} ended with status: {run.status}")
+                log_event(logger, logging.WARNING, "run ended", run_id=run_id, status=run.status)
                 return False
+            return None
 
-            time.sleep(1)
+        runs_in_flight.inc()
+        try:
+            return await run_poller.wait(f"run:{run_id}", check_run, timeout=timeout, timeout_result=False)
+        finally:
+            runs_in_flight.dec()
 
-        print(f"Run {run_id} timed out")
-        return False
+    @staticmethod
+    def _observe_run_stages(run: Any, polled: bool = False):
+        """
+        Split a completed run's time into queueing and model time using the
+        server timestamps (whole seconds); for polled runs, also how long the
+        completion went unnoticed.
+        """
+        if run.created_at and run.started_at:
+            run_stage_seconds.observe(max(run.started_at - run.created_at, 0), stage="queued")
+        if run.started_at and run.completed_at:
+            run_stage_seconds.observe(max(run.completed_at - run.started_at, 0), stage="in_progress")
+        if polled and run.completed_at:
+            run_stage_seconds.observe(max(time.time() - run.completed_at, 0), stage="poll_delay")
+
+    async def get_run_response(self, thread_id: str, run_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the newest assistant message created by a run, as {"id", "content",
+        "citations"}; citations are not resolved to filenames yet.
+        Only the run's own messages are listed, so the cost does not grow
+        with the length of the thread.
+        """
+        messages = await openai_resilience.call(
+            lambda: self.client.beta.threads.messages.list(
+                thread_id=thread_id,
+                run_id=run_id,
+                order="desc",
+                limit=5
+            ),
+            endpoint="messages.list"
+        )
 
-    def get_assistant_response(self, thread_id: str) -> Optional[str]:
-        """Get the latest assistant response from the thread"""
-        messages = self.client.beta.threads.messages.list(thread_id=thread_id)
+        for message in messages.data:
+            if message.role == "assistant":
+                text, citations = message_text_and_citations(message)
+                if text:
+                    return {"id": message.id, "content": text, "citations": citations}
+        return None
+
+    async def get_assistant_response(self, thread_id: str, run_id: Optional[str] = None) -> Optional[str]:
+        """Get the latest assistant response from the thread (or from a specific run)"""
+        if run_id:
+            response = await self.get_run_response(thread_id, run_id)
+            return response["content"] if response else None
+
+        messages = await openai_resilience.call(
+            lambda: self.client.beta.threads.messages.list(thread_id=thread_id, order="desc", limit=10),
+            endpoint="messages.list"
+        )
 
         for message in messages.data:
             if message.role == "assistant":
@@ -237,24 +522,44 @@ class OpenAIService:
                         return content.text.value
         return None
 
-    def get_thread_messages(self, thread_id: str) -> List[Dict[str, Any]]:
-        """Get all messages from a thread"""
-        messages = self.client.beta.threads.messages.list(thread_id=thread_id)
-        return [
-            {
-                "id": msg.id,
-                "role": msg.role,
-                "content": msg.content[0].text.value if msg.content else "",
-                "created_at": datetime.fromtimestamp(msg.created_at)
-            }
-            for msg in messages.data
-        ]
-    def generate_initial_suggestions(self) -> Tuple[Optional[str], List[str]]:
-        """Generate 4 initial query suggestions based on knowledge base"""
+    async def get_thread_messages(self, thread_id: str, after: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Get messages from a thread in chronological order.
+        If after is a message ID, only messages created after it are fetched;
+        the SDK pages through the rest of the thread as needed.
+        """
+        params: Dict[str, Any] = {"order": "asc", "limit": 100}
+        if after:
+            params["after"] = after
+
+        async def fetch() -> List[Dict[str, Any]]:
+            messages = []
+            async for msg in self.client.beta.threads.messages.list(thread_id=thread_id, **params):
+                text, citations = message_text_and_citations(msg)
+                messages.append({
+                    "id": msg.id,
+                    "role": msg.role,
+                    "content": text,
+                    "citations": citations,
+                    "created_at": datetime.fromtimestamp(msg.created_at)
+                })
+            return messages
+
+        return await openai_resilience.call(fetch, endpoint="messages.list")
+
+    async def generate_initial_suggestions(self) -> Optional[List[str]]:
+        """
+        Generate 4 initial query suggestions based on knowledge base.
+        Returns None if the assistant did not produce a usable list.
+        The throwaway thread is always deleted afterwards.
+        """
+        thread_id = None
+        started = time.perf_counter()
+        result = "error"
         try:
             # Create a new thread
-            thread_id = self.create_thread()
-            print(f"[SUGGESTIONS] Created thread: {thread_id}")
+            thread_id = await self.create_thread()
+            log_event(logger, logging.DEBUG, "suggestions thread created", thread_id=thread_id)
             
             # Prepare the prompt for generating suggestions
             prompt = """วิเคราะห์และค้นหาเนื้อหาในเอกสารทั้งหมด แล้วสร้าง 4 คำถามตัวอย่างภาษาไทยที่น่าสนใจ
@@ -262,66 +567,56 @@ class OpenAIService:
 ["คำถาม 1", "คำถาม 2", "คำถาม 3", "คำถาม 4"]"""
             
             # Send the message to the thread with file search
-            self.send_message(thread_id, prompt)
-            print(f"[SUGGESTIONS] Sent prompt to thread: {thread_id}")
+            await self.send_message(thread_id, prompt)
             
             # Create and run the assistant
-            run_id = self.create_and_run(thread_id)
-            print(f"[SUGGESTIONS] Created run: {run_id}")
+            run_id = await self.create_and_run(thread_id)
+            log_event(logger, logging.DEBUG, "suggestions run created", thread_id=thread_id, run_id=run_id)
             
             # Wait for completion (timeout 60 seconds)
-            completed = self.wait_for_run_completion(thread_id, run_id, timeout=60)
-            print(f"[SUGGESTIONS] Run completed: {completed}")
+            completed = await self.wait_for_run_completion(thread_id, run_id, timeout=60)
             
             if completed:
-                response = self.get_assistant_response(thread_id)
-                print(f"[SUGGESTIONS] Got response: {response}")
+                run_response = await self.get_run_response(thread_id, run_id)
+                response = run_response["content"] if run_response else None
+                log_event(logger, logging.DEBUG, "suggestions response", run_id=run_id, response=response)
                 
                 if response:
                     try:
-                        # Remove citation markers before parsing JSON
-                        # Citations look like 【4:9†book310453.pdf】
-                        cleaned_response = response
-                        import re
-                        cleaned_response = re.sub(r'【.*?†.*?】', '', cleaned_response).strip()
-                        print(f"[SUGGESTIONS] Cleaned response: {cleaned_response}")
+                        # Remove citation markers (【4:9†book310453.pdf】) before parsing JSON
+                        cleaned_response = strip_citations(response, run_response["citations"]).strip()
                         
                         # Try to parse JSON response
                         suggestions = json.loads(cleaned_response)
                         if isinstance(suggestions, list):
-                            print(f"[SUGGESTIONS] Successfully parsed {len(suggestions)} suggestions: {suggestions}")
-                            return thread_id, suggestions
-                        else:
-                            print(f"[SUGGESTIONS] Response is not a list: {type(suggestions)}")
+                            result = "ok"
+                            log_event(logger, logging.INFO, "suggestions generated", count=len(suggestions))
+                            return suggestions
+                        result = "invalid"
+                        log_event(logger, logging.WARNING, "suggestions response is not a list",
+                                  type=type(suggestions).__name__)
                     except json.JSONDecodeError as je:
-                        print(f"[SUGGESTIONS] Failed to parse suggestions JSON: {response}")
-                        print(f"[SUGGESTIONS] JSON Error: {str(je)}")
+                        result = "invalid"
+                        log_event(logger, logging.WARNING, "suggestions response is not JSON",
+                                  response=response, error=str(je))
                 else:
-                    print(f"[SUGGESTIONS] No response received from assistant")
+                    result = "empty"
+                    log_event(logger, logging.WARNING, "no suggestions response from assistant", run_id=run_id)
             else:
-                print(f"[SUGGESTIONS] Run did not complete within timeout")
-            
-            # Fallback suggestions if something goes wrong
-            print(f"[SUGGESTIONS] Using fallback suggestions")
-            fallback_suggestions = [
-                "นิยามการประมวลผลภาพ และความสำคัญของมัน",
-                "Unitary และ Fourier transform ต่างกันอย่างไร",
-                "จะคำนวณสถิติภาพได้อย่างไร",
-                "Sharpen Filters ใช้เพื่ออะไร"
-            ]
-            return thread_id, fallback_suggestions
+                result = "timeout"
+                log_event(logger, logging.WARNING, "suggestions run did not complete", run_id=run_id)
             
-        except Exception as e:
-            print(f"[SUGGESTIONS] Error generating initial suggestions: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            return None
             
-            # Return None for thread_id and fallback suggestions on error
-            print(f"[SUGGESTIONS] Using fallback suggestions due to exception")
-            fallback_suggestions = [
-                "นิยามการประมวลผลภาพ และความสำคัญของมัน",
-                "Unitary และ Fourier transform ต่างกันอย่างไร",
-                "จะคำนวณสถิติภาพได้อย่างไร",
-                "Sharpen Filters ใช้เพื่ออะไร"
-            ]
-            return None, fallback_suggestions
\ No newline at end of file
+        except Exception:
+            logger.exception("generating initial suggestions failed")
+            return None
+
+        finally:
+            suggestions_seconds.observe(time.perf_counter() - started, result=result)
+            # The suggestion thread is never reused by a chat session
+            if thread_id:
+                await self.delete_thread(thread_id)
+
+# Global instance (built on first use, normally in the app lifespan)
+openai_service: Provider[OpenAIService] = Provider("openai_service", OpenAIService)
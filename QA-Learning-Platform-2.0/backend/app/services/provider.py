@@ -0,0 +1,60 @@
+import threading
+from typing import Any, Callable, Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class Provider(Generic[T]):
+    """
+    Lazily built service singleton.
+
+    Modules import the provider where they used to import the instance and
+    use it the same way; the instance is built on first use, normally by
+    resolve() in the app lifespan, so importing the app reads no
+    credentials and opens no databases. override() injects another
+    instance for every holder of the provider (tests, other configuration),
+    and the provider is a FastAPI dependency: Depends(openai_service)
+    yields the instance.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], T]):
+        self._name = name
+        self._factory = factory
+        self._instance: Optional[T] = None
+        self._lock = threading.Lock()
+
+    def resolve(self) -> T:
+        """The instance, building it on first call"""
+        instance = self._instance
+        if instance is None:
+            with self._lock:
+                if self._instance is None:
+                    self._instance = self._factory()
+                instance = self._instance
+        return instance
+
+    def override(self, instance: Optional[T]):
+        """Use instance from now on (None: build a fresh one on next use)"""
+        self._instance = instance
+
+    def is_built(self) -> bool:
+        return self._instance is not None
+
+    def __call__(self) -> T:
+        return self.resolve()
+
+    def __getattr__(self, name: str) -> Any:
+        # Only called for attributes the provider itself lacks
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.resolve(), name)
+
+    def __setattr__(self, name: str, value: Any):
+        if name.startswith("_"):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self.resolve(), name, value)
+
+    def __repr__(self) -> str:
+        state = "built" if self.is_built() else "not built"
+        return f"<Provider {self._name} ({state})>"
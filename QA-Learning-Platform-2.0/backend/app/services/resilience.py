@@ -0,0 +1,285 @@
+import asyncio
+import logging
+import os
+import random
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+import httpx
+
+from app.logging_config import get_logger, log_event
+from app.services.metrics import openai_request_seconds
+
+T = TypeVar("T")
+
+logger = get_logger("resilience")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+class CircuitOpen(Exception):
+    """Raised without calling upstream while the circuit breaker is open"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} is temporarily unavailable")
+        self.retry_after = max(1, int(retry_after + 0.999))
+
+
+class UpstreamStatusError(Exception):
+    """A raw HTTP response with a retryable status (for REST calls made with httpx)"""
+
+    def __init__(self, response: httpx.Response):
+        super().__init__(f"Upstream returned {response.status_code}")
+        self.response = response
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Transient failures: timeouts, connection errors, 429 and 5xx"""
+    # The SDK is imported with the first client; until then none of its errors exist
+    openai = sys.modules.get("openai")
+    if openai is not None:
+        if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError)):
+            return True
+        if isinstance(error, openai.APIStatusError):
+            return error.status_code in RETRYABLE_STATUS
+    if isinstance(error, (httpx.TimeoutException, httpx.TransportError, asyncio.TimeoutError)):
+        return True
+    if isinstance(error, UpstreamStatusError):
+        return error.response.status_code in RETRYABLE_STATUS
+    return False
+
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive transient failures, rejects
+    calls for reset_timeout seconds, then lets a single probe through
+    (half-open): success closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+
+        # Counters
+        self.opened = 0
+        self.short_circuited = 0
+
+    def before_call(self):
+        if self.state == CLOSED:
+            return
+        remaining = self.reset_timeout - (time.monotonic() - self.opened_at)
+        if self.state == OPEN and remaining <= 0:
+            self.state = HALF_OPEN
+        if self.state == HALF_OPEN and not self._probing:
+            self._probing = True
+            return
+        self.short_circuited += 1
+        raise CircuitOpen(self.name, max(remaining, 1.0))
+
+    def cancel_probe(self):
+        """The probe was cancelled before upstream answered; allow another one"""
+        self._probing = False
+
+    def record_success(self):
+        self.failures = 0
+        self._probing = False
+        self.state = CLOSED
+
+    def record_failure(self):
+        self.failures += 1
+        self._probing = False
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != OPEN:
+                self.opened += 1
+                log_event(logger, logging.WARNING, "circuit opened", circuit=self.name, failures=self.failures)
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "opened": self.opened,
+            "short_circuited": self.short_circuited
+        }
+
+
+class RetryBudget:
+    """
+    Caps retries to a fraction of calls: every call deposits `ratio` tokens
+    (up to `max_tokens`) and every retry spends one, so a struggling
+    upstream is not hit by a retry storm.
+    """
+
+    def __init__(self, ratio: float, max_tokens: float):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+
+    def deposit(self):
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class Resilience:
+    """
+    Retry, circuit breaker and hedging policy for calls to one upstream.
+
+    call() runs an operation through the breaker. Idempotent operations are
+    retried on transient errors with jittered exponential backoff, within
+    the retry budget. hedge=True starts a second identical request when the
+    first has not answered after hedge_after seconds and takes whichever
+    finishes first (meant for cheap reads such as status polls).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_attempts: Optional[int] = None,
+        base_delay: Optional[float] = None,
+        max_delay: Optional[float] = None,
+        budget_ratio: Optional[float] = None,
+        failure_threshold: Optional[int] = None,
+        reset_timeout: Optional[float] = None,
+        hedge_after: Optional[float] = None
+    ):
+        self.name = name
+        self.max_attempts = max_attempts or int(os.getenv("OPENAI_RETRY_MAX_ATTEMPTS", 3))
+        self.base_delay = base_delay if base_delay is not None else float(os.getenv("OPENAI_RETRY_BASE_DELAY", 0.5))
+        self.max_delay = max_delay if max_delay is not None else float(os.getenv("OPENAI_RETRY_MAX_DELAY", 8))
+        self.budget = RetryBudget(
+            budget_ratio if budget_ratio is not None else float(os.getenv("OPENAI_RETRY_BUDGET_RATIO", 0.2)),
+            max_tokens=10
+        )
+        self.breaker = CircuitBreaker(
+            name,
+            failure_threshold=failure_threshold or int(os.getenv("OPENAI_BREAKER_FAILURES", 5)),
+            reset_timeout=reset_timeout if reset_timeout is not None else float(os.getenv("OPENAI_BREAKER_RESET", 30))
+        )
+        # 0 disables hedging
+        self.hedge_after = hedge_after if hedge_after is not None else float(os.getenv("OPENAI_HEDGE_AFTER", 0))
+
+        # Counters
+        self.calls = 0
+        self.failures = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    async def call(
+        self,
+        operation: Callable[[], Awaitable[T]],
+        idempotent: bool = True,
+        hedge: bool = False,
+        endpoint: str = "other"
+    ) -> T:
+        """
+        Run operation() under the policy; raises CircuitOpen or the last error.
+        Each attempt is timed into openai_request_seconds under `endpoint`.
+        """
+        self.calls += 1
+        self.budget.deposit()
+        attempt = 1
+        while True:
+            self.breaker.before_call()
+            started = time.perf_counter()
+            try:
+                if hedge and self.hedge_after > 0:
+                    result = await self._hedged(operation)
+                else:
+                    result = await operation()
+            except asyncio.CancelledError:
+                self.breaker.cancel_probe()
+                raise
+            except Exception as e:
+                openai_request_seconds.observe(time.perf_counter() - started, endpoint=endpoint, outcome="error")
+                if not is_retryable(e):
+                    # The upstream answered (e.g. 400/404): it is healthy
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                self.failures += 1
+                if not idempotent or attempt >= self.max_attempts or not self.budget.withdraw():
+                    raise
+                self.retries += 1
+                await asyncio.sleep(self._backoff(attempt, e))
+                attempt += 1
+                continue
+            openai_request_seconds.observe(time.perf_counter() - started, endpoint=endpoint, outcome="ok")
+            self.breaker.record_success()
+            return result
+
+    def record(self, error: Optional[BaseException] = None):
+        """Report the outcome of a call made outside call() (e.g. a stream)"""
+        if error is None or not is_retryable(error):
+            self.breaker.record_success()
+        else:
+            self.failures += 1
+            self.breaker.record_failure()
+
+    def _backoff(self, attempt: int, error: BaseException) -> float:
+        """Full-jitter exponential backoff, honouring a Retry-After header if sent"""
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), self.max_delay)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    async def _hedged(self, operation: Callable[[], Awaitable[T]]) -> T:
+        first = asyncio.ensure_future(operation())
+        pending = {first}
+        error: Optional[BaseException] = None
+        try:
+            # Cancelling the caller during any wait cancels the attempts too
+            done, _ = await asyncio.wait({first}, timeout=self.hedge_after)
+            if done:
+                return first.result()
+
+            self.hedges += 1
+            second = asyncio.ensure_future(operation())
+            pending = {first, second}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "breaker": self.breaker.stats(),
+            "calls": self.calls,
+            "failures": self.failures,
+            "retries": self.retries,
+            "retry_budget_tokens": round(self.budget.tokens, 2),
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins
+        }
+
+
+# Global instance
+openai_resilience = Resilience("openai")
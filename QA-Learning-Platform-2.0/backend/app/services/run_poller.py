@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import random
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.logging_config import get_logger, log_event
+from app.services.metrics import poll_iterations
+
+# A check returns None while the item is still pending, or its final result
+CheckFn = Callable[[], Awaitable[Optional[Any]]]
+
+logger = get_logger("poller")
+
+
+class _PendingItem:
+    def __init__(self, key: str, check: CheckFn, future: asyncio.Future,
+                 deadline: float, timeout_result: Any, interval: float):
+        self.key = key
+        self.check = check
+        self.future = future
+        self.deadline = deadline
+        self.timeout_result = timeout_result
+        self.interval = interval
+        self.next_poll_at = 0.0
+        self.polls = 0
+        self.in_flight = False
+
+
+class RunPoller:
+    """
+    Single background poller for every in-flight run and vector store file batch.
+
+    Callers register a status check with watch() and await the returned future.
+    Each item is polled with its own adaptive backoff: the first checks come
+    quickly so short runs are detected fast, then the interval grows (with
+    jitter) so long runs stop hammering the API.
+    """
+
+    def __init__(
+        self,
+        initial_interval: float = 0.5,
+        backoff_factor: float = 1.5,
+        max_interval: float = 8.0,
+        jitter: float = 0.2
+    ):
+        self.initial_interval = initial_interval
+        self.backoff_factor = backoff_factor
+        self.max_interval = max_interval
+        self.jitter = jitter
+
+        self._items: Dict[str, _PendingItem] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+        # Counters
+        self.total_polls = 0
+        self.completed = 0
+        self.timed_out = 0
+        self.polls_per_completion: Counter = Counter()
+
+    def watch(self, key: str, check: CheckFn, timeout: float, timeout_result: Any = None) -> asyncio.Future:
+        """
+        Start tracking an item and return a future with its final result.
+        Watching a key that is already tracked returns the existing future.
+        """
+        existing = self._items.get(key)
+        if existing and not existing.future.done():
+            return existing.future
+
+        loop = asyncio.get_running_loop()
+        item = _PendingItem(
+            key=key,
+            check=check,
+            future=loop.create_future(),
+            deadline=loop.time() + timeout,
+            timeout_result=timeout_result,
+            interval=self.initial_interval
+        )
+        item.next_poll_at = loop.time() + self._jittered(self.initial_interval)
+        self._items[key] = item
+        self._ensure_running()
+        self._wakeup.set()
+        return item.future
+
+    async def wait(self, key: str, check: CheckFn, timeout: float, timeout_result: Any = None) -> Any:
+        """Convenience wrapper around watch() that awaits the result"""
+        return await self.watch(key, check, timeout, timeout_result)
+
+    def pending_count(self) -> int:
+        return len(self._items)
+
+    def stats(self) -> Dict[str, Any]:
+        """Poll counters, including how many polls each completion cost"""
+        return {
+            "pending": len(self._items),
+            "total_polls": self.total_polls,
+            "completed": self.completed,
+            "timed_out": self.timed_out,
+            "avg_polls_per_completion": (
+                sum(n * c for n, c in self.polls_per_completion.items()) / self.completed
+                if self.completed else 0.0
+            ),
+            "polls_per_completion": dict(sorted(self.polls_per_completion.items()))
+        }
+
+    def _jittered(self, interval: float) -> float:
+        return interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def _ensure_running(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while self._items:
+            now = loop.time()
+            next_at = None
+
+            for key, item in list(self._items.items()):
+                if item.future.done():
+                    # Waiter went away (e.g. client disconnected)
+                    del self._items[key]
+                    continue
+                if item.in_flight:
+                    continue
+                if now >= item.deadline:
+                    log_event(logger, logging.WARNING, "poll timed out", key=key, polls=item.polls)
+                    self.timed_out += 1
+                    item.future.set_result(item.timeout_result)
+                    del self._items[key]
+                    continue
+                if now >= item.next_poll_at:
+                    item.in_flight = True
+                    loop.create_task(self._poll(item))
+                    continue
+                wake_at = min(item.next_poll_at, item.deadline)
+                next_at = wake_at if next_at is None else min(next_at, wake_at)
+
+            if not self._items:
+                break
+
+            self._wakeup.clear()
+            delay = None if next_at is None else max(0.0, next_at - loop.time())
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _poll(self, item: _PendingItem):
+        loop = asyncio.get_running_loop()
+        try:
+            item.polls += 1
+            self.total_polls += 1
+            poll_iterations.inc(kind=item.key.split(":", 1)[0])
+            result = await item.check()
+        except Exception as e:
+            self._finish(item)
+            if not item.future.done():
+                item.future.set_exception(e)
+            return
+
+        if result is not None:
+            self.completed += 1
+            self.polls_per_completion[item.polls] += 1
+            self._finish(item)
+            if not item.future.done():
+                item.future.set_result(result)
+            return
+
+        item.interval = min(item.interval * self.backoff_factor, self.max_interval)
+        item.next_poll_at = loop.time() + self._jittered(item.interval)
+        item.in_flight = False
+        self._wakeup.set()
+
+    def _finish(self, item: _PendingItem):
+        if self._items.get(item.key) is item:
+            del self._items[item.key]
+        self._wakeup.set()
+
+
+# Global instance
+run_poller = RunPoller()
@@ -0,0 +1,417 @@
+import html
+import io
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from app.services.document_normalize import html_to_text
+from app.services.provider import Provider
+
+DEFAULT_SEARCH_INDEX_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "data", "search_index.db")
+
+# Extensions whose content can be indexed as text without extra dependencies
+TEXT_EXTENSIONS = {
+    ".txt", ".md", ".csv", ".tsv", ".json", ".html", ".htm", ".xml",
+    ".py", ".js", ".ts", ".java", ".c", ".cpp", ".h", ".cs", ".go", ".rb", ".php", ".sh", ".css", ".tex"
+}
+
+# Indexed when the optional pypdf package is installed
+PDF_EXTENSION = ".pdf"
+
+# Runs of Thai, of CJK (no spaces between words) and of other word characters
+_TOKEN_RUNS = re.compile(r"([\u0e00-\u0e7f]+)|([\u3040-\u30ff\u3400-\u9fff]+)|(\w+)")
+_HTML_TAGS = re.compile(r"<(script|style)\b.*?</\1>|<[^>]+>", re.S | re.I)
+_PARAGRAPHS = re.compile(r"\n\s*\n")
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+
+@lru_cache(maxsize=None)
+def _thai_segmenter() -> Optional[Callable[..., List[str]]]:
+    """pythainlp's word segmenter, imported on first Thai text (it loads slowly)"""
+    try:
+        from pythainlp.tokenize import word_tokenize
+    except ImportError:  # Fall back to character bigrams for Thai
+        return None
+    return word_tokenize
+
+
+@lru_cache(maxsize=None)
+def _pdf_reader() -> Optional[Callable[..., Any]]:
+    """pypdf's PdfReader, imported on first PDF; None if not installed"""
+    try:
+        from pypdf import PdfReader
+    except ImportError:  # PDFs are not indexed
+        return None
+    return PdfReader
+
+
+def _bigrams(run: str) -> List[str]:
+    if len(run) == 1:
+        return [run]
+    return [run[i:i + 2] for i in range(len(run) - 1)]
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Index terms of text. Latin words are case-folded; Thai is segmented into
+    words with pythainlp when it is installed, otherwise (like CJK) split
+    into overlapping character bigrams, which needs no dictionary.
+    """
+    text = unicodedata.normalize("NFKC", text).casefold()
+    terms: List[str] = []
+    for thai, cjk, word in _TOKEN_RUNS.findall(text):
+        if thai:
+            segmenter = _thai_segmenter()
+            if segmenter is not None:
+                terms.extend(t for t in segmenter(thai, engine="newmm", keep_whitespace=False) if t.strip())
+            else:
+                terms.extend(_bigrams(thai))
+        elif cjk:
+            terms.extend(_bigrams(cjk))
+        else:
+            terms.append(word)
+    return terms
+
+
+def is_indexable(filename: Optional[str]) -> bool:
+    ext = os.path.splitext(filename or "")[1].lower()
+    return ext in TEXT_EXTENSIONS or (ext == PDF_EXTENSION and _pdf_reader() is not None)
+
+
+def pdf_text(content: bytes) -> str:
+    """Text layer of a PDF, one paragraph break between pages (scanned pages have none)"""
+    reader = _pdf_reader()(io.BytesIO(content))
+    return "\n\n".join(page.extract_text() or "" for page in reader.pages)
+
+
+def extract_text(content: bytes, filename: Optional[str]) -> Optional[str]:
+    """Plain text of an uploaded file, or None if the type is not indexable"""
+    if not is_indexable(filename):
+        return None
+    ext = os.path.splitext(filename)[1].lower()
+    if ext == PDF_EXTENSION:
+        return pdf_text(content)
+    text = content.decode("utf-8", errors="replace")
+    if ext in (".html", ".htm"):
+        text = html_to_text(text)
+    elif ext == ".xml":
+        text = html.unescape(_HTML_TAGS.sub(" ", text))
+    elif ext == ".json":
+        try:
+            # Values only, so keys and punctuation do not dominate the terms
+            text = "\n".join(_json_values(json.loads(text)))
+        except ValueError:
+            pass
+    return text
+
+
+def _json_values(value: Any) -> Iterator[str]:
+    if isinstance(value, dict):
+        for key, item in value.items():
+            for text in _json_values(item):
+                yield f"{key}: {text}"
+    elif isinstance(value, list):
+        for item in value:
+            yield from _json_values(item)
+    elif value is not None:
+        yield str(value)
+
+
+def split_passages(text: str, max_chars: int = 800) -> List[str]:
+    """Split text into passages of whole paragraphs (or lines) up to max_chars"""
+    passages: List[str] = []
+    current = ""
+    for paragraph in _PARAGRAPHS.split(text):
+        for piece in [paragraph] if len(paragraph) <= max_chars else paragraph.splitlines():
+            piece = piece.strip()
+            while len(piece) > max_chars:
+                passages.append(piece[:max_chars])
+                piece = piece[max_chars:]
+            if not piece:
+                continue
+            if current and len(current) + len(piece) + 1 > max_chars:
+                passages.append(current)
+                current = piece
+            else:
+                current = f"{current}\n{piece}" if current else piece
+    if current:
+        passages.append(current)
+    return passages
+
+
+def _encode_varint(value: int, out: bytearray):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def decode_postings(data: bytes) -> Iterator[Tuple[int, int]]:
+    """Yield (passage_id, term_frequency) from a posting list"""
+    passage_id = 0
+    value = shift = 0
+    first = True
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        if first:
+            passage_id += value
+        else:
+            yield passage_id, value
+        first = not first
+        value = shift = 0
+
+
+def encode_postings(entries: List[Tuple[int, int]], last_id: int = 0) -> bytes:
+    """
+    Posting list as varint pairs of (passage_id delta, term frequency).
+    Passage IDs only grow, so new postings are appended to the end of the
+    existing list, with deltas continuing from its last ID.
+    """
+    out = bytearray()
+    for passage_id, tf in entries:
+        _encode_varint(passage_id - last_id, out)
+        _encode_varint(tf, out)
+        last_id = passage_id
+    return bytes(out)
+
+
+class SearchIndex:
+    """
+    Offline BM25 index over passages of uploaded text files.
+
+    Posting lists are kept in memory as compact varint byte strings and
+    persisted in SQLite, together with passage text (only read for the
+    results that are returned). Files are indexed incrementally; other
+    workers' additions are picked up through SQLite's data_version.
+    """
+
+    def __init__(self, path: Optional[str] = None, passage_chars: Optional[int] = None, max_bytes: Optional[int] = None):
+        self.path = path or os.getenv("SEARCH_INDEX_PATH", DEFAULT_SEARCH_INDEX_PATH)
+        self.passage_chars = passage_chars or int(os.getenv("SEARCH_PASSAGE_CHARS", 800))
+        # Larger uploads are not indexed, so indexing never holds them in memory
+        self.max_bytes = max_bytes or int(os.getenv("SEARCH_INDEX_MAX_BYTES", 5 * 1024 * 1024))
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS passages (
+                id INTEGER PRIMARY KEY,
+                file_id TEXT NOT NULL,
+                filename TEXT,
+                position INTEGER NOT NULL,
+                length INTEGER NOT NULL,
+                text TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS passages_file_id ON passages (file_id);
+            CREATE TABLE IF NOT EXISTS postings (
+                term TEXT PRIMARY KEY,
+                last_id INTEGER NOT NULL,
+                data BLOB NOT NULL
+            );
+        """)
+        self._conn.commit()
+
+        # term -> (last passage id, encoded postings)
+        self._postings: Dict[str, Tuple[int, bytes]] = {}
+        # passage id -> (file_id, length in terms)
+        self._passages: Dict[int, Tuple[str, int]] = {}
+        self._total_length = 0
+        self._data_version = None
+        self._load()
+
+        # Counters
+        self.queries = 0
+        self.files_indexed = 0
+        self.skipped_too_large = 0
+
+    def _load(self):
+        with self._lock:
+            self._postings = {
+                term: (last_id, data)
+                for term, last_id, data in self._conn.execute("SELECT term, last_id, data FROM postings")
+            }
+            self._passages = {
+                pid: (file_id, length)
+                for pid, file_id, length in self._conn.execute("SELECT id, file_id, length FROM passages")
+            }
+            self._total_length = sum(length for _, length in self._passages.values())
+            self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _refresh_if_changed(self):
+        """Reload if another connection (worker) committed since our last read"""
+        version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if version != self._data_version:
+            self._load()
+
+    def accepts(self, size: int) -> bool:
+        """Whether a file of size bytes is small enough to index (counts the ones that are not)"""
+        if size > self.max_bytes:
+            self.skipped_too_large += 1
+            return False
+        return True
+
+    def has_file(self, file_id: str) -> bool:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM passages WHERE file_id = ? LIMIT 1", (file_id,)
+            ).fetchone() is not None
+
+    def add_file(self, file_id: str, filename: Optional[str], text: str) -> int:
+        """Index the passages of one file; returns the number of passages added"""
+        tokenized = []
+        for passage in split_passages(text, self.passage_chars):
+            terms = tokenize(passage)
+            counts: Dict[str, int] = {}
+            for term in terms:
+                counts[term] = counts.get(term, 0) + 1
+            tokenized.append((passage, counts, len(terms)))
+        if not tokenized:
+            return 0
+
+        with self._lock:
+            # Take the write lock first so postings read below cannot be
+            # overwritten by another worker indexing at the same time
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._refresh_if_changed()
+                if self.has_file(file_id):
+                    self._conn.rollback()
+                    return 0
+
+                # IDs are never reused, even after removals: stale postings of
+                # removed passages must not point at new ones
+                next_id = max(
+                    self._conn.execute("SELECT MAX(id) FROM passages").fetchone()[0] or 0,
+                    self._conn.execute("SELECT MAX(last_id) FROM postings").fetchone()[0] or 0
+                ) + 1
+                new_postings: Dict[str, List[Tuple[int, int]]] = {}
+                rows = []
+                for position, (passage, counts, length) in enumerate(tokenized):
+                    passage_id = next_id + position
+                    for term, tf in counts.items():
+                        new_postings.setdefault(term, []).append((passage_id, tf))
+                    rows.append((passage_id, file_id, filename, position, length, passage))
+
+                updated = []
+                for term, entries in new_postings.items():
+                    last_id, data = self._postings.get(term, (0, b""))
+                    updated.append((term, entries[-1][0], data + encode_postings(entries, last_id)))
+
+                self._conn.executemany(
+                    "INSERT INTO passages (id, file_id, filename, position, length, text) VALUES (?, ?, ?, ?, ?, ?)", rows
+                )
+                self._conn.executemany("INSERT OR REPLACE INTO postings (term, last_id, data) VALUES (?, ?, ?)", updated)
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+
+            for term, last_id, data in updated:
+                self._postings[term] = (last_id, data)
+            for passage_id, _, _, _, length, _ in rows:
+                self._passages[passage_id] = (file_id, length)
+                self._total_length += length
+            self.files_indexed += 1
+        return len(rows)
+
+    def remove_file(self, file_id: str) -> int:
+        """
+        Remove a file's passages. Their postings are left in place and skipped
+        at query time, since the passage no longer exists.
+        """
+        with self._lock:
+            removed = self._conn.execute("DELETE FROM passages WHERE file_id = ?", (file_id,)).rowcount
+            self._conn.commit()
+            for passage_id, (owner, length) in list(self._passages.items()):
+                if owner == file_id:
+                    del self._passages[passage_id]
+                    self._total_length -= length
+        return removed
+
+    def search(self, query: str, limit: int = 10, file_ids: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Top passages for query by BM25, optionally restricted to file_ids"""
+        terms = set(tokenize(query))
+        with self._lock:
+            self._refresh_if_changed()
+            self.queries += 1
+            n = len(self._passages)
+            if not terms or n == 0:
+                return []
+            avg_length = self._total_length / n
+            allowed = set(file_ids) if file_ids else None
+
+            scores: Dict[int, float] = {}
+            for term in terms:
+                posting = self._postings.get(term)
+                if posting is None:
+                    continue
+                entries = [(pid, tf) for pid, tf in decode_postings(posting[1]) if pid in self._passages]
+                if not entries:
+                    continue
+                idf = math.log(1 + (n - len(entries) + 0.5) / (len(entries) + 0.5))
+                for passage_id, tf in entries:
+                    owner, length = self._passages[passage_id]
+                    if allowed is not None and owner not in allowed:
+                        continue
+                    norm = tf + K1 * (1 - B + B * length / avg_length)
+                    scores[passage_id] = scores.get(passage_id, 0.0) + idf * tf * (K1 + 1) / norm
+
+            top = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+            if not top:
+                return []
+            placeholders = ",".join("?" for _ in top)
+            rows = {
+                row[0]: row[1:]
+                for row in self._conn.execute(
+                    f"SELECT id, file_id, filename, position, text FROM passages WHERE id IN ({placeholders})",
+                    [passage_id for passage_id, _ in top]
+                )
+            }
+
+        results = []
+        for passage_id, score in top:
+            file_id, filename, position, text = rows[passage_id]
+            results.append({
+                "file_id": file_id,
+                "filename": filename,
+                "passage": position,
+                "text": text,
+                "score": round(score, 4)
+            })
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            files = self._conn.execute("SELECT COUNT(DISTINCT file_id) FROM passages").fetchone()[0]
+            return {
+                "files": files,
+                "passages": len(self._passages),
+                "terms": len(self._postings),
+                "postings_bytes": sum(len(data) for _, data in self._postings.values()),
+                "thai_segmenter": "pythainlp" if _thai_segmenter() is not None else "bigram",
+                "queries": self.queries,
+                "max_bytes": self.max_bytes,
+                "skipped_too_large": self.skipped_too_large
+            }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# Global instance
+search_index: Provider[SearchIndex] = Provider("search_index", SearchIndex)
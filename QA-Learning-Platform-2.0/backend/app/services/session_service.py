@@ -1,59 +1,238 @@
+import base64
+import json
+import logging
 import uuid
-from typing import Dict, Optional
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
 from datetime import datetime
-from app.models.chat import ChatSession, Message
-from app.services.openai_service import OpenAIService
+from app.logging_config import get_logger, log_event
+from app.models.chat import ChatSession, Message, SessionSummary
+from app.services.file_metadata import file_metadata, resolve_citations
+from app.services.openai_service import openai_service
+from app.services.provider import Provider
+from app.services.session_vector_stores import session_vector_stores
+from app.services.session_store import SessionStore, SummaryCursor, create_session_store
+from app.services.thread_pool import thread_pool
+
+logger = get_logger("sessions")
+
+def encode_cursor(value) -> str:
+    """Opaque, URL-safe pagination cursor"""
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str):
+    """Inverse of encode_cursor; raises ValueError for malformed cursors"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+def _unrecorded(recorded: List[Message], thread_messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Thread messages without a counterpart (same role and content) among the recorded ones"""
+    remaining = Counter((m.role, m.content) for m in recorded)
+    new_messages = []
+    for thread_message in thread_messages:
+        key = (thread_message["role"], thread_message["content"])
+        if remaining[key]:
+            remaining[key] -= 1
+        else:
+            new_messages.append(thread_message)
+    return new_messages
 
 class SessionService:
-    def __init__(self):
-        self.sessions: Dict[str, ChatSession] = {}
-        self.openai_service = OpenAIService()
+    def __init__(self, store: Optional[SessionStore] = None):
+        # Backend is chosen by SESSION_STORE (sqlite by default, or memory)
+        self.store = store or create_session_store()
+        self.openai_service = openai_service
 
-    def create_session(self) -> ChatSession:
-        """Create a new chat session with a new thread"""
+    async def create_session(
+        self,
+        user_id: Optional[str] = None,
+        thread_id: Optional[str] = None,
+        thread_seed: Optional[List[Dict[str, str]]] = None
+    ) -> ChatSession:
+        """
+        Create a new chat session owned by user_id if given. The thread is
+        thread_id if given, else a pre-created one from the pool, else a new
+        one. With thread_seed (an exchange already answered) no thread is
+        created here: ensure_thread() creates it, seeded, when it is needed.
+        """
         session_id = str(uuid.uuid4())
-        thread_id = self.openai_service.create_thread()
+        thread_id = thread_id or thread_pool.acquire()
+        if not thread_id and thread_seed is None:
+            thread_id = await self.openai_service.create_thread()
 
         session = ChatSession(
             id=session_id,
             thread_id=thread_id,
+            user_id=user_id,
+            thread_seed=thread_seed,
             messages=[],
             created_at=datetime.now(),
             updated_at=datetime.now()
         )
 
-        self.sessions[session_id] = session
+        self.store.create(session)
         return session
 
     def get_session(self, session_id: str) -> Optional[ChatSession]:
-        """Get a session by ID"""
-        return self.sessions.get(session_id)
+        """Get a session by ID (messages are loaded when the session is opened)"""
+        return self.store.get(session_id)
+
+    def set_thread_seed(self, session_id: str, seed: List[Dict[str, str]]) -> bool:
+        """Post seed (an exchange answered without a run) to the thread before its next run"""
+        return self.store.set_thread_seed(session_id, seed)
+
+    async def ensure_thread(self, session: ChatSession) -> ChatSession:
+        """
+        The session with its thread created and its thread seed posted (call
+        before anything uses the thread). Safe to race from several workers:
+        only one thread is kept and the seed is posted once.
+        """
+        if not session.thread_id:
+            seed = session.thread_seed or []
+            thread_id = await self.openai_service.create_thread(initial_messages=seed or None)
+            if not self.store.attach_thread(session.id, thread_id):
+                # Another request created one first
+                await self.openai_service.delete_thread(thread_id)
+            elif seed:
+                await self.record_initial_messages(session.id, thread_id, len(seed))
+            return self.store.get(session.id)
 
-    def delete_session(self, session_id: str) -> bool:
-        """Delete a session and its thread"""
-        session = self.sessions.get(session_id)
+        if session.thread_seed:
+            seed = self.store.take_thread_seed(session.id)
+            if seed:
+                try:
+                    for message in seed:
+                        message_id = await self.openai_service.send_message(
+                            session.thread_id, message["content"], role=message["role"]
+                        )
+                    self.store.set_thread_cursor(session.id, message_id)
+                except Exception as e:
+                    # The next run goes ahead without the exchange as context
+                    log_event(logger, logging.WARNING, "seeding thread failed",
+                              thread_id=session.thread_id, error=str(e))
+            session = self.store.get(session.id)
+        return session
+
+    async def delete_session(self, session_id: str) -> bool:
+        """Delete a session, its thread and its attachments"""
+        session = self.store.delete(session_id)
+        if session and not session.thread_id:
+            return True
         if session:
+            await session_vector_stores.release(session.thread_id)
             # Delete the OpenAI thread
-            thread_deleted = self.openai_service.delete_thread(session.thread_id)
-
-            # Remove from memory
-            del self.sessions[session_id]
-            return thread_deleted
+            return await self.openai_service.delete_thread(session.thread_id)
 
         return False
 
     def add_message_to_session(self, session_id: str, message: Message) -> bool:
         """Add a message to a session"""
-        session = self.sessions.get(session_id)
-        if session:
-            session.messages.append(message)
-            session.updated_at = datetime.now()
-            return True
-        return False
+        return self.store.append_message(session_id, message)
 
     def get_all_sessions(self) -> Dict[str, ChatSession]:
         """Get all sessions"""
-        return self.sessions
+        return self.store.all_sessions()
+
+    def set_thread_cursor(self, session_id: str, message_id: Optional[str]) -> bool:
+        """Mark thread messages up to message_id as already recorded in the session"""
+        if not message_id:
+            return False
+        return self.store.set_thread_cursor(session_id, message_id)
+
+    async def record_initial_messages(self, session_id: str, thread_id: str, count: int) -> bool:
+        """
+        Set the cursor of a session whose thread was created with count
+        messages already in it, unless a later message has set it first
+        """
+        messages = await self.openai_service.get_thread_messages(thread_id)
+        if len(messages) < count:
+            return False
+        return self.store.set_thread_cursor(session_id, messages[count - 1]["id"], only_if_unset=True)
+
+    async def sync_from_thread(self, session_id: str) -> Optional[int]:
+        """
+        Append thread messages the session has not seen yet (e.g. written by
+        another client) and advance the sync cursor. Only messages after the
+        cursor are fetched; without a cursor the whole thread is fetched and
+        messages the session already has are skipped. Returns the number of
+        new messages, or None if the session does not exist.
+        """
+        session = self.store.get(session_id)
+        if not session:
+            return None
+        if not session.thread_id:
+            return 0
+
+        fetched = await self.openai_service.get_thread_messages(
+            session.thread_id, after=session.thread_cursor
+        )
+        new_messages = fetched if session.thread_cursor else _unrecorded(session.messages, fetched)
+        # One batched metadata lookup for every file the new messages cite
+        await file_metadata.resolve([c["file_id"] for m in new_messages for c in m["citations"]])
+        for thread_message in new_messages:
+            self.store.append_message(session_id, Message(
+                role=thread_message["role"],
+                content=thread_message["content"],
+                timestamp=thread_message["created_at"],
+                citations=await resolve_citations(thread_message["citations"])
+            ))
+        if fetched:
+            self.store.set_thread_cursor(session_id, fetched[-1]["id"])
+        return len(new_messages)
+
+    def list_session_summaries(
+        self,
+        user_id: Optional[str],
+        limit: int,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[SessionSummary], Optional[str]]:
+        """
+        One page of session summaries (newest first) and the cursor for the
+        next page, or None on the last page.
+        """
+        after: Optional[SummaryCursor] = None
+        if cursor:
+            value = decode_cursor(cursor)
+            if not (isinstance(value, list) and len(value) == 2):
+                raise ValueError("Invalid cursor")
+            after = (value[0], value[1])
+
+        # Fetch one extra row to know whether another page exists
+        summaries = self.store.list_summaries(user_id, limit + 1, after)
+        next_cursor = None
+        if len(summaries) > limit:
+            summaries = summaries[:limit]
+            last = summaries[-1]
+            next_cursor = encode_cursor([last.updated_at.isoformat(), last.id])
+        return summaries, next_cursor
+
+    def get_messages_page(
+        self,
+        session: ChatSession,
+        limit: int,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Message], Optional[str]]:
+        """
+        One page of a session's messages in chronological order. Messages are
+        append-only, so the cursor is simply the offset of the next message.
+        """
+        offset = 0
+        if cursor:
+            offset = decode_cursor(cursor)
+            if not isinstance(offset, int) or offset < 0:
+                raise ValueError("Invalid cursor")
+
+        messages = session.messages[offset:offset + limit]
+        next_offset = offset + len(messages)
+        next_cursor = encode_cursor(next_offset) if next_offset < len(session.messages) else None
+        return messages, next_cursor
+
+    def flush(self):
+        """Persist buffered message writes"""
+        self.store.flush()
 
 # Global instance
-session_service = SessionService()
+session_service: Provider[SessionService] = Provider("session_service", SessionService)
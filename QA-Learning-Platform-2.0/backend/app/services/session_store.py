@@ -0,0 +1,496 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from app.models.chat import ChatSession, Citation, Message, SessionSummary
+from app.runtime import is_production
+
+DEFAULT_SESSION_DB_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "data", "sessions.db")
+TITLE_MAX_LENGTH = 80
+
+# Keyset cursor for listings: (updated_at ISO string, session id) of the last row returned
+SummaryCursor = Tuple[str, str]
+
+
+def _title(content: Optional[str]) -> Optional[str]:
+    if not content:
+        return None
+    return content[:TITLE_MAX_LENGTH]
+
+
+class SessionStore:
+    """Storage backend interface for chat sessions"""
+
+    def create(self, session: ChatSession):
+        raise NotImplementedError
+
+    def get(self, session_id: str) -> Optional[ChatSession]:
+        raise NotImplementedError
+
+    def delete(self, session_id: str) -> Optional[ChatSession]:
+        """Remove a session, returning it if it existed"""
+        raise NotImplementedError
+
+    def append_message(self, session_id: str, message: Message) -> bool:
+        raise NotImplementedError
+
+    def all_sessions(self) -> Dict[str, ChatSession]:
+        raise NotImplementedError
+
+    def set_thread_cursor(self, session_id: str, message_id: str, only_if_unset: bool = False) -> bool:
+        """
+        Record the newest thread message that is reflected in the session
+        (only_if_unset: unless a cursor is already recorded)
+        """
+        raise NotImplementedError
+
+    def attach_thread(self, session_id: str, thread_id: str) -> bool:
+        """
+        Give a session without a thread its thread, which already holds the
+        session's thread seed (cleared). False if it already has one.
+        """
+        raise NotImplementedError
+
+    def set_thread_seed(self, session_id: str, seed: List[Dict[str, str]]) -> bool:
+        """Record messages to post to the session's thread before its next run"""
+        raise NotImplementedError
+
+    def take_thread_seed(self, session_id: str) -> Optional[List[Dict[str, str]]]:
+        """Clear and return the thread seed; only one caller (in any worker) gets it"""
+        raise NotImplementedError
+
+    def list_summaries(
+        self,
+        user_id: Optional[str],
+        limit: int,
+        cursor: Optional[SummaryCursor] = None
+    ) -> List[SessionSummary]:
+        """
+        Session summaries owned by user_id (or unowned sessions when None),
+        newest updated_at first, starting after cursor.
+        """
+        raise NotImplementedError
+
+    def flush(self):
+        """Persist any buffered writes"""
+
+    def close(self):
+        self.flush()
+
+
+class MemorySessionStore(SessionStore):
+    """Plain in-process dict; everything is lost on restart"""
+
+    def __init__(self):
+        self.sessions: Dict[str, ChatSession] = {}
+
+    def create(self, session: ChatSession):
+        self.sessions[session.id] = session
+
+    def get(self, session_id: str) -> Optional[ChatSession]:
+        return self.sessions.get(session_id)
+
+    def delete(self, session_id: str) -> Optional[ChatSession]:
+        return self.sessions.pop(session_id, None)
+
+    def append_message(self, session_id: str, message: Message) -> bool:
+        session = self.sessions.get(session_id)
+        if session:
+            session.messages.append(message)
+            session.updated_at = datetime.now()
+            return True
+        return False
+
+    def all_sessions(self) -> Dict[str, ChatSession]:
+        return self.sessions
+
+    def set_thread_cursor(self, session_id: str, message_id: str, only_if_unset: bool = False) -> bool:
+        session = self.sessions.get(session_id)
+        if session and not (only_if_unset and session.thread_cursor):
+            session.thread_cursor = message_id
+            return True
+        return False
+
+    def attach_thread(self, session_id: str, thread_id: str) -> bool:
+        session = self.sessions.get(session_id)
+        if session and not session.thread_id:
+            session.thread_id = thread_id
+            session.thread_seed = None
+            return True
+        return False
+
+    def set_thread_seed(self, session_id: str, seed: List[Dict[str, str]]) -> bool:
+        session = self.sessions.get(session_id)
+        if session:
+            session.thread_seed = seed
+            return True
+        return False
+
+    def take_thread_seed(self, session_id: str) -> Optional[List[Dict[str, str]]]:
+        session = self.sessions.get(session_id)
+        if not session:
+            return None
+        seed, session.thread_seed = session.thread_seed, None
+        return seed
+
+    def list_summaries(
+        self,
+        user_id: Optional[str],
+        limit: int,
+        cursor: Optional[SummaryCursor] = None
+    ) -> List[SessionSummary]:
+        ordered = sorted(
+            (s for s in self.sessions.values() if s.user_id == user_id),
+            key=lambda s: (s.updated_at.isoformat(), s.id),
+            reverse=True
+        )
+        if cursor:
+            ordered = [s for s in ordered if (s.updated_at.isoformat(), s.id) < cursor]
+        return [
+            SessionSummary(
+                id=s.id,
+                thread_id=s.thread_id,
+                title=_title(next((m.content for m in s.messages if m.role == "user"), None)),
+                message_count=len(s.messages),
+                created_at=s.created_at,
+                updated_at=s.updated_at
+            )
+            for s in ordered[:limit]
+        ]
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Durable session store backed by SQLite in WAL mode.
+
+    Only a bounded LRU of recently used sessions is kept in memory, with
+    their messages loaded when the session is opened. Appended messages are
+    buffered and written in one transaction once the buffer fills up, by a
+    timer flush_interval after the oldest buffered message (so a quiet
+    session's last messages are not left in memory), and on flush() (called
+    on shutdown and before any read that hits the database).
+
+    In shared mode (several worker processes on one database) appends are
+    written through immediately and cached sessions are revalidated against
+    the database on every get, so no worker serves a stale copy.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        cache_size: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        shared: Optional[bool] = None
+    ):
+        self.path = path or os.getenv("SESSION_DB_PATH", DEFAULT_SESSION_DB_PATH)
+        self.cache_size = cache_size or int(os.getenv("SESSION_CACHE_SIZE", 256))
+        self.batch_size = batch_size or int(os.getenv("SESSION_WRITE_BATCH_SIZE", 32))
+        self.flush_interval = flush_interval if flush_interval is not None else float(os.getenv("SESSION_FLUSH_INTERVAL", 1.0))
+        self.shared = shared if shared is not None else is_production()
+        if self.shared:
+            self.batch_size = 1
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                id TEXT PRIMARY KEY,
+                thread_id TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS messages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id TEXT NOT NULL REFERENCES sessions (id) ON DELETE CASCADE,
+                role TEXT NOT NULL,
+                content TEXT NOT NULL,
+                timestamp TEXT
+            );
+            CREATE INDEX IF NOT EXISTS messages_session ON messages (session_id, id);
+        """)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(sessions)")}
+        # thread_seed: JSON list of messages; thread_id is '' until the thread exists
+        for column in ["user_id", "thread_cursor", "thread_seed"]:
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE sessions ADD COLUMN {column} TEXT")
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(messages)")}
+        if "citations" not in columns:
+            self._conn.execute("ALTER TABLE messages ADD COLUMN citations TEXT")  # JSON list
+        self._conn.execute("CREATE INDEX IF NOT EXISTS sessions_user_updated ON sessions (user_id, updated_at, id)")
+        self._conn.commit()
+
+        self._cache: "OrderedDict[str, ChatSession]" = OrderedDict()
+        # Buffered (session_id, message, updated_at) rows
+        self._pending: List[Tuple[str, Message, datetime]] = []
+        self._pending_since = 0.0
+        self._flush_timer: Optional[threading.Timer] = None
+
+    def create(self, session: ChatSession):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO sessions (id, thread_id, user_id, thread_cursor, thread_seed, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (session.id, session.thread_id or "", session.user_id, session.thread_cursor,
+                 self._seed_json(session.thread_seed), session.created_at.isoformat(), session.updated_at.isoformat())
+            )
+            self._conn.executemany(
+                "INSERT INTO messages (session_id, role, content, timestamp, citations) VALUES (?, ?, ?, ?, ?)",
+                [self._message_row(session.id, m) for m in session.messages]
+            )
+            self._conn.commit()
+            self._cache_put(session)
+
+    def get(self, session_id: str) -> Optional[ChatSession]:
+        with self._lock:
+            session = self._cache.get(session_id)
+            if session and (not self.shared or self._is_current(session)):
+                self._cache.move_to_end(session_id)
+                return session
+
+            self._flush_locked()
+            session = self._load(session_id)
+            if session:
+                self._cache_put(session)
+            return session
+
+    def delete(self, session_id: str) -> Optional[ChatSession]:
+        with self._lock:
+            session = self.get(session_id)
+            if not session:
+                return None
+            self._pending = [p for p in self._pending if p[0] != session_id]
+            self._conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            self._conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+            self._conn.commit()
+            self._cache.pop(session_id, None)
+            return session
+
+    def append_message(self, session_id: str, message: Message) -> bool:
+        with self._lock:
+            updated_at = datetime.now()
+            session = self._cache.get(session_id)
+            if session:
+                self._cache.move_to_end(session_id)
+                session.messages.append(message)
+                session.updated_at = updated_at
+            elif not self._conn.execute("SELECT 1 FROM sessions WHERE id = ?", (session_id,)).fetchone():
+                return False
+            # Sessions that are not hot are not loaded just to append to them
+
+            if not self._pending:
+                self._pending_since = time.monotonic()
+            self._pending.append((session_id, message, updated_at))
+            if (len(self._pending) >= self.batch_size
+                    or time.monotonic() - self._pending_since >= self.flush_interval):
+                self._flush_locked()
+            elif self._flush_timer is None:
+                self._flush_timer = threading.Timer(self.flush_interval, self.flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+            return True
+
+    def all_sessions(self) -> Dict[str, ChatSession]:
+        with self._lock:
+            self._flush_locked()
+            ids = [row[0] for row in self._conn.execute("SELECT id FROM sessions ORDER BY updated_at DESC")]
+            sessions = {}
+            for session_id in ids:
+                session = self._cache.get(session_id) or self._load(session_id)
+                if session:
+                    sessions[session_id] = session
+            return sessions
+
+    def set_thread_cursor(self, session_id: str, message_id: str, only_if_unset: bool = False) -> bool:
+        query = "UPDATE sessions SET thread_cursor = ? WHERE id = ?"
+        if only_if_unset:
+            query += " AND thread_cursor IS NULL"
+        with self._lock:
+            updated = self._conn.execute(query, (message_id, session_id)).rowcount
+            self._conn.commit()
+            session = self._cache.get(session_id)
+            if session and updated:
+                session.thread_cursor = message_id
+            return updated > 0
+
+    def attach_thread(self, session_id: str, thread_id: str) -> bool:
+        with self._lock:
+            updated = self._conn.execute(
+                "UPDATE sessions SET thread_id = ?, thread_seed = NULL WHERE id = ? AND thread_id = ''",
+                (thread_id, session_id)
+            ).rowcount
+            self._conn.commit()
+            self._cache.pop(session_id, None)
+            return updated > 0
+
+    def set_thread_seed(self, session_id: str, seed: List[Dict[str, str]]) -> bool:
+        with self._lock:
+            updated = self._conn.execute(
+                "UPDATE sessions SET thread_seed = ? WHERE id = ?", (self._seed_json(seed), session_id)
+            ).rowcount
+            self._conn.commit()
+            session = self._cache.get(session_id)
+            if session:
+                session.thread_seed = seed
+            return updated > 0
+
+    def take_thread_seed(self, session_id: str) -> Optional[List[Dict[str, str]]]:
+        with self._lock:
+            row = self._conn.execute("SELECT thread_seed FROM sessions WHERE id = ?", (session_id,)).fetchone()
+            if row is None or row[0] is None:
+                return None
+            # Conditional, so of several workers only one takes it
+            taken = self._conn.execute(
+                "UPDATE sessions SET thread_seed = NULL WHERE id = ? AND thread_seed = ?", (session_id, row[0])
+            ).rowcount
+            self._conn.commit()
+            session = self._cache.get(session_id)
+            if session:
+                session.thread_seed = None
+            return json.loads(row[0]) if taken else None
+
+    def list_summaries(
+        self,
+        user_id: Optional[str],
+        limit: int,
+        cursor: Optional[SummaryCursor] = None
+    ) -> List[SessionSummary]:
+        query = """
+            SELECT s.id, NULLIF(s.thread_id, ''), s.created_at, s.updated_at,
+                   (SELECT COUNT(*) FROM messages m WHERE m.session_id = s.id),
+                   (SELECT m.content FROM messages m
+                     WHERE m.session_id = s.id AND m.role = 'user' ORDER BY m.id LIMIT 1)
+            FROM sessions s
+            WHERE s.user_id IS ?
+        """
+        params: list = [user_id]
+        if cursor:
+            query += " AND (s.updated_at < ? OR (s.updated_at = ? AND s.id < ?))"
+            params.extend([cursor[0], cursor[0], cursor[1]])
+        query += " ORDER BY s.updated_at DESC, s.id DESC LIMIT ?"
+        params.append(limit)
+
+        with self._lock:
+            self._flush_locked()
+            rows = self._conn.execute(query, params).fetchall()
+        return [
+            SessionSummary(
+                id=row[0],
+                thread_id=row[1],
+                title=_title(row[5]),
+                message_count=row[4],
+                created_at=datetime.fromisoformat(row[2]),
+                updated_at=datetime.fromisoformat(row[3])
+            )
+            for row in rows
+        ]
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def close(self):
+        with self._lock:
+            self._flush_locked()
+            self._conn.close()
+
+    def _flush_locked(self):
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        self._conn.executemany(
+            "INSERT INTO messages (session_id, role, content, timestamp, citations) VALUES (?, ?, ?, ?, ?)",
+            [self._message_row(session_id, message) for session_id, message, _ in pending]
+        )
+        latest: Dict[str, datetime] = {}
+        for session_id, _, updated_at in pending:
+            latest[session_id] = updated_at
+        self._conn.executemany(
+            "UPDATE sessions SET updated_at = ? WHERE id = ?",
+            [(updated_at.isoformat(), session_id) for session_id, updated_at in latest.items()]
+        )
+        self._conn.commit()
+
+    def _load(self, session_id: str) -> Optional[ChatSession]:
+        row = self._conn.execute(
+            "SELECT id, thread_id, user_id, thread_cursor, thread_seed, created_at, updated_at FROM sessions WHERE id = ?",
+            (session_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        messages = [
+            Message(
+                role=role,
+                content=content,
+                timestamp=datetime.fromisoformat(timestamp) if timestamp else None,
+                citations=[Citation(**c) for c in json.loads(citations)] if citations else None
+            )
+            for role, content, timestamp, citations in self._conn.execute(
+                "SELECT role, content, timestamp, citations FROM messages WHERE session_id = ? ORDER BY id", (session_id,)
+            )
+        ]
+        return ChatSession(
+            id=row[0],
+            thread_id=row[1] or None,
+            user_id=row[2],
+            thread_cursor=row[3],
+            thread_seed=json.loads(row[4]) if row[4] else None,
+            messages=messages,
+            created_at=datetime.fromisoformat(row[5]),
+            updated_at=datetime.fromisoformat(row[6])
+        )
+
+    def _is_current(self, session: ChatSession) -> bool:
+        """Whether a cached session still matches the database (messages are append-only)"""
+        row = self._conn.execute(
+            "SELECT thread_cursor, (SELECT COUNT(*) FROM messages WHERE session_id = ?), thread_id, thread_seed "
+            "FROM sessions WHERE id = ?",
+            (session.id, session.id)
+        ).fetchone()
+        if row is None:
+            self._cache.pop(session.id, None)
+            return False
+        return (row[0] == session.thread_cursor and row[1] == len(session.messages)
+                and (row[2] or None) == session.thread_id and row[3] == self._seed_json(session.thread_seed))
+
+    def _cache_put(self, session: ChatSession):
+        self._cache[session.id] = session
+        self._cache.move_to_end(session.id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    @staticmethod
+    def _seed_json(seed: Optional[List[Dict[str, str]]]) -> Optional[str]:
+        return json.dumps(seed, ensure_ascii=False) if seed else None
+
+    @staticmethod
+    def _message_row(session_id: str, message: Message) -> Tuple[str, str, str, Optional[str], Optional[str]]:
+        return (
+            session_id,
+            message.role,
+            message.content,
+            message.timestamp.isoformat() if message.timestamp else None,
+            json.dumps([c.model_dump() for c in message.citations], ensure_ascii=False) if message.citations else None
+        )
+
+
+def create_session_store() -> SessionStore:
+    """Build the store selected by SESSION_STORE (sqlite or memory)"""
+    backend = os.getenv("SESSION_STORE", "sqlite").lower()
+    if backend == "memory":
+        return MemorySessionStore()
+    if backend == "sqlite":
+        return SQLiteSessionStore()
+    raise ValueError(f"Unknown SESSION_STORE backend: {backend}")
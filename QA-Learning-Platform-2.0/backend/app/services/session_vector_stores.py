@@ -0,0 +1,266 @@
+import asyncio
+import logging
+import math
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from app.logging_config import get_logger, log_event
+from app.services.file_metadata import file_metadata
+from app.services.ingestion_queue import ingestion_queue
+from app.services.metrics import session_vector_store_events
+from app.services.openai_service import openai_service
+from app.services.search_index import search_index
+from app.services.upload_index import upload_index
+
+logger = get_logger("vector_stores")
+
+
+class SessionVectorStores:
+    """
+    Per-session vector stores for chat attachments.
+
+    DemoVector (the assistant's own store, the course material) is
+    read-only. Files attached in a session are added to a store created for
+    that session's thread on first use and attached through the thread's
+    file_search tool_resources, so runs search the course material plus
+    the session's own files, and one user's files never reach another's
+    answers. The store is recorded in the upload index (shared by all
+    workers) with the time it was last used.
+
+    A background reaper deletes stores unused for longer than ttl, together
+    with the uploaded files no other store holds, and non-image uploads that
+    were never sent in a chat. OpenAI also expires each store a day after
+    the reaper would have (anchored to its last use), as a backstop for
+    when no app process is running.
+    """
+
+    def __init__(
+        self,
+        ttl: Optional[float] = None,
+        reap_interval: Optional[float] = None,
+        reap_batch: Optional[int] = None,
+        max_touched: int = 10000
+    ):
+        self.enabled = os.getenv("SESSION_VECTOR_STORES_ENABLED", "true").lower() == "true"
+        self.ttl = ttl if ttl is not None else float(os.getenv("SESSION_VECTOR_STORE_TTL", 7 * 86400))
+        self.reap_interval = reap_interval if reap_interval is not None else float(
+            os.getenv("SESSION_VECTOR_STORE_REAP_INTERVAL", 600)
+        )
+        self.reap_batch = reap_batch or int(os.getenv("SESSION_VECTOR_STORE_REAP_BATCH", 50))
+        self.expires_after_days = min(365, math.ceil(self.ttl / 86400) + 1)
+        # Last use is written at most this often per thread
+        self.touch_interval = min(self.ttl / 10, 3600.0)
+        self.max_touched = max_touched
+
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # thread_id -> monotonic time its store was last marked as used
+        self._touched: "OrderedDict[str, float]" = OrderedDict()
+        self._reaper_task: Optional[asyncio.Task] = None
+
+        # Counters
+        self.created = 0
+        self.reused = 0
+        self.released = 0
+        self.reaped = 0
+        self.files_deleted = 0
+        self.errors = 0
+        self.last_reap: Optional[Dict[str, Any]] = None
+
+    def start(self):
+        """Start the reaper (call from the running event loop)"""
+        if not self.enabled or self.reap_interval <= 0:
+            return
+        if self._reaper_task is None:
+            self._reaper_task = asyncio.get_running_loop().create_task(self._reap_loop())
+
+    async def close(self):
+        if self._reaper_task is not None:
+            self._reaper_task.cancel()
+            await asyncio.gather(self._reaper_task, return_exceptions=True)
+            self._reaper_task = None
+
+    async def for_thread(self, thread_id: str) -> str:
+        """The store attachments in thread_id go into, created and attached on first use"""
+        if not self.enabled:
+            return openai_service.vector_store_id
+
+        vector_store_id = upload_index.session_vector_store(thread_id)
+        if vector_store_id:
+            self.reused += 1
+            self.touch(thread_id)
+            return vector_store_id
+
+        future = self._inflight.get(thread_id)
+        if future is None:
+            future = asyncio.ensure_future(self._create(thread_id))
+            self._inflight[thread_id] = future
+            future.add_done_callback(lambda _: self._inflight.pop(thread_id, None))
+        # shield() keeps the shared creation running if this caller disconnects
+        return await asyncio.shield(future)
+
+    def has_store(self, thread_id: str) -> bool:
+        return self.enabled and upload_index.session_vector_store(thread_id) is not None
+
+    def touch(self, thread_id: str):
+        """Record that the thread was used, keeping its store (if any) from being reaped"""
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        last = self._touched.get(thread_id)
+        if last is not None and now - last < self.touch_interval:
+            return
+        self._touched[thread_id] = now
+        self._touched.move_to_end(thread_id)
+        while len(self._touched) > self.max_touched:
+            self._touched.popitem(last=False)
+        upload_index.touch_session_vector_store(thread_id)
+
+    async def release(self, thread_id: str) -> bool:
+        """Delete the thread's store and its files now (the session was deleted)"""
+        if not self.enabled:
+            return False
+        vector_store_id = upload_index.session_vector_store(thread_id)
+        orphans = upload_index.claim_session_vector_store(vector_store_id) if vector_store_id else None
+        if orphans is None:
+            return False
+        self._touched.pop(thread_id, None)
+        await self._delete_store(vector_store_id, orphans)
+        self.released += 1
+        session_vector_store_events.inc(event="released")
+        return True
+
+    async def reap(self) -> Dict[str, Any]:
+        """
+        Delete the stores unused for longer than ttl (detaching them from their
+        threads first), the files only they held, and non-image uploads older
+        than ttl that were never added to a store.
+        """
+        started = time.perf_counter()
+        idle_before = time.time() - self.ttl
+        stores = files = 0
+        for store in upload_index.idle_session_vector_stores(idle_before, self.reap_batch):
+            # Skipped if it was used again since the listing, or another worker reaped it
+            orphans = upload_index.claim_session_vector_store(store["vector_store_id"], idle_before)
+            if orphans is None:
+                continue
+            self._touched.pop(store["thread_id"], None)
+            try:
+                # The session may be reopened; its thread then searches DemoVector only
+                await openai_service.attach_vector_store(store["thread_id"], None)
+            except Exception as e:
+                if getattr(e, "status_code", None) != 404:
+                    log_event(logger, logging.WARNING, "detaching session vector store failed",
+                              thread_id=store["thread_id"], error=str(e))
+            files += await self._delete_store(store["vector_store_id"], orphans)
+            stores += 1
+            self.reaped += 1
+            session_vector_store_events.inc(event="reaped")
+
+        files += await self._delete_files(upload_index.unattached_uploads(idle_before, self.reap_batch))
+        self.last_reap = {
+            "at": time.time(),
+            "stores": stores,
+            "files": files,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 1)
+        }
+        if stores or files:
+            log_event(logger, logging.INFO, "reaped session vector stores", stores=stores, files=files)
+        return self.last_reap
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "shared_vector_store_id": openai_service.vector_store_id,
+            "shared_store_files": upload_index.vector_store_file_count(openai_service.vector_store_id),
+            "session_stores": upload_index.session_vector_store_count(),
+            "ttl": self.ttl,
+            "expires_after_days": self.expires_after_days,
+            "created": self.created,
+            "reused": self.reused,
+            "released": self.released,
+            "reaped": self.reaped,
+            "files_deleted": self.files_deleted,
+            "errors": self.errors,
+            "creating": len(self._inflight),
+            "last_reap": self.last_reap
+        }
+
+    async def _create(self, thread_id: str) -> str:
+        vector_store_id = await openai_service.create_session_vector_store(thread_id, self.expires_after_days)
+        winner = upload_index.record_session_vector_store(thread_id, vector_store_id)
+        if winner != vector_store_id:
+            # Another worker created one for this thread at the same time (and attaches it)
+            await openai_service.delete_vector_store(vector_store_id)
+            return winner
+        try:
+            await openai_service.attach_vector_store(thread_id, vector_store_id)
+        except Exception:
+            # Runs would not search an unattached store; the next attachment tries again
+            self.errors += 1
+            upload_index.claim_session_vector_store(vector_store_id)
+            await openai_service.delete_vector_store(vector_store_id)
+            raise
+        self.created += 1
+        session_vector_store_events.inc(event="created")
+        log_event(logger, logging.INFO, "session vector store created", thread_id=thread_id,
+                  vector_store_id=vector_store_id)
+        return vector_store_id
+
+    async def _delete_store(self, vector_store_id: str, orphans: List[str]) -> int:
+        """Delete a claimed store and the files no other store holds; returns files deleted"""
+        ingestion_queue.forget_vector_store(vector_store_id)
+        if not await openai_service.delete_vector_store(vector_store_id):
+            # OpenAI still expires it on its own
+            self.errors += 1
+        return await self._delete_files(orphans)
+
+    async def _delete_files(self, file_ids: List[str]) -> int:
+        # Kept: files being added to another store by this worker, and files
+        # a dedup lookup handed out within the ttl (another session may be
+        # about to send them). Those left in no store are collected as
+        # unattached uploads once unused for the ttl.
+        unused_before = time.time() - self.ttl
+        claimed = []
+        for file_id in file_ids:
+            if self._ingesting(file_id):
+                continue
+            entry = upload_index.claim_upload(file_id, unused_before)
+            if entry is not None:
+                claimed.append(entry)
+
+        results = await asyncio.gather(*(openai_service.delete_file(entry["file_id"]) for entry in claimed))
+        deleted = 0
+        for entry, ok in zip(claimed, results):
+            if ok:
+                deleted += 1
+                search_index.remove_file(entry["file_id"])
+                file_metadata.invalidate(entry["file_id"])
+            else:
+                # Retried by the next pass
+                self.errors += 1
+                if not upload_index.restore_upload(entry):
+                    log_event(logger, logging.WARNING, "file delete failed and cannot be retried",
+                              file_id=entry["file_id"])
+        self.files_deleted += deleted
+        session_vector_store_events.inc(deleted, event="file_deleted")
+        return deleted
+
+    @staticmethod
+    def _ingesting(file_id: str) -> bool:
+        job = ingestion_queue.get(file_id)
+        return job is not None and not job.finished
+
+    async def _reap_loop(self):
+        while True:
+            await asyncio.sleep(self.reap_interval)
+            try:
+                await self.reap()
+            except Exception:
+                self.errors += 1
+                logger.exception("reaping session vector stores failed")
+
+
+# Global instance
+session_vector_stores = SessionVectorStores()
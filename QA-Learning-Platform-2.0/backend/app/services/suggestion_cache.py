@@ -0,0 +1,144 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional
+
+from app.logging_config import get_logger, log_event
+
+FALLBACK_SUGGESTIONS = [
+    "นิยามการประมวลผลภาพ และความสำคัญของมัน",
+    "Unitary และ Fourier transform ต่างกันอย่างไร",
+    "จะคำนวณสถิติภาพได้อย่างไร",
+    "Sharpen Filters ใช้เพื่ออะไร"
+]
+
+SuggestionLoader = Callable[[], Awaitable[Optional[List[str]]]]
+
+logger = get_logger("suggestions")
+
+
+class _Entry:
+    def __init__(self, suggestions: List[str]):
+        self.suggestions = suggestions
+        self.fetched_at = time.monotonic()
+
+    def age(self) -> float:
+        return time.monotonic() - self.fetched_at
+
+
+class SuggestionCache:
+    """
+    In-memory cache for /chat/initialize suggestions, keyed by
+    (assistant_id, vector_store_id).
+
+    - Fresh entries (younger than ttl) are returned directly.
+    - Stale entries (younger than max_stale) are returned immediately while a
+      background refresh runs.
+    - Misses wait on a single shared load, so concurrent visitors trigger at
+      most one assistant run per key.
+    - A failed load is remembered for failure_ttl: until then misses return
+      None (callers fall back) and stale entries are served without another
+      refresh, so an outage costs one assistant run per key per failure_ttl.
+    """
+
+    def __init__(
+        self,
+        ttl: Optional[float] = None,
+        max_stale: Optional[float] = None,
+        failure_ttl: Optional[float] = None
+    ):
+        self.ttl = ttl if ttl is not None else float(os.getenv("SUGGESTION_CACHE_TTL", 3600))
+        self.max_stale = max_stale if max_stale is not None else float(os.getenv("SUGGESTION_CACHE_MAX_STALE", 86400))
+        self.failure_ttl = failure_ttl if failure_ttl is not None else float(
+            os.getenv("SUGGESTION_CACHE_FAILURE_TTL", 30)
+        )
+        self._entries: Dict[Hashable, _Entry] = {}
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        # key -> monotonic time of its last failed load
+        self._failed: Dict[Hashable, float] = {}
+
+        # Counters
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.failures = 0
+        self.negative_hits = 0
+
+    async def get(self, key: Hashable, loader: SuggestionLoader) -> Optional[List[str]]:
+        """Return cached suggestions for key, loading or refreshing them as needed"""
+        entry = self._entries.get(key)
+        if entry:
+            age = entry.age()
+            if age < self.ttl:
+                self.hits += 1
+                return entry.suggestions
+            if age < self.max_stale:
+                self.stale_hits += 1
+                if not self._recently_failed(key):
+                    self._start_refresh(key, loader)
+                return entry.suggestions
+
+        if self._recently_failed(key):
+            self.negative_hits += 1
+            return None
+
+        self.misses += 1
+        # shield() keeps the shared load running if this caller disconnects
+        return await asyncio.shield(self._start_refresh(key, loader))
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        """Drop one key, or every entry when key is None"""
+        if key is None:
+            self._entries.clear()
+            self._failed.clear()
+        else:
+            self._entries.pop(key, None)
+            self._failed.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "loads": self.loads,
+            "failures": self.failures,
+            "negative_hits": self.negative_hits,
+            "refreshing": len(self._inflight)
+        }
+
+    def _recently_failed(self, key: Hashable) -> bool:
+        failed_at = self._failed.get(key)
+        return failed_at is not None and time.monotonic() - failed_at < self.failure_ttl
+
+    def _start_refresh(self, key: Hashable, loader: SuggestionLoader) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is None or task.done():
+            task = asyncio.get_running_loop().create_task(self._refresh(key, loader))
+            self._inflight[key] = task
+        return task
+
+    async def _refresh(self, key: Hashable, loader: SuggestionLoader) -> Optional[List[str]]:
+        try:
+            self.loads += 1
+            suggestions = await loader()
+            if suggestions:
+                self._entries[key] = _Entry(suggestions)
+                self._failed.pop(key, None)
+                return suggestions
+        except Exception as e:
+            log_event(logger, logging.WARNING, "refreshing suggestion cache failed", error=str(e))
+        finally:
+            self._inflight.pop(key, None)
+
+        self.failures += 1
+        self._failed[key] = time.monotonic()
+        # Keep serving the previous (stale) value if the reload failed
+        entry = self._entries.get(key)
+        return entry.suggestions if entry else None
+
+
+# Global instance
+suggestion_cache = SuggestionCache()
@@ -0,0 +1,134 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from app.logging_config import get_logger, log_event
+from app.services.openai_service import openai_service
+
+logger = get_logger("thread_pool")
+
+
+class ThreadPool:
+    """
+    Small pool of pre-created, empty OpenAI threads.
+
+    acquire() hands out a pooled thread without a network round trip and
+    triggers a background refill. Idle threads older than max_idle are
+    deleted by a reaper (and replaced), and every idle thread is deleted on
+    shutdown, so unused threads do not accumulate on the OpenAI side.
+    """
+
+    def __init__(
+        self,
+        size: Optional[int] = None,
+        max_idle: Optional[float] = None,
+        reap_interval: Optional[float] = None
+    ):
+        self.size = size if size is not None else int(os.getenv("THREAD_POOL_SIZE", 4))
+        self.max_idle = max_idle if max_idle is not None else float(os.getenv("THREAD_POOL_MAX_IDLE", 3600))
+        self.reap_interval = reap_interval if reap_interval is not None else float(os.getenv("THREAD_POOL_REAP_INTERVAL", 300))
+        # When the pool is empty, create the thread together with the first message
+        self.lazy_create = os.getenv("THREAD_LAZY_CREATE", "true").lower() == "true"
+
+        # (thread_id, created_at) in creation order
+        self._idle: Deque[Tuple[str, float]] = deque()
+        self._refill_task: Optional[asyncio.Task] = None
+        self._reaper_task: Optional[asyncio.Task] = None
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.created = 0
+        self.reaped = 0
+
+    def start(self):
+        """Fill the pool and start the reaper (call from the running event loop)"""
+        if self.size <= 0:
+            return
+        self._schedule_refill()
+        if self._reaper_task is None:
+            self._reaper_task = asyncio.create_task(self._reap_loop())
+
+    def acquire(self) -> Optional[str]:
+        """Take a pre-created thread, or None if the pool is empty"""
+        if self.size <= 0:
+            return None
+        thread_id = None
+        if self._idle:
+            thread_id, _ = self._idle.popleft()
+            self.hits += 1
+        else:
+            self.misses += 1
+        self._schedule_refill()
+        return thread_id
+
+    async def close(self):
+        """Stop background tasks and delete the threads nobody used"""
+        for task in [self._refill_task, self._reaper_task]:
+            if task is not None:
+                task.cancel()
+        self._refill_task = self._reaper_task = None
+
+        idle = [thread_id for thread_id, _ in self._idle]
+        self._idle.clear()
+        if idle:
+            await asyncio.gather(*(openai_service.delete_thread(t) for t in idle), return_exceptions=True)
+            self.reaped += len(idle)
+
+    def stats(self) -> Dict[str, Any]:
+        acquires = self.hits + self.misses
+        return {
+            "size": self.size,
+            "idle": len(self._idle),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / acquires if acquires else 0.0,
+            "created": self.created,
+            "reaped": self.reaped,
+            "lazy_create": self.lazy_create
+        }
+
+    def _schedule_refill(self):
+        if len(self._idle) >= self.size:
+            return
+        if self._refill_task is None or self._refill_task.done():
+            self._refill_task = asyncio.get_running_loop().create_task(self._refill())
+
+    async def _refill(self):
+        while len(self._idle) < self.size:
+            missing = self.size - len(self._idle)
+            results = await asyncio.gather(
+                *(openai_service.create_thread() for _ in range(missing)), return_exceptions=True
+            )
+            errors = [r for r in results if isinstance(r, Exception)]
+            for thread_id in results:
+                if not isinstance(thread_id, Exception):
+                    self._idle.append((thread_id, time.monotonic()))
+                    self.created += 1
+            if errors:
+                # The next acquire() or reaper pass retries
+                log_event(logger, logging.WARNING, "creating pooled threads failed",
+                          failed=len(errors), error=str(errors[0]))
+                return
+
+    async def _reap_loop(self):
+        while True:
+            await asyncio.sleep(self.reap_interval)
+            await self._reap()
+
+    async def _reap(self):
+        now = time.monotonic()
+        expired = {thread_id for thread_id, created_at in self._idle if now - created_at >= self.max_idle}
+        if expired:
+            self._idle = deque((t, c) for t, c in self._idle if t not in expired)
+            await asyncio.gather(*(openai_service.delete_thread(t) for t in expired), return_exceptions=True)
+            self.reaped += len(expired)
+            log_event(logger, logging.INFO, "reaped idle threads", count=len(expired))
+        self._schedule_refill()
+
+
+# Global instance
+thread_pool = ThreadPool()
@@ -0,0 +1,347 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from app.services.provider import Provider
+
+DEFAULT_INDEX_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "data", "upload_index.db")
+
+
+def sha256_hex(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+class UploadIndex:
+    """
+    Persistent content-addressed index of uploaded files.
+
+    Maps the SHA-256 of an upload to the OpenAI file_id it was stored as, and
+    records which vector stores each file has already been added to, so a
+    repeated upload skips both the upload and the vector store batch. Also
+    records the per-session vector store of each thread and when it was last
+    used (see session_vector_stores), shared by all workers.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv("UPLOAD_INDEX_PATH", DEFAULT_INDEX_PATH)
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS uploads (
+                sha256 TEXT PRIMARY KEY,
+                file_id TEXT NOT NULL,
+                filename TEXT,
+                size INTEGER,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS uploads_file_id ON uploads (file_id);
+            CREATE TABLE IF NOT EXISTS vector_store_files (
+                file_id TEXT NOT NULL,
+                vector_store_id TEXT NOT NULL,
+                added_at REAL NOT NULL,
+                PRIMARY KEY (file_id, vector_store_id)
+            );
+            CREATE INDEX IF NOT EXISTS vector_store_files_store ON vector_store_files (vector_store_id, added_at);
+            CREATE TABLE IF NOT EXISTS session_vector_stores (
+                vector_store_id TEXT PRIMARY KEY,
+                thread_id TEXT NOT NULL UNIQUE,
+                created_at REAL NOT NULL,
+                last_active_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS session_vector_stores_active ON session_vector_stores (last_active_at);
+        """)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(uploads)")}
+        if "kind" not in columns:
+            self._conn.execute("ALTER TABLE uploads ADD COLUMN kind TEXT")  # "file" or "image"
+        if "last_used_at" not in columns:
+            # Latest dedup hit; keeps a reused file from being reaped
+            self._conn.execute("ALTER TABLE uploads ADD COLUMN last_used_at REAL")
+        self._conn.commit()
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, sha256: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the stored upload for a content hash, counting hits and misses.
+        A hit marks the upload as used, so the reaper keeps its file.
+        """
+        with self._lock:
+            # Update first: once it has committed, claim_upload() cannot take
+            # the file, and if the claim came first the row is gone (a miss)
+            self._conn.execute("UPDATE uploads SET last_used_at = ? WHERE sha256 = ?", (time.time(), sha256))
+            self._conn.commit()
+            row = self._conn.execute(
+                "SELECT file_id, filename, size FROM uploads WHERE sha256 = ?", (sha256,)
+            ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return {"sha256": sha256, "file_id": row[0], "filename": row[1], "size": row[2]}
+
+    def record(self, sha256: str, file_id: str, filename: Optional[str], size: int, kind: Optional[str] = None):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO uploads (sha256, file_id, filename, size, kind, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (sha256, file_id, filename, size, kind, time.time())
+            )
+            self._conn.commit()
+
+    def has_file(self, file_id: str) -> bool:
+        """Whether file_id was uploaded through this index (by any worker)"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM uploads WHERE file_id = ? LIMIT 1", (file_id,)
+            ).fetchone() is not None
+
+    def file_metadata(self, file_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """{file_id: {"filename", "bytes"}} for the file_ids uploaded through this index (one query)"""
+        if not file_ids:
+            return {}
+        placeholders = ",".join("?" for _ in file_ids)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT file_id, filename, size FROM uploads WHERE file_id IN ({placeholders})", tuple(file_ids)
+            ).fetchall()
+        return {file_id: {"filename": filename, "bytes": size} for file_id, filename, size in rows if filename}
+
+    def mark_in_vector_store(self, file_ids: List[str], vector_store_id: str):
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO vector_store_files (file_id, vector_store_id, added_at) VALUES (?, ?, ?)",
+                [(file_id, vector_store_id, now) for file_id in file_ids]
+            )
+            self._conn.commit()
+
+    def filter_not_in_vector_store(self, file_ids: List[str], vector_store_id: str) -> List[str]:
+        """Return the file_ids that still need to be added to the vector store"""
+        if not file_ids:
+            return []
+        placeholders = ",".join("?" for _ in file_ids)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT file_id FROM vector_store_files WHERE vector_store_id = ? AND file_id IN ({placeholders})",
+                (vector_store_id, *file_ids)
+            ).fetchall()
+        present = {row[0] for row in rows}
+        return [file_id for file_id in file_ids if file_id not in present]
+
+    def vector_stores_for(self, file_id: str) -> List[str]:
+        """The vector stores file_id has been added to through this index"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT vector_store_id FROM vector_store_files WHERE file_id = ?", (file_id,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def vector_store_file_count(self, vector_store_id: str) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM vector_store_files WHERE vector_store_id = ?", (vector_store_id,)
+            ).fetchone()[0]
+
+    def vector_store_version(self, vector_store_id: str) -> str:
+        """
+        Token that changes whenever files are added to or removed from the
+        vector store through this index (shared by all workers)
+        """
+        with self._lock:
+            count, last_added = self._conn.execute(
+                "SELECT COUNT(*), MAX(added_at) FROM vector_store_files WHERE vector_store_id = ?",
+                (vector_store_id,)
+            ).fetchone()
+        return f"{count}:{last_added or 0}"
+
+    def session_vector_store(self, thread_id: str) -> Optional[str]:
+        """The vector store created for thread_id, if it still exists"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT vector_store_id FROM session_vector_stores WHERE thread_id = ?", (thread_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def record_session_vector_store(self, thread_id: str, vector_store_id: str) -> str:
+        """
+        Record vector_store_id as thread_id's store unless another worker got
+        there first; returns the store the thread ends up with.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO session_vector_stores (vector_store_id, thread_id, created_at, last_active_at) "
+                "VALUES (?, ?, ?, ?)",
+                (vector_store_id, thread_id, now, now)
+            )
+            self._conn.commit()
+            return self._conn.execute(
+                "SELECT vector_store_id FROM session_vector_stores WHERE thread_id = ?", (thread_id,)
+            ).fetchone()[0]
+
+    def session_vector_store_count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM session_vector_stores").fetchone()[0]
+
+    def touch_session_vector_store(self, thread_id: str) -> bool:
+        """Mark thread_id's store as used now; False if the thread has none"""
+        with self._lock:
+            updated = self._conn.execute(
+                "UPDATE session_vector_stores SET last_active_at = ? WHERE thread_id = ?", (time.time(), thread_id)
+            ).rowcount
+            self._conn.commit()
+        return updated > 0
+
+    def idle_session_vector_stores(self, before: float, limit: int) -> List[Dict[str, Any]]:
+        """Session stores last used before the given time, least recently used first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT vector_store_id, thread_id, last_active_at FROM session_vector_stores "
+                "WHERE last_active_at < ? ORDER BY last_active_at LIMIT ?",
+                (before, limit)
+            ).fetchall()
+        return [{"vector_store_id": row[0], "thread_id": row[1], "last_active_at": row[2]} for row in rows]
+
+    def claim_session_vector_store(self, vector_store_id: str, idle_before: Optional[float] = None) -> Optional[List[str]]:
+        """
+        Forget a session store (only if still unused since idle_before, when
+        given) and its file memberships. Returns the files it held that are
+        no longer in any vector store, or None if another worker claimed it
+        first or it was used again in the meantime.
+        """
+        with self._lock:
+            if idle_before is None:
+                claimed = self._conn.execute(
+                    "DELETE FROM session_vector_stores WHERE vector_store_id = ?", (vector_store_id,)
+                ).rowcount
+            else:
+                claimed = self._conn.execute(
+                    "DELETE FROM session_vector_stores WHERE vector_store_id = ? AND last_active_at < ?",
+                    (vector_store_id, idle_before)
+                ).rowcount
+            if not claimed:
+                self._conn.commit()
+                return None
+            file_ids = [row[0] for row in self._conn.execute(
+                "SELECT file_id FROM vector_store_files WHERE vector_store_id = ?", (vector_store_id,)
+            )]
+            self._conn.execute("DELETE FROM vector_store_files WHERE vector_store_id = ?", (vector_store_id,))
+            self._conn.commit()
+            orphans = []
+            for file_id in file_ids:
+                if self._conn.execute(
+                    "SELECT 1 FROM vector_store_files WHERE file_id = ? LIMIT 1", (file_id,)
+                ).fetchone() is None:
+                    orphans.append(file_id)
+        return orphans
+
+    def unattached_uploads(self, before: float, limit: int) -> List[str]:
+        """
+        Non-image uploads neither made nor reused since the given time that
+        are in no vector store (uploaded but never sent in a chat, or left over when their
+        stores were reaped). Images are referenced by thread messages and are
+        kept.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT file_id FROM uploads WHERE kind = 'file' AND COALESCE(last_used_at, created_at) < ? "
+                "AND file_id NOT IN (SELECT file_id FROM vector_store_files) "
+                "ORDER BY COALESCE(last_used_at, created_at) LIMIT ?",
+                (before, limit)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def claim_upload(self, file_id: str, unused_before: float) -> Optional[Dict[str, Any]]:
+        """
+        Take a file for deletion: remove its upload entry, so later lookups of
+        its content miss and upload it again rather than reuse a file that is
+        about to be deleted. Returns the removed entry ({"file_id"} alone if
+        there was none), or None if the file is in a vector store or a lookup
+        reused it since unused_before.
+        """
+        with self._lock:
+            if self._conn.execute(
+                "SELECT 1 FROM vector_store_files WHERE file_id = ? LIMIT 1", (file_id,)
+            ).fetchone() is not None:
+                return None
+            row = self._conn.execute(
+                "SELECT sha256, filename, size, kind, created_at, last_used_at FROM uploads WHERE file_id = ?",
+                (file_id,)
+            ).fetchone()
+            if row is None:
+                return {"file_id": file_id}
+            # Conditional, so a lookup() that committed in between wins
+            claimed = self._conn.execute(
+                "DELETE FROM uploads WHERE file_id = ? AND (last_used_at IS NULL OR last_used_at < ?) "
+                "AND file_id NOT IN (SELECT file_id FROM vector_store_files)",
+                (file_id, unused_before)
+            ).rowcount
+            self._conn.commit()
+        if not claimed:
+            return None
+        return {"file_id": file_id, "sha256": row[0], "filename": row[1], "size": row[2], "kind": row[3],
+                "created_at": row[4], "last_used_at": row[5]}
+
+    def restore_upload(self, entry: Dict[str, Any]) -> bool:
+        """
+        Put back an entry removed by claim_upload() whose file could not be
+        deleted, as it was, so the next reaper pass retries it.
+        False if there is nothing to restore or the content was uploaded again.
+        """
+        if "sha256" not in entry:
+            return False
+        with self._lock:
+            restored = self._conn.execute(
+                "INSERT OR IGNORE INTO uploads (sha256, file_id, filename, size, kind, created_at, last_used_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (entry["sha256"], entry["file_id"], entry["filename"], entry["size"], entry["kind"],
+                 entry["created_at"], entry["last_used_at"])
+            ).rowcount
+            self._conn.commit()
+        return restored > 0
+
+    def invalidate(self, sha256: Optional[str] = None, file_id: Optional[str] = None) -> int:
+        """
+        Remove entries by content hash or file_id (e.g. after the file was
+        deleted on OpenAI). Returns the number of uploads removed.
+        """
+        with self._lock:
+            if sha256:
+                rows = self._conn.execute("SELECT file_id FROM uploads WHERE sha256 = ?", (sha256,)).fetchall()
+            elif file_id:
+                rows = [(file_id,)]
+            else:
+                return 0
+            file_ids = [row[0] for row in rows]
+            removed = 0
+            for fid in file_ids:
+                removed += self._conn.execute("DELETE FROM uploads WHERE file_id = ?", (fid,)).rowcount
+                self._conn.execute("DELETE FROM vector_store_files WHERE file_id = ?", (fid,))
+            self._conn.commit()
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM uploads").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# Global instance
+upload_index: Provider[UploadIndex] = Provider("upload_index", UploadIndex)
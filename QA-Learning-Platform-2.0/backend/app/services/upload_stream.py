@@ -0,0 +1,98 @@
+import hashlib
+import os
+from typing import Optional
+
+from fastapi import UploadFile
+
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", 1024 * 1024))
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", 50 * 1024 * 1024))
+BLOCKED_EXTENSIONS = [
+    ext.strip().lower()
+    for ext in os.getenv("UPLOAD_BLOCKED_EXTENSIONS", ".exe,.dll,.so,.bat,.cmd,.msi,.com,.scr").split(",")
+    if ext.strip()
+]
+
+# Leading bytes of executable formats that are never useful to the assistant
+EXECUTABLE_SIGNATURES = [b"MZ", b"\x7fELF", b"\xcf\xfa\xed\xfe", b"\xfe\xed\xfa\xcf"]
+
+IMAGE_SIGNATURES = [
+    b"\x89PNG\r\n\x1a\n",
+    b"\xff\xd8\xff",
+    b"GIF87a",
+    b"GIF89a",
+]
+
+
+class UploadRejected(ValueError):
+    """Raised when an upload fails the size or type checks"""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class ScannedUpload:
+    def __init__(self, sha256: str, size: int, is_image: bool):
+        self.sha256 = sha256
+        self.size = size
+        self.is_image = is_image
+
+
+def _is_image_signature(head: bytes) -> bool:
+    if any(head.startswith(sig) for sig in IMAGE_SIGNATURES):
+        return True
+    # WebP: RIFF....WEBP
+    return head[:4] == b"RIFF" and head[8:12] == b"WEBP"
+
+
+async def scan_upload(
+    file: UploadFile,
+    max_bytes: Optional[int] = None,
+    chunk_size: Optional[int] = None
+) -> ScannedUpload:
+    """
+    Hash, size-check and type-check an upload in a single chunked pass over
+    the spooled temp file, then rewind it so it can be streamed onwards.
+    Peak memory is one chunk regardless of file size.
+    """
+    max_bytes = max_bytes or MAX_UPLOAD_BYTES
+    chunk_size = chunk_size or UPLOAD_CHUNK_SIZE
+
+    # Cheap checks before touching the content
+    if file.size is not None and file.size > max_bytes:
+        raise UploadRejected(413, f"File exceeds maximum upload size of {max_bytes} bytes")
+
+    extension = os.path.splitext(file.filename or "")[1].lower()
+    if extension in BLOCKED_EXTENSIONS:
+        raise UploadRejected(415, f"File type {extension} is not allowed")
+
+    declared_image = bool(file.content_type and file.content_type.startswith("image/"))
+
+    hasher = hashlib.sha256()
+    size = 0
+    head = b""
+
+    await file.seek(0)
+    while True:
+        chunk = await file.read(chunk_size)
+        if not chunk:
+            break
+
+        if not head:
+            head = chunk[:16]
+            if any(head.startswith(sig) for sig in EXECUTABLE_SIGNATURES):
+                raise UploadRejected(415, "Executable files are not allowed")
+            if declared_image and not _is_image_signature(head):
+                raise UploadRejected(415, "File content does not match its image type")
+
+        size += len(chunk)
+        if size > max_bytes:
+            raise UploadRejected(413, f"File exceeds maximum upload size of {max_bytes} bytes")
+        hasher.update(chunk)
+
+    if size == 0:
+        raise UploadRejected(400, "Uploaded file is empty")
+
+    await file.seek(0)
+    return ScannedUpload(sha256=hasher.hexdigest(), size=size, is_image=declared_image)
@@ -0,0 +1,125 @@
+import asyncio
+import os
+from typing import Any, Dict, List, Optional
+
+from app.services.openai_service import openai_service
+
+
+class _PendingFile:
+    def __init__(self, file_id: str, future: asyncio.Future):
+        self.file_id = file_id
+        self.future = future
+
+
+class VectorStoreBatcher:
+    """
+    Coalesces vector store file additions from concurrent callers.
+
+    File IDs are collected for a short window (or until a store's size cap is
+    hit) and submitted as one file_batches call per vector store. The window
+    is shared by all stores: each session has its own store, so uploads from
+    different sessions land in different batches, but they are flushed
+    together instead of each store waiting out its own window. Each caller
+    gets a result for its own file in the same shape as
+    add_files_to_vector_store_batch().
+    """
+
+    def __init__(
+        self,
+        window: Optional[float] = None,
+        max_batch_size: Optional[int] = None,
+        timeout: int = 120
+    ):
+        self.window = window if window is not None else float(os.getenv("VECTOR_STORE_BATCH_WINDOW", 0.5))
+        self.max_batch_size = max_batch_size or int(os.getenv("VECTOR_STORE_BATCH_MAX_FILES", 100))
+        self.timeout = timeout
+
+        # vector_store_id -> files waiting for its next batch
+        self._pending: Dict[str, List[_PendingFile]] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+        # Counters
+        self.flushes = 0
+        self.batches = 0
+        self.files = 0
+
+    async def add(self, file_id: str, vector_store_id: str) -> Dict[str, Any]:
+        """Add one file to the vector store as part of its next batch"""
+        loop = asyncio.get_running_loop()
+        pending = _PendingFile(file_id, loop.create_future())
+        batch = self._pending.setdefault(vector_store_id, [])
+        batch.append(pending)
+
+        if len(batch) >= self.max_batch_size:
+            self._flush(vector_store_id)
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush_all)
+
+        return await pending.future
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "flushes": self.flushes,
+            "batches": self.batches,
+            "files": self.files,
+            "avg_batch_size": self.files / self.batches if self.batches else 0.0,
+            "pending": sum(len(batch) for batch in self._pending.values())
+        }
+
+    def _flush(self, vector_store_id: str):
+        """Submit one store's batch early because it reached the size cap"""
+        batch = self._pending.pop(vector_store_id, [])
+        if not self._pending and self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if batch:
+            asyncio.get_running_loop().create_task(self._submit(vector_store_id, batch))
+
+    def _flush_all(self):
+        """Submit the batches of every store that collected files in this window"""
+        self._timer = None
+        pending, self._pending = self._pending, {}
+        if pending:
+            self.flushes += 1
+        loop = asyncio.get_running_loop()
+        for vector_store_id, batch in pending.items():
+            loop.create_task(self._submit(vector_store_id, batch))
+
+    async def _submit(self, vector_store_id: str, batch: List[_PendingFile]):
+        # The same file may be attached by several requests at once
+        file_ids = list(dict.fromkeys(p.file_id for p in batch))
+        self.batches += 1
+        self.files += len(file_ids)
+
+        try:
+            result = await openai_service.add_files_to_vector_store_batch(
+                file_ids, timeout=self.timeout, vector_store_id=vector_store_id
+            )
+            failed_ids = set()
+            if result["success"] and result.get("failed_files", 0) > 0:
+                listed = await openai_service.list_failed_batch_files(result["batch_id"], vector_store_id)
+                # If the failures cannot be attributed, report every file as failed
+                failed_ids = set(listed) if listed is not None else set(file_ids)
+
+            for p in batch:
+                if p.future.done():
+                    continue
+                if result["success"]:
+                    failed = p.file_id in failed_ids
+                    p.future.set_result({
+                        "success": True,
+                        "batch_id": result["batch_id"],
+                        "status": result["status"],
+                        "failed_files": 1 if failed else 0,
+                        "total_files": 1
+                    })
+                else:
+                    p.future.set_result({**result, "failed_files": 1, "total_files": 1})
+        except Exception as e:
+            for p in batch:
+                if not p.future.done():
+                    p.future.set_exception(e)
+
+
+# Global instance
+vector_store_batcher = VectorStoreBatcher()
@@ -0,0 +1,96 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.logging_config import get_logger, log_event
+from app.services.openai_service import openai_service
+from app.services.suggestion_cache import suggestion_cache
+
+logger = get_logger("warmup")
+
+
+async def prefill_suggestions():
+    """Load the initial suggestions into the cache /chat/initialize reads"""
+    suggestions = await suggestion_cache.get(
+        # Same key as /chat/initialize
+        (openai_service.assistant_id, openai_service.vector_store_id),
+        openai_service.generate_initial_suggestions
+    )
+    if not suggestions:
+        raise RuntimeError("No suggestions generated")
+
+
+class Warmup:
+    """
+    Readiness reported by /health/ready.
+
+    With WARMUP_ON_STARTUP=true a background task first checks that the
+    assistant and vector store exist and prefills the suggestion cache;
+    the app reports ready once the required checks pass. Otherwise it is
+    ready as soon as startup has finished.
+    """
+
+    def __init__(self, enabled: Optional[bool] = None):
+        self.enabled = enabled if enabled is not None else os.getenv("WARMUP_ON_STARTUP", "false").lower() == "true"
+        self.ready = False
+        self.finished = False
+        self.duration_ms: Optional[float] = None
+        self.checks: Dict[str, Dict[str, Any]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Begin the warm-up (call from the running event loop)"""
+        if not self.enabled:
+            self.ready = self.finished = True
+            return
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        started = time.perf_counter()
+        await asyncio.gather(
+            self._check("assistant", openai_service.retrieve_assistant, required=True),
+            self._check("vector_store", openai_service.retrieve_vector_store, required=True),
+            # Fallback suggestions exist, so a failure here does not block readiness
+            self._check("suggestions", prefill_suggestions, required=False)
+        )
+        self.duration_ms = round((time.perf_counter() - started) * 1000, 1)
+        self.ready = all(check["ok"] for check in self.checks.values() if check["required"])
+        self.finished = True
+        log_event(logger, logging.INFO if self.ready else logging.ERROR, "warm-up finished",
+                  ready=self.ready, duration_ms=self.duration_ms, checks=self.checks)
+
+    async def _check(self, name: str, step: Callable[[], Awaitable[Any]], required: bool):
+        started = time.perf_counter()
+        error = None
+        try:
+            await step()
+        except Exception as e:
+            error = str(e)
+        self.checks[name] = {
+            "ok": error is None,
+            "required": required,
+            "ms": round((time.perf_counter() - started) * 1000, 1),
+            "error": error
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "warmup_enabled": self.enabled,
+            "warmup_finished": self.finished,
+            "warmup_ms": self.duration_ms,
+            "checks": self.checks
+        }
+
+
+# Global instance
+warmup = Warmup()
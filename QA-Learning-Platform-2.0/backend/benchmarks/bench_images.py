@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Bytes saved and upload latency from image preprocessing.
+
+For each input (test_files/code.png, other screenshots in the repo, and a
+synthetic 12-megapixel phone photo with EXIF) it reports the original and
+preprocessed size per output format, the preprocessing time, and the time
+to upload either version to the fake OpenAI server at a fixed bandwidth
+(default 5 MB/s, the "realistic" profile; no latency jitter or errors).
+"net ms" is upload time saved minus preprocessing time.
+
+Usage (from the backend directory):
+    python benchmarks/bench_images.py
+    python benchmarks/bench_images.py --mb-per-second 1 --max-dimension 1568 --runs 5
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import statistics
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "fake")
+os.environ.setdefault("ASSISTANT_ID", "asst_fake")
+
+from PIL import Image
+
+from fake_openai import Profile, create_app
+from load_test import BACKEND_DIR
+from app.services.image_preprocess import ImagePreprocessor
+from app.services.openai_service import OpenAIService
+
+REPO_DIR = os.path.dirname(os.path.dirname(BACKEND_DIR))
+SCREENSHOTS = [
+    os.path.join(REPO_DIR, "test_files", "code.png"),
+    os.path.join(REPO_DIR, "attached_assets", "image_1765790829469.png"),
+]
+
+
+def phone_photo() -> bytes:
+    """4032x3024 JPEG with photo-like detail (gradient plus sensor noise) and EXIF"""
+    size = (4032, 3024)
+    base = Image.linear_gradient("L").resize(size)
+    noise = Image.effect_noise(size, 40)
+    image = Image.merge("RGB", [Image.blend(base, noise, 0.35), base, Image.blend(base, noise, 0.2)])
+    exif = Image.Exif()
+    exif[0x010F] = "PhoneMaker"
+    exif[0x0112] = 1
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=92, exif=exif)
+    return buffer.getvalue()
+
+
+def make_service(profile) -> OpenAIService:
+    from openai import AsyncOpenAI
+    service = OpenAIService()
+    service.client = AsyncOpenAI(
+        api_key="fake",
+        base_url="http://fake/v1",
+        http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=create_app(profile))),
+        max_retries=0
+    )
+    return service
+
+
+async def upload_ms(service: OpenAIService, content: bytes, filename: str, runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        await service.upload_file(content, filename)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def preprocess_ms(preprocessor: ImagePreprocessor, data: bytes, runs: int):
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = preprocessor.recompress(data)
+        timings.append((time.perf_counter() - started) * 1000)
+    return result, statistics.median(timings)
+
+
+async def run(args):
+    inputs = [(os.path.basename(path), open(path, "rb").read()) for path in SCREENSHOTS if os.path.exists(path)]
+    inputs.append(("phone_photo_12mp.jpg", phone_photo()))
+    service = make_service(Profile("bench", upload_bytes_per_second=args.mb_per_second * 1_000_000))
+
+    rows = []
+    for name, data in inputs:
+        original_upload = await upload_ms(service, data, name, args.runs)
+        for output_format in ["webp", "jpeg"]:
+            preprocessor = ImagePreprocessor(max_dimension=args.max_dimension, output_format=output_format,
+                                             quality=args.quality, min_bytes=args.min_bytes)
+            result, took = preprocess_ms(preprocessor, data, args.runs)
+            processed_upload = await upload_ms(service, result.content or data, name, args.runs)
+            rows.append({
+                "input": name,
+                "format": output_format,
+                "original_bytes": len(data),
+                "bytes": result.size,
+                "saved_pct": round(100 * (1 - result.size / len(data)), 1),
+                "size": f"{result.width}x{result.height}" if result.content else "original kept",
+                "preprocess_ms": round(took, 1),
+                "upload_ms_original": round(original_upload, 1),
+                "upload_ms": round(processed_upload, 1),
+                "end_to_end_saved_ms": round(original_upload - processed_upload - took, 1)
+            })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mb-per-second", type=float, default=5.0, help="upload bandwidth to the fake server")
+    parser.add_argument("--max-dimension", type=int, default=2048)
+    parser.add_argument("--quality", type=int, default=85)
+    parser.add_argument("--min-bytes", type=int, default=512 * 1024, help="IMAGE_RECOMPRESS_MIN_BYTES")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+
+    rows = asyncio.run(run(args))
+
+    print(f"{'input':<28}{'fmt':<6}{'original':>10}{'after':>10}{'saved':>8}  {'size':<14}"
+          f"{'prep ms':>8}{'upload ms':>18}{'net ms':>9}")
+    for r in rows:
+        print(f"{r['input'][:27]:<28}{r['format']:<6}{r['original_bytes']:>10}{r['bytes']:>10}{r['saved_pct']:>7}%  "
+              f"{r['size']:<14}{r['preprocess_ms']:>8}{r['upload_ms_original']:>9} -> {r['upload_ms']:<6}"
+              f"{r['end_to_end_saved_ms']:>9}")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump({"mb_per_second": args.mb_per_second, "max_dimension": args.max_dimension, "quality": args.quality,
+                       "date": time.strftime("%Y-%m-%d"), "results": rows}, f, indent=2)
+            f.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark indexing and query latency of the local BM25 search index over the
+text files in test_files/ (replicated --copies times to get a larger corpus).
+
+Usage (from the backend directory):
+    python benchmarks/bench_search_index.py --copies 200 --queries 2000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.search_index import SearchIndex, extract_text, tokenize
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), "..", "..", "..", "test_files")
+
+QUERIES = [
+    "Lily employee ID",
+    "QA Engineer Innovation",
+    "ไอดอลที่ชอบขนมหวาน",
+    "กลุ่มไอดอลที่มีภาพลักษณ์น่ารัก",
+    "Osaki Tenka",
+    "998877",
+    "After-school activities",
+    "สาวผมสีเงินที่มีบรรยากาศลึกลับ",
+]
+
+
+def load_corpus(path: str):
+    documents = []
+    for name in sorted(os.listdir(path)):
+        with open(os.path.join(path, name), "rb") as f:
+            text = extract_text(f.read(), name)
+        if text:
+            documents.append((name, text))
+    return documents
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--copies", type=int, default=100)
+    parser.add_argument("--queries", type=int, default=1000)
+    args = parser.parse_args()
+
+    documents = load_corpus(args.corpus)
+    corpus_bytes = sum(len(text.encode()) for _, text in documents) * args.copies
+    print(f"{len(documents)} text files x {args.copies} copies = {corpus_bytes / 1e6:.2f} MB")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = SearchIndex(path=os.path.join(tmp, "search.db"))
+
+        start = time.perf_counter()
+        for copy in range(args.copies):
+            for name, text in documents:
+                # A copy marker keeps each copy's passages distinct
+                index.add_file(f"file-{copy}-{name}", name, f"{text}\ncopy{copy}")
+        elapsed = time.perf_counter() - start
+        stats = index.stats()
+        print(f"indexed {stats['passages']} passages in {elapsed:.2f}s "
+              f"({corpus_bytes / 1e6 / elapsed:.2f} MB/s, {stats['files'] / elapsed:.0f} files/s)")
+        print(f"{stats['terms']} terms, postings {stats['postings_bytes'] / 1024:.1f} KiB, "
+              f"on disk {os.path.getsize(index.path) / 1024:.1f} KiB, thai segmenter: {stats['thai_segmenter']}")
+
+        start = time.perf_counter()
+        SearchIndex(path=index.path).close()
+        print(f"cold load {1000 * (time.perf_counter() - start):.1f} ms")
+
+        latencies = []
+        for _ in range(args.queries):
+            query = random.choice(QUERIES)
+            start = time.perf_counter()
+            index.search(query, limit=10)
+            latencies.append((time.perf_counter() - start) * 1000)
+        print(f"{args.queries} queries: p50 {statistics.median(latencies):.2f} ms, "
+              f"p95 {percentile(latencies, 95):.2f} ms, p99 {percentile(latencies, 99):.2f} ms")
+
+        for query in QUERIES[:3]:
+            top = index.search(query, limit=1)
+            label = f"{top[0]['filename']} ({top[0]['score']})" if top else "-"
+            print(f"  {query!r} ({len(tokenize(query))} terms) -> {label}")
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
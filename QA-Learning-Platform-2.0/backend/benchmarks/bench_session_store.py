@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark create/append/get throughput of the session store backends.
+
+Usage (from the backend directory):
+    python benchmarks/bench_session_store.py --sessions 2000 --messages 20
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models.chat import ChatSession, Message
+from app.services.session_store import MemorySessionStore, SQLiteSessionStore
+
+
+def run(store, sessions: int, messages: int, gets: int):
+    results = {}
+    ids = []
+
+    tracemalloc.start()
+
+    start = time.perf_counter()
+    for _ in range(sessions):
+        now = datetime.now()
+        session = ChatSession(id=str(uuid.uuid4()), thread_id="thread_bench", messages=[], created_at=now, updated_at=now)
+        store.create(session)
+        ids.append(session.id)
+    results["create/s"] = sessions / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    body = "การประมวลผลภาพ " * 20
+    for i in range(messages):
+        for session_id in ids:
+            role = "user" if i % 2 == 0 else "assistant"
+            store.append_message(session_id, Message(role=role, content=body, timestamp=datetime.now()))
+    store.flush()
+    results["append/s"] = sessions * messages / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for _ in range(gets):
+        store.get(random.choice(ids))
+    results["get/s"] = gets / (time.perf_counter() - start)
+
+    _, peak = tracemalloc.get_traced_memory()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    results["retained MB"] = current / 1e6
+    results["peak MB"] = peak / 1e6
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--messages", type=int, default=20)
+    parser.add_argument("--gets", type=int, default=10000)
+    parser.add_argument("--cache-size", type=int, default=256)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        backends = {
+            "memory (dict)": MemorySessionStore(),
+            "sqlite + LRU": SQLiteSessionStore(
+                path=os.path.join(tmp, "sessions.db"), cache_size=args.cache_size
+            ),
+        }
+        print(f"{args.sessions} sessions x {args.messages} messages, {args.gets} random gets\n")
+        print(f"{'backend':<16}{'create/s':>12}{'append/s':>12}{'get/s':>12}{'retained MB':>14}{'peak MB':>10}")
+        for name, store in backends.items():
+            r = run(store, args.sessions, args.messages, args.gets)
+            print(
+                f"{name:<16}{r['create/s']:>12.0f}{r['append/s']:>12.0f}{r['get/s']:>12.0f}"
+                f"{r['retained MB']:>14.1f}{r['peak MB']:>10.1f}"
+            )
+            store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Measure cold start: import time of app.main, and time from process start
+until the server answers /health, /health/ready and its first chat request
+(against the fake OpenAI server).
+
+Usage (from the backend directory):
+    python benchmarks/bench_startup.py --runs 5
+    python benchmarks/bench_startup.py --runs 5 --warmup
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from load_test import BACKEND_DIR, stop_stack, wait_until_up
+
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+
+
+def measure_import(env) -> float:
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET], cwd=BACKEND_DIR, env=env,
+        capture_output=True, text=True, check=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def poll(client: httpx.Client, method: str, path: str, process: subprocess.Popen, **kwargs) -> float:
+    """perf_counter() time at which path answered 200 (or 404: no such endpoint)"""
+    while True:
+        if process.poll() is not None:
+            raise RuntimeError(f"backend exited with code {process.returncode}")
+        try:
+            if client.request(method, path, **kwargs).status_code in (200, 404):
+                return time.perf_counter()
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.01)
+
+
+def measure_first_request(env, port: int):
+    started = time.perf_counter()
+    backend = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port),
+         "--log-level", "warning", "--no-access-log"],
+        cwd=BACKEND_DIR, env=env
+    )
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=60) as client:
+            health = poll(client, "GET", "/health", backend)
+            ready = poll(client, "GET", "/health/ready", backend)
+            chat = poll(client, "POST", "/api/v1/chat", backend, json={"message": "cold start"})
+        return health - started, ready - started, chat - started
+    finally:
+        stop_stack([backend])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--warmup", action="store_true", help="enable WARMUP_ON_STARTUP")
+    parser.add_argument("--port", type=int, default=8101)
+    parser.add_argument("--fake-port", type=int, default=9101)
+    args = parser.parse_args()
+
+    fake = subprocess.Popen(
+        [sys.executable, os.path.join(BACKEND_DIR, "benchmarks", "fake_openai.py"),
+         "--port", str(args.fake_port), "--profile", "instant"],
+        cwd=BACKEND_DIR
+    )
+    try:
+        wait_until_up(f"http://127.0.0.1:{args.fake_port}/_fake/stats", fake)
+        with tempfile.TemporaryDirectory() as workdir:
+            env = dict(
+                os.environ,
+                OPENAI_BASE_URL=f"http://127.0.0.1:{args.fake_port}/v1",
+                OPENAI_API_KEY="fake",
+                ASSISTANT_ID="asst_fake",
+                RATE_LIMIT_CHAT_PER_MINUTE="0",
+                SESSION_DB_PATH=os.path.join(workdir, "sessions.db"),
+                UPLOAD_INDEX_PATH=os.path.join(workdir, "upload_index.db"),
+                SEARCH_INDEX_PATH=os.path.join(workdir, "search_index.db"),
+                AUTH_DB_PATH=os.path.join(workdir, "auth_sessions.db"),
+                WARMUP_ON_STARTUP="true" if args.warmup else "false",
+                LOG_LEVEL="WARNING"
+            )
+            imports = [measure_import(env) for _ in range(args.runs)]
+            starts = [measure_first_request(env, args.port) for _ in range(args.runs)]
+    finally:
+        stop_stack([fake])
+
+    print(f"import app.main       median {1000 * statistics.median(imports):7.0f} ms  (min {1000 * min(imports):.0f})")
+    for i, label in enumerate(["/health", "/health/ready", "first /chat"]):
+        values = [s[i] for s in starts]
+        print(f"{label:<21} median {1000 * statistics.median(values):7.0f} ms  (min {1000 * min(values):.0f})")
+
+
+if __name__ == "__main__":
+    main()
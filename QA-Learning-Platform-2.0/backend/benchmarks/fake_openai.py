@@ -0,0 +1,604 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the parts of the OpenAI API that OpenAIService uses:
+threads, messages, runs (polled and streamed), files, vector stores and
+their file_batches. Latency and failure behaviour come from a profile, so the
+backend can be load-tested without keys and without touching OpenAI.
+
+Usage (from the backend directory):
+    python benchmarks/fake_openai.py --port 9100 --profile realistic
+    OPENAI_BASE_URL=http://127.0.0.1:9100/v1 OPENAI_API_KEY=fake ASSISTANT_ID=asst_fake python run.py
+
+GET /_fake/stats returns request counts per endpoint and injected errors.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import FastAPI, File, Form, HTTPException, Request, UploadFile
+from fastapi.responses import JSONResponse, StreamingResponse
+
+SUGGESTIONS = [
+    "การแปลงฟูเรียร์ใช้ทำอะไร",
+    "ฮิสโตแกรมของภาพคืออะไร",
+    "Sharpen filter ทำงานอย่างไร",
+    "สัญญาณรบกวนในภาพมีกี่แบบ"
+]
+
+
+class Profile:
+    """
+    Simulated upstream behaviour. Times are in seconds; rates are the
+    fraction of requests answered with a 503 (error_rate) or 429
+    (rate_limit_rate) instead of being handled.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        run_queue_seconds: float = 0.0,
+        run_seconds: float = 0.0,
+        batch_seconds: float = 0.0,
+        upload_bytes_per_second: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        run_failure_rate: float = 0.0,
+        answer_words: int = 60,
+        stream_chunks: int = 20
+    ):
+        self.name = name
+        self.latency = latency
+        self.jitter = jitter
+        self.run_queue_seconds = run_queue_seconds
+        self.run_seconds = run_seconds
+        self.batch_seconds = batch_seconds
+        self.upload_bytes_per_second = upload_bytes_per_second
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.run_failure_rate = run_failure_rate
+        self.answer_words = answer_words
+        self.stream_chunks = stream_chunks
+
+    def request_delay(self) -> float:
+        return max(0.0, self.latency + random.uniform(-self.jitter, self.jitter))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(vars(self))
+
+
+PROFILES = {
+    # No artificial delay: measures the backend's own overhead
+    "instant": Profile("instant", answer_words=20, stream_chunks=5),
+    # Roughly what the real API looks like on a good day
+    "realistic": Profile(
+        "realistic", latency=0.15, jitter=0.1, run_queue_seconds=0.5, run_seconds=4.0,
+        batch_seconds=3.0, upload_bytes_per_second=5_000_000
+    ),
+    # Slow and flaky: exercises retries, the circuit breaker and admission control
+    "degraded": Profile(
+        "degraded", latency=0.6, jitter=0.4, run_queue_seconds=2.0, run_seconds=10.0,
+        batch_seconds=8.0, upload_bytes_per_second=1_000_000,
+        error_rate=0.05, rate_limit_rate=0.05, run_failure_rate=0.02
+    )
+}
+
+
+def _new_id(prefix: str) -> str:
+    return f"{prefix}_{uuid.uuid4().hex[:24]}"
+
+
+def _text_content(content: Any) -> List[Dict[str, Any]]:
+    """Request message content (a string or a list of parts) as message content blocks"""
+    if isinstance(content, str):
+        return [{"type": "text", "text": {"value": content, "annotations": []}}]
+    blocks = []
+    for part in content or []:
+        if part.get("type") == "text":
+            blocks.append({"type": "text", "text": {"value": part.get("text", ""), "annotations": []}})
+        elif part.get("type") == "image_file":
+            blocks.append({"type": "image_file", "image_file": part.get("image_file", {})})
+    return blocks
+
+
+def _message_text(message: Dict[str, Any]) -> str:
+    return "".join(block["text"]["value"] for block in message["content"] if block["type"] == "text")
+
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+class FakeOpenAI:
+    """In-memory state of the fake API"""
+
+    def __init__(self, profile: Profile):
+        self.profile = profile
+        self.threads: Dict[str, List[Dict[str, Any]]] = {}
+        # thread_id -> vector store ids from the thread's file_search tool_resources
+        self.thread_stores: Dict[str, List[str]] = {}
+        self.runs: Dict[str, Dict[str, Any]] = {}
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.batches: Dict[str, Dict[str, Any]] = {}
+        # vector_store_id -> file ids added by completed batches (any id is
+        # accepted for batches, like the pre-existing DemoVector store)
+        self.store_files: Dict[str, List[str]] = {}
+        # Stores made through POST /v1/vector_stores
+        self.vector_stores: Dict[str, Dict[str, Any]] = {}
+        self.requests: Counter = Counter()
+        self.injected: Counter = Counter()
+
+    # Threads and messages
+
+    def create_thread(self, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+        thread_id = _new_id("thread")
+        self.threads[thread_id] = []
+        for message in messages:
+            self.add_message(thread_id, message.get("role", "user"), _text_content(message.get("content")))
+        return {"id": thread_id, "object": "thread", "created_at": int(time.time()), "metadata": {}}
+
+    def add_message(self, thread_id: str, role: str, content: List[Dict[str, Any]],
+                    run_id: Optional[str] = None) -> Dict[str, Any]:
+        message = {
+            "id": _new_id("msg"),
+            "object": "thread.message",
+            "created_at": int(time.time()),
+            "thread_id": thread_id,
+            "role": role,
+            "content": content,
+            "run_id": run_id,
+            "assistant_id": "asst_fake" if role == "assistant" else None,
+            "attachments": [],
+            "metadata": {},
+            "status": "completed"
+        }
+        self.thread(thread_id).append(message)
+        return message
+
+    def thread(self, thread_id: str) -> List[Dict[str, Any]]:
+        if thread_id not in self.threads:
+            raise HTTPException(status_code=404, detail=f"No thread found with id '{thread_id}'.")
+        return self.threads[thread_id]
+
+    def list_messages(self, thread_id: str, order: str, limit: int, after: Optional[str],
+                      before: Optional[str], run_id: Optional[str]) -> Dict[str, Any]:
+        messages = [m for m in self.thread(thread_id) if run_id is None or m["run_id"] == run_id]
+        if order == "desc":
+            messages = messages[::-1]
+        ids = [m["id"] for m in messages]
+        if after in ids:
+            messages = messages[ids.index(after) + 1:]
+        elif before in ids:
+            messages = messages[:ids.index(before)]
+        page = messages[:limit]
+        return {
+            "object": "list",
+            "data": page,
+            "first_id": page[0]["id"] if page else None,
+            "last_id": page[-1]["id"] if page else None,
+            "has_more": len(messages) > limit
+        }
+
+    # Runs
+
+    def answer_for(self, thread_id: str) -> str:
+        question = next((_message_text(m) for m in reversed(self.thread(thread_id)) if m["role"] == "user"), "")
+        if "JSON array" in question:
+            return json.dumps(SUGGESTIONS, ensure_ascii=False)
+        filler = " ".join(random.choice(["ภาพ", "สัญญาณ", "ความถี่", "ตัวกรอง", "พิกเซล"]) for _ in range(self.profile.answer_words))
+        return f"คำตอบจำลองสำหรับ: {question[:80]} {filler}"
+
+    def searchable_files(self, thread_id: str) -> List[str]:
+        """
+        Files file_search can find from the thread: those in its attached
+        stores, else any file that is not in a session store
+        """
+        attached = [f for vs in self.thread_stores.get(thread_id, []) for f in self.store_files.get(vs, [])]
+        if attached:
+            return [f for f in attached if f in self.files]
+        private = {f for vs in self.vector_stores for f in self.store_files.get(vs, [])}
+        return [f for f in self.files if f not in private]
+
+    def cited_answer(self, thread_id: str) -> Tuple[str, List[Dict[str, Any]]]:
+        """Answer text and content blocks, citing a file the thread can search when there is one"""
+        answer = self.answer_for(thread_id)
+        candidates = self.searchable_files(thread_id)
+        if not candidates:
+            return answer, _text_content(answer)
+        file = self.files[random.choice(candidates)]
+        marker = f"【4:0†{file['filename']}】"
+        annotation = {
+            "type": "file_citation",
+            "text": marker,
+            "start_index": len(answer),
+            "end_index": len(answer) + len(marker),
+            "file_citation": {"file_id": file["id"]}
+        }
+        answer += marker
+        return answer, [{"type": "text", "text": {"value": answer, "annotations": [annotation]}}]
+
+    def create_run(self, thread_id: str, assistant_id: str) -> Dict[str, Any]:
+        self.thread(thread_id)
+        now = time.time()
+        run = {
+            "id": _new_id("run"),
+            "object": "thread.run",
+            "created_at": int(now),
+            "thread_id": thread_id,
+            "assistant_id": assistant_id,
+            "status": "queued",
+            "started_at": None,
+            "completed_at": None,
+            "failed_at": None,
+            "last_error": None,
+            "model": "fake",
+            "instructions": "",
+            "tools": [],
+            "metadata": {},
+            # Private: when the run starts and finishes (not returned)
+            "_starts": now + self.profile.run_queue_seconds,
+            "_ends": now + self.profile.run_queue_seconds + self.profile.run_seconds,
+            "_fails": random.random() < self.profile.run_failure_rate
+        }
+        self.runs[run["id"]] = run
+        return run
+
+    def advance(self, run: Dict[str, Any]) -> Dict[str, Any]:
+        """Move the run along its timeline; the answer is posted when it completes"""
+        now = time.time()
+        if run["status"] == "queued" and now >= run["_starts"]:
+            run["status"] = "in_progress"
+            run["started_at"] = int(run["_starts"])
+        if run["status"] == "in_progress" and now >= run["_ends"]:
+            if run["_fails"]:
+                run["status"] = "failed"
+                run["failed_at"] = int(run["_ends"])
+                run["last_error"] = {"code": "server_error", "message": "Simulated run failure"}
+            else:
+                self.add_message(run["thread_id"], "assistant", self.cited_answer(run["thread_id"])[1], run["id"])
+                run["status"] = "completed"
+                run["completed_at"] = int(run["_ends"])
+        return {k: v for k, v in run.items() if not k.startswith("_")}
+
+    def get_run(self, thread_id: str, run_id: str) -> Dict[str, Any]:
+        run = self.runs.get(run_id)
+        if run is None or run["thread_id"] != thread_id:
+            raise HTTPException(status_code=404, detail=f"No run found with id '{run_id}'.")
+        return self.advance(run)
+
+    async def stream_run(self, run: Dict[str, Any]):
+        """Assistants streaming events for a run, with the answer split into deltas"""
+        def public() -> Dict[str, Any]:
+            return {k: v for k, v in run.items() if not k.startswith("_")}
+
+        yield _sse("thread.run.created", public())
+        await asyncio.sleep(max(0.0, run["_starts"] - time.time()))
+        run["status"] = "in_progress"
+        run["started_at"] = int(run["_starts"])
+        yield _sse("thread.run.in_progress", public())
+
+        if run["_fails"]:
+            await asyncio.sleep(max(0.0, run["_ends"] - time.time()))
+            run["status"] = "failed"
+            run["failed_at"] = int(time.time())
+            run["last_error"] = {"code": "server_error", "message": "Simulated run failure"}
+            yield _sse("thread.run.failed", public())
+            yield "event: done\ndata: [DONE]\n\n"
+            return
+
+        message = self.add_message(run["thread_id"], "assistant", [], run["id"])
+        message["status"] = "in_progress"
+        yield _sse("thread.message.created", message)
+
+        answer, content = self.cited_answer(run["thread_id"])
+        chunks = max(1, self.profile.stream_chunks)
+        size = max(1, -(-len(answer) // chunks))
+        pause = self.profile.run_seconds / chunks
+        for start in range(0, len(answer), size):
+            await asyncio.sleep(pause)
+            yield _sse("thread.message.delta", {
+                "id": message["id"],
+                "object": "thread.message.delta",
+                "delta": {"content": [{"index": 0, "type": "text", "text": {"value": answer[start:start + size]}}]}
+            })
+
+        message["content"] = content
+        message["status"] = "completed"
+        yield _sse("thread.message.completed", message)
+        run["status"] = "completed"
+        run["completed_at"] = int(time.time())
+        yield _sse("thread.run.completed", public())
+        yield "event: done\ndata: [DONE]\n\n"
+
+    # Files, vector stores and their batches
+
+    def create_vector_store(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        vector_store = {
+            "id": _new_id("vs"),
+            "object": "vector_store",
+            "created_at": int(time.time()),
+            "name": body.get("name") or "",
+            "status": "completed",
+            "usage_bytes": 0,
+            "expires_after": body.get("expires_after"),
+            "expires_at": None,
+            "last_active_at": int(time.time()),
+            "metadata": body.get("metadata") or {}
+        }
+        self.vector_stores[vector_store["id"]] = vector_store
+        self.store_files[vector_store["id"]] = []
+        return self.vector_store_view(vector_store["id"])
+
+    def vector_store_view(self, vector_store_id: str) -> Dict[str, Any]:
+        vector_store = self.vector_stores.get(vector_store_id) or {
+            "id": vector_store_id, "object": "vector_store", "created_at": int(time.time()), "name": "DemoVector",
+            "status": "completed", "usage_bytes": 0, "last_active_at": None, "metadata": {}
+        }
+        count = len(self.store_files.get(vector_store_id, []))
+        return {**vector_store, "file_counts": {"in_progress": 0, "completed": count, "failed": 0,
+                                                 "cancelled": 0, "total": count}}
+
+    def delete_file(self, file_id: str):
+        if file_id not in self.files:
+            raise HTTPException(status_code=404, detail=f"No such File object: {file_id}")
+        del self.files[file_id]
+        # Deleting a file also removes it from every vector store
+        for file_ids in self.store_files.values():
+            if file_id in file_ids:
+                file_ids.remove(file_id)
+
+    def create_batch(self, vector_store_id: str, file_ids: List[str]) -> Dict[str, Any]:
+        batch = {
+            "id": _new_id("vsfb"),
+            "object": "vector_store.files_batch",
+            "created_at": int(time.time()),
+            "vector_store_id": vector_store_id,
+            "status": "in_progress",
+            "_file_ids": list(file_ids),
+            # Unknown files fail, like files that were deleted upstream
+            "_failed": [f for f in file_ids if f not in self.files],
+            "_ends": time.time() + self.profile.batch_seconds
+        }
+        self.batches[batch["id"]] = batch
+        return self.batch_view(batch)
+
+    def batch_view(self, batch: Dict[str, Any]) -> Dict[str, Any]:
+        total = len(batch["_file_ids"])
+        failed = len(batch["_failed"])
+        done = time.time() >= batch["_ends"]
+        if done and batch["status"] != "completed":
+            batch["status"] = "completed"
+            files = self.store_files.setdefault(batch["vector_store_id"], [])
+            files.extend(f for f in batch["_file_ids"] if f not in batch["_failed"] and f not in files)
+        view = {k: v for k, v in batch.items() if not k.startswith("_")}
+        view["file_counts"] = {
+            "in_progress": 0 if done else total,
+            "completed": total - failed if done else 0,
+            "failed": failed if done else 0,
+            "cancelled": 0,
+            "total": total
+        }
+        return view
+
+    def get_batch(self, vector_store_id: str, batch_id: str) -> Dict[str, Any]:
+        batch = self.batches.get(batch_id)
+        if batch is None or batch["vector_store_id"] != vector_store_id:
+            raise HTTPException(status_code=404, detail=f"No file batch found with id '{batch_id}'.")
+        return batch
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "profile": self.profile.to_dict(),
+            "requests": dict(self.requests),
+            "injected_errors": dict(self.injected),
+            "threads": len(self.threads),
+            "runs": len(self.runs),
+            "files": len(self.files),
+            "batches": len(self.batches),
+            "vector_stores": len(self.vector_stores)
+        }
+
+
+def create_app(profile: Profile) -> FastAPI:
+    app = FastAPI(title="Fake OpenAI Assistants API")
+    fake = FakeOpenAI(profile)
+    app.state.fake = fake
+
+    @app.middleware("http")
+    async def simulate_upstream(request: Request, call_next):
+        if request.url.path.startswith("/_fake"):
+            return await call_next(request)
+        route = f"{request.method} {request.url.path}"
+        fake.requests[route] += 1
+
+        await asyncio.sleep(profile.request_delay())
+        roll = random.random()
+        if roll < profile.rate_limit_rate:
+            fake.injected["429"] += 1
+            return JSONResponse({"error": {"message": "Rate limit reached", "type": "requests"}},
+                                status_code=429, headers={"Retry-After": "1"})
+        if roll < profile.rate_limit_rate + profile.error_rate:
+            fake.injected["503"] += 1
+            return JSONResponse({"error": {"message": "The server is overloaded", "type": "server_error"}},
+                                status_code=503)
+        return await call_next(request)
+
+    @app.exception_handler(HTTPException)
+    async def openai_error(request: Request, exc: HTTPException):
+        # Same error envelope as the real API, so the SDK raises the right exception
+        return JSONResponse({"error": {"message": exc.detail, "type": "invalid_request_error"}},
+                            status_code=exc.status_code)
+
+    @app.get("/v1/assistants/{assistant_id}")
+    async def retrieve_assistant(assistant_id: str):
+        return {"id": assistant_id, "object": "assistant", "created_at": int(time.time()), "model": "fake",
+                "name": "Fake assistant", "instructions": "", "tools": [{"type": "file_search"}], "metadata": {}}
+
+    @app.post("/v1/vector_stores")
+    async def create_vector_store(request: Request):
+        return fake.create_vector_store(await request.json())
+
+    @app.get("/v1/vector_stores/{vector_store_id}")
+    async def retrieve_vector_store(vector_store_id: str):
+        return fake.vector_store_view(vector_store_id)
+
+    @app.delete("/v1/vector_stores/{vector_store_id}")
+    async def delete_vector_store(vector_store_id: str):
+        if vector_store_id not in fake.vector_stores:
+            raise HTTPException(status_code=404, detail=f"No vector store found with id '{vector_store_id}'.")
+        del fake.vector_stores[vector_store_id]
+        del fake.store_files[vector_store_id]
+        return {"id": vector_store_id, "object": "vector_store.deleted", "deleted": True}
+
+    @app.post("/v1/threads")
+    async def create_thread(request: Request):
+        body = await request.json() if await request.body() else {}
+        return fake.create_thread(body.get("messages") or [])
+
+    @app.post("/v1/threads/{thread_id}")
+    async def update_thread(thread_id: str, request: Request):
+        fake.thread(thread_id)
+        body = await request.json()
+        if "tool_resources" in body:
+            file_search = (body["tool_resources"] or {}).get("file_search") or {}
+            fake.thread_stores[thread_id] = list(file_search.get("vector_store_ids") or [])
+        return {"id": thread_id, "object": "thread", "created_at": int(time.time()), "metadata": {},
+                "tool_resources": {"file_search": {"vector_store_ids": fake.thread_stores.get(thread_id, [])}}}
+
+    @app.delete("/v1/threads/{thread_id}")
+    async def delete_thread(thread_id: str):
+        fake.thread(thread_id)
+        del fake.threads[thread_id]
+        fake.thread_stores.pop(thread_id, None)
+        return {"id": thread_id, "object": "thread.deleted", "deleted": True}
+
+    @app.post("/v1/threads/{thread_id}/messages")
+    async def create_message(thread_id: str, request: Request):
+        body = await request.json()
+        return fake.add_message(thread_id, body.get("role", "user"), _text_content(body.get("content")))
+
+    @app.get("/v1/threads/{thread_id}/messages")
+    async def list_messages(
+        thread_id: str,
+        order: str = "desc",
+        limit: int = 20,
+        after: Optional[str] = None,
+        before: Optional[str] = None,
+        run_id: Optional[str] = None
+    ):
+        return fake.list_messages(thread_id, order, limit, after, before, run_id)
+
+    @app.post("/v1/threads/{thread_id}/runs")
+    async def create_run(thread_id: str, request: Request):
+        body = await request.json()
+        run = fake.create_run(thread_id, body.get("assistant_id", "asst_fake"))
+        if body.get("stream"):
+            return StreamingResponse(fake.stream_run(run), media_type="text/event-stream")
+        return fake.advance(run)
+
+    @app.get("/v1/threads/{thread_id}/runs/{run_id}")
+    async def retrieve_run(thread_id: str, run_id: str):
+        return fake.get_run(thread_id, run_id)
+
+    @app.post("/v1/files")
+    async def create_file(file: UploadFile = File(...), purpose: str = Form(...)):
+        size = 0
+        while chunk := await file.read(1024 * 1024):
+            size += len(chunk)
+        if profile.upload_bytes_per_second > 0:
+            await asyncio.sleep(size / profile.upload_bytes_per_second)
+        entry = {
+            "id": _new_id("file"),
+            "object": "file",
+            "bytes": size,
+            "created_at": int(time.time()),
+            "filename": file.filename,
+            "purpose": purpose,
+            "status": "processed"
+        }
+        fake.files[entry["id"]] = entry
+        return entry
+
+    @app.get("/v1/files/{file_id}")
+    async def retrieve_file(file_id: str):
+        if file_id not in fake.files:
+            raise HTTPException(status_code=404, detail=f"No such File object: {file_id}")
+        return fake.files[file_id]
+
+    @app.delete("/v1/files/{file_id}")
+    async def delete_file(file_id: str):
+        fake.delete_file(file_id)
+        return {"id": file_id, "object": "file", "deleted": True}
+
+    @app.post("/v1/vector_stores/{vector_store_id}/file_batches")
+    async def create_file_batch(vector_store_id: str, request: Request):
+        body = await request.json()
+        return fake.create_batch(vector_store_id, body.get("file_ids") or [])
+
+    @app.get("/v1/vector_stores/{vector_store_id}/file_batches/{batch_id}")
+    async def retrieve_file_batch(vector_store_id: str, batch_id: str):
+        return fake.batch_view(fake.get_batch(vector_store_id, batch_id))
+
+    @app.get("/v1/vector_stores/{vector_store_id}/file_batches/{batch_id}/files")
+    async def list_file_batch_files(vector_store_id: str, batch_id: str, filter: Optional[str] = None,
+                                    limit: int = 20, after: Optional[str] = None):
+        batch = fake.get_batch(vector_store_id, batch_id)
+        done = time.time() >= batch["_ends"]
+        files = [
+            {"id": f, "object": "vector_store.file", "vector_store_id": vector_store_id,
+             "status": "in_progress" if not done else ("failed" if f in batch["_failed"] else "completed")}
+            for f in batch["_file_ids"]
+        ]
+        if filter:
+            files = [f for f in files if f["status"] == filter]
+        ids = [f["id"] for f in files]
+        if after in ids:
+            files = files[ids.index(after) + 1:]
+        page = files[:limit]
+        return {
+            "object": "list",
+            "data": page,
+            "first_id": page[0]["id"] if page else None,
+            "last_id": page[-1]["id"] if page else None,
+            "has_more": len(files) > limit
+        }
+
+    @app.get("/_fake/stats")
+    async def fake_stats():
+        return fake.stats()
+
+    return app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="realistic")
+    parser.add_argument("--latency", type=float, help="override per-request latency (s)")
+    parser.add_argument("--run-seconds", type=float, help="override run duration (s)")
+    parser.add_argument("--error-rate", type=float, help="override fraction of 503 responses")
+    args = parser.parse_args()
+
+    profile = PROFILES[args.profile]
+    if args.latency is not None:
+        profile.latency = args.latency
+    if args.run_seconds is not None:
+        profile.run_seconds = args.run_seconds
+    if args.error_rate is not None:
+        profile.error_rate = args.error_rate
+
+    uvicorn.run(create_app(profile), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Load generator for /api/v1/chat, /api/v1/chat/stream, /api/v1/upload and
+/api/v1/chat/initialize. Reports throughput and p50/p95/p99 latency per
+scenario, and optionally compares them with a saved baseline.
+
+By default it starts the fake OpenAI server (benchmarks/fake_openai.py)
+and the backend against it in temporary directories, so no keys are
+needed. Use --target to drive an already running backend instead.
+
+Usage (from the backend directory):
+    python benchmarks/load_test.py --profile realistic --concurrency 16 --requests 200
+    python benchmarks/load_test.py --profile instant --compare benchmarks/results/baseline-instant.json
+
+Baselines in benchmarks/results/ were recorded with --concurrency 16 and
+--requests 200 (instant) / 100 (realistic); record new ones with --output
+after changes that are expected to move them.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCENARIOS = ["initialize", "chat", "stream", "upload"]
+
+QUESTIONS = [
+    "การแปลงฟูเรียร์คืออะไร",
+    "อธิบาย histogram equalization",
+    "ตัวกรองแบบ median ต่างจาก mean อย่างไร",
+    "What is an edge detector?",
+]
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+class Scenario:
+    """One kind of request, with a counter so every request is distinct"""
+
+    def __init__(self, name: str, repeat_ratio: float, upload_kb: int):
+        self.name = name
+        self.repeat_ratio = repeat_ratio
+        self.upload_kb = upload_kb
+        self.sent = 0
+
+    async def request(self, client: httpx.AsyncClient) -> int:
+        """Send one request and return its status code"""
+        self.sent += 1
+        n = self.sent
+        if self.name == "initialize":
+            response = await client.post("/api/v1/chat/initialize")
+            return response.status_code
+
+        if self.name == "upload":
+            # Unique content so every upload goes upstream (no dedup hits)
+            line = f"load test document {n} {random.random()}\n"
+            content = (line * (self.upload_kb * 1024 // len(line) + 1)).encode()
+            response = await client.post(
+                "/api/v1/upload", files={"file": (f"load_{n}.txt", content, "text/plain")}
+            )
+            return response.status_code
+
+        # First-turn questions; repeats are answer cache candidates
+        if random.random() < self.repeat_ratio:
+            message = random.choice(QUESTIONS)
+        else:
+            message = f"{random.choice(QUESTIONS)} ({n}-{random.random():.6f})"
+        if self.name == "chat":
+            response = await client.post("/api/v1/chat", json={"message": message})
+            return response.status_code
+
+        status = 0
+        async with client.stream("POST", "/api/v1/chat/stream", json={"message": message}) as response:
+            status = response.status_code
+            async for line in response.aiter_lines():
+                if line.startswith("event: error"):
+                    status = 599
+                elif line.startswith("event: done"):
+                    break
+        return status
+
+
+async def run_scenario(client: httpx.AsyncClient, scenario: Scenario, requests: int, concurrency: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    remaining = [requests]
+
+    async def worker():
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            started = time.perf_counter()
+            try:
+                status = await scenario.request(client)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latency = (time.perf_counter() - started) * 1000
+            statuses[str(status)] += 1
+            if status == 200:
+                latencies.append(latency)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    result = {
+        "requests": requests,
+        "concurrency": concurrency,
+        "ok": len(latencies),
+        "statuses": dict(statuses),
+        "elapsed_s": round(elapsed, 2),
+        "throughput_rps": round(len(latencies) / elapsed, 2)
+    }
+    if latencies:
+        result.update({
+            "p50_ms": round(percentile(latencies, 50), 1),
+            "p95_ms": round(percentile(latencies, 95), 1),
+            "p99_ms": round(percentile(latencies, 99), 1),
+            "max_ms": round(max(latencies), 1)
+        })
+    return result
+
+
+def wait_until_up(url: str, process: subprocess.Popen, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{url} exited with code {process.returncode}")
+        try:
+            if httpx.get(url, timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+def start_stack(args, workdir: str) -> List[subprocess.Popen]:
+    """Start the fake OpenAI server and the backend pointed at it"""
+    fake = subprocess.Popen(
+        [sys.executable, os.path.join(BACKEND_DIR, "benchmarks", "fake_openai.py"),
+         "--port", str(args.fake_port), "--profile", args.profile],
+        cwd=BACKEND_DIR
+    )
+    processes = [fake]
+    try:
+        wait_until_up(f"http://127.0.0.1:{args.fake_port}/_fake/stats", fake)
+
+        env = dict(
+            os.environ,
+            OPENAI_BASE_URL=f"http://127.0.0.1:{args.fake_port}/v1",
+            OPENAI_API_KEY="fake",
+            ASSISTANT_ID="asst_fake",
+            # One client address sends everything; per-user limits would dominate
+            RATE_LIMIT_CHAT_PER_MINUTE="0",
+            RATE_LIMIT_UPLOADS_PER_MINUTE="0",
+            SESSION_DB_PATH=os.path.join(workdir, "sessions.db"),
+            UPLOAD_INDEX_PATH=os.path.join(workdir, "upload_index.db"),
+            SEARCH_INDEX_PATH=os.path.join(workdir, "search_index.db"),
+            AUTH_DB_PATH=os.path.join(workdir, "auth_sessions.db"),
+            LOG_LEVEL="WARNING"
+        )
+        backend = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port),
+             "--workers", str(args.workers), "--log-level", "warning", "--no-access-log"],
+            cwd=BACKEND_DIR,
+            env=env
+        )
+        processes.append(backend)
+        wait_until_up(f"http://127.0.0.1:{args.port}/health", backend)
+    except Exception:
+        stop_stack(processes)
+        raise
+    return processes
+
+
+def stop_stack(processes: List[subprocess.Popen]):
+    for process in reversed(processes):
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def print_results(results: Dict[str, Dict[str, Any]], baseline: Optional[Dict[str, Any]]):
+    base = (baseline or {}).get("scenarios", {})
+    print(f"{'scenario':<12}{'ok/req':>10}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}  statuses")
+    for name, r in results.items():
+        print(f"{name:<12}{r['ok']:>5}/{r['requests']:<4}{r['throughput_rps']:>9.1f}"
+              f"{r.get('p50_ms', 0):>10.1f}{r.get('p95_ms', 0):>10.1f}{r.get('p99_ms', 0):>10.1f}  {r['statuses']}")
+        if name in base:
+            deltas = []
+            for key in ["throughput_rps", "p50_ms", "p95_ms", "p99_ms"]:
+                old, new = base[name].get(key), r.get(key)
+                if old and new is not None:
+                    deltas.append(f"{key} {100 * (new - old) / old:+.0f}%")
+            print(f"{'':<12}vs baseline: {', '.join(deltas)}")
+
+
+async def run(args, base_url: str) -> Dict[str, Dict[str, Any]]:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    results = {}
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        for name in args.scenarios:
+            scenario = Scenario(name, args.repeat_ratio, args.upload_kb)
+            # Warm-up: connections, caches and lazily created state
+            await run_scenario(client, scenario, min(args.concurrency, args.requests), args.concurrency)
+            results[name] = await run_scenario(client, scenario, args.requests, args.concurrency)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", help="base URL of a running backend (skips starting the fake stack)")
+    parser.add_argument("--profile", default="instant", help="fake OpenAI profile (instant, realistic, degraded)")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--repeat-ratio", type=float, default=0.0, help="fraction of chat questions repeated from a fixed set")
+    parser.add_argument("--upload-kb", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--fake-port", type=int, default=9100)
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--output", help="write results as JSON (e.g. a new baseline)")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    upstream = None
+    with tempfile.TemporaryDirectory() as workdir:
+        processes = [] if args.target else start_stack(args, workdir)
+        try:
+            base_url = args.target or f"http://127.0.0.1:{args.port}"
+            results = asyncio.run(run(args, base_url))
+            if not args.target:
+                upstream = httpx.get(f"http://127.0.0.1:{args.fake_port}/_fake/stats").json()
+        finally:
+            stop_stack(processes)
+
+    print_results(results, baseline)
+    if upstream:
+        calls = sum(upstream["requests"].values())
+        print(f"upstream: {calls} requests, injected errors {upstream['injected_errors']}")
+
+    if args.output:
+        report = {
+            "profile": None if args.target else args.profile,
+            "workers": args.workers,
+            "python": platform.python_version(),
+            "machine": f"{platform.system()} {platform.machine()}, {os.cpu_count()} CPUs",
+            "date": time.strftime("%Y-%m-%d"),
+            "scenarios": results,
+            "upstream_requests": upstream["requests"] if upstream else None
+        }
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+
+
+if __name__ == "__main__":
+    main()
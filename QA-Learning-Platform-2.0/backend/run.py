@@ -1,3 +1,4 @@
+import importlib.util
 import uvicorn
 import os
 from dotenv import load_dotenv
@@ -7,12 +8,49 @@ load_dotenv()
 
 # Import the FastAPI app
 
-if __name__ == "__main__":
-    host = os.getenv("HOST", "0.0.0.0")
-    port = int(os.getenv("PORT", 8000))
-
+def run_development(host: str, port: int):
+    """Single process with the file-watching reloader"""
     uvicorn.run("app.main:app",
                 host=host,
                 port=port,
                 reload=True,
                 log_level="info")
+
+def run_production(host: str, port: int):
+    """
+    Multiple worker processes with uvloop/httptools and tuned keep-alive.
+    On SIGTERM each worker stops accepting connections and waits up to
+    GRACEFUL_SHUTDOWN_TIMEOUT seconds for in-flight chat runs to finish.
+    """
+    workers = int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1))
+    # Workers merge their metrics through snapshot files; drop the last run's
+    from app.services.metrics import registry
+    registry.clear_snapshots()
+    # Workers split server-wide limits by this count (app.runtime.worker_count)
+    os.environ["WEB_CONCURRENCY"] = str(workers)
+    has_uvloop = importlib.util.find_spec("uvloop") is not None
+    has_httptools = importlib.util.find_spec("httptools") is not None
+
+    uvicorn.run("app.main:app",
+                host=host,
+                port=port,
+                workers=workers,
+                loop="uvloop" if has_uvloop else "auto",
+                http="httptools" if has_httptools else "auto",
+                backlog=int(os.getenv("BACKLOG", 2048)),
+                timeout_keep_alive=int(os.getenv("KEEP_ALIVE_TIMEOUT", 75)),
+                timeout_graceful_shutdown=int(os.getenv("GRACEFUL_SHUTDOWN_TIMEOUT", 90)),
+                proxy_headers=True,
+                forwarded_allow_ips=os.getenv("FORWARDED_ALLOW_IPS", "*"),
+                access_log=os.getenv("ACCESS_LOG", "false").lower() == "true",
+                log_level="info")
+
+if __name__ == "__main__":
+    host = os.getenv("HOST", "0.0.0.0")
+    port = int(os.getenv("PORT", 8000))
+
+    # Workers inherit SERVER_PROFILE, which switches shared state to SQLite
+    if os.getenv("SERVER_PROFILE", "development").lower() == "production":
+        run_production(host, port)
+    else:
+        run_development(host, port)
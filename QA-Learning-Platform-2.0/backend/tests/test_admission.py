@@ -0,0 +1,74 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+# Add backend directory to sys.path to allow importing app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.runtime import per_worker, worker_count
+from app.services.admission import AdmissionController, Overloaded, RateLimiter
+
+
+def test_token_bucket_allows_burst_then_limits():
+    limiter = RateLimiter("chat", per_minute=60, burst=2)
+    limiter.check("user-a")
+    limiter.check("user-a")
+    with pytest.raises(Overloaded) as exc:
+        limiter.check("user-a")
+    assert exc.value.retry_after == 1
+    # Other users have their own bucket
+    limiter.check("user-b")
+    assert limiter.stats()["limited"] == 1
+
+
+@pytest.mark.asyncio
+async def test_queue_full_fails_fast_and_slots_are_reused():
+    controller = AdmissionController("runs", limit=1, max_queue=1, max_wait=1)
+    first = await controller.acquire()
+
+    waiter = asyncio.create_task(controller.acquire())
+    await asyncio.sleep(0)
+    assert controller.stats()["queued"] == 1
+    with pytest.raises(Overloaded):
+        await controller.acquire()
+
+    first.release()
+    first.release()  # idempotent
+    second = await waiter
+    assert controller.stats()["in_flight"] == 1
+    second.release()
+    stats = controller.stats()
+    assert (stats["in_flight"], stats["admitted"], stats["rejected"]) == (0, 2, 1)
+
+
+@pytest.mark.asyncio
+async def test_wait_is_bounded():
+    controller = AdmissionController("runs", limit=1, max_queue=5, max_wait=0.05)
+    slot = await controller.acquire()
+    with pytest.raises(Overloaded):
+        await controller.acquire()
+    assert controller.stats()["timed_out"] == 1
+    slot.release()
+
+
+def test_shared_buckets_limit_a_user_across_workers(tmp_path):
+    # Two limiters on one database stand in for two worker processes
+    path = str(tmp_path / "rate_limits.db")
+    worker_a = RateLimiter("chat", per_minute=60, burst=2, shared=True, path=path)
+    worker_b = RateLimiter("chat", per_minute=60, burst=2, shared=True, path=path)
+    worker_a.check("user-a")
+    worker_b.check("user-a")
+    with pytest.raises(Overloaded):
+        worker_a.check("user-a")
+    worker_b.check("user-b")
+    assert worker_a.stats()["keys"] == 2
+
+
+def test_server_wide_limits_are_split_between_workers(monkeypatch):
+    monkeypatch.setenv("SERVER_PROFILE", "production")
+    monkeypatch.setenv("WEB_CONCURRENCY", "4")
+    assert (worker_count(), per_worker(32), per_worker(2)) == (4, 8, 1)
+    monkeypatch.setenv("SERVER_PROFILE", "development")
+    assert per_worker(32) == 32
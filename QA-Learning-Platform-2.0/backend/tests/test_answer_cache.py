@@ -0,0 +1,33 @@
+import os
+import sys
+
+# Add backend directory to sys.path to allow importing app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.answer_cache import AnswerCache, normalize_question
+
+SCOPE = ("asst", "vs", "3:1700000000.0")
+
+
+def test_normalization_folds_thai_variants():
+    assert normalize_question("Sharpen Filters ใช้เพื่ออะไร ครับ?") == "sharpen filters ใช้เพื่ออะไร"
+    assert normalize_question("เเสง​คืออะไรคะ") == normalize_question("แสงคืออะไร")
+
+
+def test_exact_and_near_duplicate_hits():
+    cache = AnswerCache(similarity=0.8)
+    cache.store("Unitary และ Fourier transform ต่างกันอย่างไร", "answer", SCOPE, latency=6.0)
+
+    assert cache.lookup("unitary และ fourier transform ต่างกันอย่างไร ?", SCOPE).answer == "answer"
+    assert cache.lookup("Unitary และ Fourier transformต่างกันอย่างไรบ้าง", SCOPE).answer == "answer"
+    assert cache.lookup("Sharpen Filters ใช้เพื่ออะไร", SCOPE) is None
+    stats = cache.stats()
+    assert (stats["exact_hits"], stats["near_hits"], stats["misses"]) == (1, 1, 1)
+
+
+def test_scope_change_drops_entries():
+    cache = AnswerCache()
+    cache.store("นิยามการประมวลผลภาพ", "answer", SCOPE)
+    assert cache.lookup("นิยามการประมวลผลภาพ", ("asst", "vs", "4:1700000100.0")) is None
+    assert cache.stats()["entries"] == 0
+    assert cache.stats()["invalidations"] == 1
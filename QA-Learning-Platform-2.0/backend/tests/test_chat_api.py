@@ -0,0 +1,153 @@
+import os
+import sys
+from datetime import datetime
+
+import httpx
+import pytest
+from openai import AsyncOpenAI
+
+# Add backend directory to sys.path to allow importing app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+os.environ.setdefault("OPENAI_API_KEY", "fake")
+os.environ.setdefault("ASSISTANT_ID", "asst_fake")
+
+from fastapi.testclient import TestClient
+
+from fake_openai import Profile, create_app
+from app.main import app
+from app.models.chat import Message
+from app.services.admission import chat_rate_limiter, upload_rate_limiter
+from app.services.answer_cache import answer_cache
+from app.services.http_client import http_pool
+from app.services.openai_service import OpenAIService, openai_service
+from app.services.search_index import SearchIndex, search_index
+from app.services.session_service import SessionService, session_service
+from app.services.session_store import MemorySessionStore
+from app.services.thread_pool import thread_pool
+from app.services.upload_index import UploadIndex, upload_index
+
+
+@pytest.fixture
+def api(monkeypatch):
+    """TestClient for the app with every OpenAI call going to an in-process fake"""
+    fake_app = create_app(Profile("test", run_seconds=0.01))
+    service = OpenAIService()
+    service.client = AsyncOpenAI(
+        api_key="fake",
+        base_url="http://fake/v1",
+        http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=fake_app)),
+        max_retries=0
+    )
+    service.api_base = "http://fake/v1"
+    openai_service.override(service)
+    session_service.override(SessionService(store=MemorySessionStore()))
+    upload_index.override(UploadIndex(":memory:"))
+    search_index.override(SearchIndex(":memory:"))
+    monkeypatch.setattr(thread_pool, "size", 0)
+    monkeypatch.setattr(chat_rate_limiter, "rate", 0)
+    monkeypatch.setattr(upload_rate_limiter, "rate", 0)
+    monkeypatch.setattr(answer_cache, "enabled", True)
+    answer_cache.invalidate()
+    try:
+        with TestClient(app) as client:
+            http_pool._client = httpx.AsyncClient(transport=httpx.ASGITransport(app=fake_app))
+            yield client, fake_app.state.fake
+    finally:
+        http_pool._client = None
+        answer_cache.invalidate()
+        for provider in (openai_service, session_service, upload_index, search_index):
+            provider.override(None)
+
+
+def chat(client, message, session_id=None):
+    response = client.post("/api/v1/chat", json={"message": message, "session_id": session_id})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_cached_answer_makes_no_openai_calls_and_seeds_the_next_run(api):
+    client, fake = api
+    chat(client, "What is a sharpen filter?")
+
+    before = sum(fake.requests.values())
+    cached = chat(client, "What is a sharpen filter?")
+    assert sum(fake.requests.values()) == before
+    session = session_service.get_session(cached["session_id"])
+    assert session.thread_id is None and len(session.thread_seed) == 2
+
+    # The follow-up creates the thread with the cached exchange, then runs
+    follow_up = chat(client, "And a blur filter?", cached["session_id"])
+    session = session_service.get_session(cached["session_id"])
+    assert [m["role"] for m in fake.threads[session.thread_id]] == ["user", "assistant", "user", "assistant"]
+    assert "And a blur filter?" in follow_up["assistant_response"]["content"]
+    assert session.thread_seed is None
+    assert len(session.messages) == 4
+
+
+def test_cached_answer_in_a_session_with_a_thread_is_posted_before_the_next_run(api):
+    client, fake = api
+    chat(client, "What is a sharpen filter?")
+    session_id = client.post("/api/v1/sessions").json()["session_id"]
+    thread_id = session_service.get_session(session_id).thread_id
+
+    chat(client, "What is a sharpen filter?", session_id)
+    assert fake.threads[thread_id] == []
+    chat(client, "And a blur filter?", session_id)
+    assert [m["role"] for m in fake.threads[thread_id]] == ["user", "assistant", "user", "assistant"]
+    assert client.post(f"/api/v1/sessions/{session_id}/sync").json()["synced"] == 0
+
+
+def test_message_pages_follow_the_cursor_to_the_last_page(api):
+    client, _ = api
+    session_id = client.post("/api/v1/sessions").json()["session_id"]
+    for i in range(5):
+        session_service.add_message_to_session(session_id, Message(role="user", content=f"m{i}", timestamp=datetime.now()))
+
+    contents, cursor, pages = [], None, 0
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        page = client.get(f"/api/v1/sessions/{session_id}/messages", params=params).json()
+        contents += [m["content"] for m in page["messages"]]
+        cursor, pages = page["next_cursor"], pages + 1
+        if cursor is None:
+            break
+    assert (contents, pages) == ([f"m{i}" for i in range(5)], 3)
+
+    # A page that ends exactly at the last message has no next cursor
+    page = client.get(f"/api/v1/sessions/{session_id}/messages", params={"limit": 5}).json()
+    assert len(page["messages"]) == 5 and page["next_cursor"] is None
+    assert client.get(f"/api/v1/sessions/{session_id}/messages", params={"cursor": "bad"}).status_code == 400
+
+
+def test_session_summaries_page_newest_first(api):
+    client, _ = api
+    created = [client.post("/api/v1/sessions").json()["session_id"] for _ in range(3)]
+    for session_id in created:
+        session_service.add_message_to_session(session_id, Message(role="user", content=session_id, timestamp=datetime.now()))
+
+    first = client.get("/api/v1/sessions", params={"limit": 2}).json()
+    assert [s["id"] for s in first["sessions"]] == created[:0:-1]
+    second = client.get("/api/v1/sessions", params={"limit": 2, "cursor": first["next_cursor"]}).json()
+    assert [s["id"] for s in second["sessions"]] == created[:1]
+    assert second["next_cursor"] is None
+    assert second["sessions"][0]["title"] == created[0]
+
+
+def test_unchanged_listings_answer_304_to_if_none_match(api):
+    client, _ = api
+    session_id = client.post("/api/v1/sessions").json()["session_id"]
+    url = f"/api/v1/sessions/{session_id}/messages"
+    response = client.get(url)
+    etag = response.headers["etag"]
+
+    not_modified = client.get(url, headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304 and not_modified.content == b""
+    assert not_modified.headers["etag"] == etag
+
+    session_service.add_message_to_session(session_id, Message(role="user", content="new", timestamp=datetime.now()))
+    changed = client.get(url, headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["etag"] != etag
+    listing = client.get("/api/v1/sessions")
+    assert client.get("/api/v1/sessions", headers={"If-None-Match": listing.headers["etag"]}).status_code == 304
@@ -0,0 +1,159 @@
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+
+# Add backend directory to sys.path to allow importing app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.citations import filename_from_marker, message_text_and_citations, strip_citations
+from app.services.file_metadata import FileMetadataCache, resolve_citations
+
+
+def text_block(value, annotations=()):
+    return SimpleNamespace(type="text", text=SimpleNamespace(value=value, annotations=list(annotations)))
+
+
+def file_citation(text, start, file_id):
+    return SimpleNamespace(
+        type="file_citation", text=text, start_index=start, end_index=start + len(text),
+        file_citation=SimpleNamespace(file_id=file_id)
+    )
+
+
+class NotFound(Exception):
+    status_code = 404
+
+
+class FakeFiles:
+    """files.retrieve stand-in that counts calls"""
+
+    def __init__(self, files, delay=0.0):
+        self.files = files
+        self.delay = delay
+        self.calls = []
+
+    async def fetch(self, file_id):
+        self.calls.append(file_id)
+        await asyncio.sleep(self.delay)
+        if file_id not in self.files:
+            raise NotFound(file_id)
+        return {"filename": self.files[file_id], "bytes": 1}
+
+
+def test_spans_are_shifted_across_text_blocks():
+    first = "Edges 【4:0†a.pdf】"
+    second = "Blur 【4:1†b.pdf】"
+    message = SimpleNamespace(content=[
+        text_block(first, [file_citation("【4:0†a.pdf】", 6, "file-a")]),
+        SimpleNamespace(type="image_file"),
+        text_block(second, [
+            file_citation("【4:1†b.pdf】", 5, "file-b"),
+            SimpleNamespace(type="file_path", text="sandbox:/x", start_index=0, end_index=1)
+        ])
+    ])
+
+    text, citations = message_text_and_citations(message)
+
+    assert text == first + second
+    assert [c["file_id"] for c in citations] == ["file-a", "file-b"]
+    for citation in citations:
+        assert text[citation["start_index"]:citation["end_index"]] == citation["marker"]
+    assert strip_citations(text, citations) == "Edges Blur "
+
+
+def test_filename_from_marker():
+    assert filename_from_marker("【4:9†book310453.pdf】") == "book310453.pdf"
+    assert filename_from_marker("【4:9】") is None
+
+
+def test_batch_uses_memory_then_local_index_then_api():
+    files = FakeFiles({"file-api": "remote.pdf"})
+    local_batches = []
+
+    def local_lookup(file_ids):
+        local_batches.append(list(file_ids))
+        return {"file-local": {"filename": "uploaded.pdf", "bytes": 2}} if "file-local" in file_ids else {}
+
+    cache = FileMetadataCache(fetch=files.fetch, local_lookup=local_lookup)
+
+    async def scenario():
+        first = await cache.resolve(["file-local", "file-api", "file-api"])
+        second = await cache.resolve(["file-api", "file-local"])
+        return first, second
+
+    first, second = asyncio.run(scenario())
+
+    assert first["file-local"]["filename"] == "uploaded.pdf"
+    assert first["file-api"]["filename"] == "remote.pdf"
+    assert second == first
+    assert local_batches == [["file-local", "file-api"]]
+    assert files.calls == ["file-api"]
+    assert cache.stats()["hits"] == 2
+
+
+def test_concurrent_lookups_share_one_retrieve():
+    files = FakeFiles({"file-a": "a.pdf"}, delay=0.05)
+    cache = FileMetadataCache(fetch=files.fetch, local_lookup=lambda ids: {})
+
+    async def scenario():
+        return await asyncio.gather(*(cache.resolve(["file-a"]) for _ in range(10)))
+
+    results = asyncio.run(scenario())
+
+    assert all(r["file-a"]["filename"] == "a.pdf" for r in results)
+    assert files.calls == ["file-a"]
+
+
+def test_lru_eviction_and_ttl():
+    files = FakeFiles({"file-a": "a.pdf", "file-b": "b.pdf", "file-c": "c.pdf"})
+    cache = FileMetadataCache(fetch=files.fetch, local_lookup=lambda ids: {}, max_entries=2)
+
+    async def scenario():
+        await cache.resolve(["file-a", "file-b"])
+        await cache.resolve(["file-a"])  # b is now least recently used
+        await cache.resolve(["file-c"])
+        await cache.resolve(["file-a", "file-b"])
+
+    asyncio.run(scenario())
+    assert files.calls == ["file-a", "file-b", "file-c", "file-b"]
+
+    expiring = FileMetadataCache(fetch=files.fetch, local_lookup=lambda ids: {}, ttl=0)
+    files.calls.clear()
+    asyncio.run(expiring.resolve(["file-a"]))
+    asyncio.run(expiring.resolve(["file-a"]))
+    assert files.calls == ["file-a", "file-a"]
+
+
+def test_missing_files_are_cached_but_errors_are_not():
+    calls = []
+
+    async def flaky(file_id):
+        calls.append(file_id)
+        raise RuntimeError("upstream unavailable")
+
+    files = FakeFiles({})
+    cache = FileMetadataCache(fetch=files.fetch, local_lookup=lambda ids: {})
+    assert asyncio.run(cache.resolve(["file-gone"])) == {"file-gone": None}
+    assert asyncio.run(cache.resolve(["file-gone"])) == {"file-gone": None}
+    assert files.calls == ["file-gone"]
+
+    failing = FileMetadataCache(fetch=flaky, local_lookup=lambda ids: {})
+    asyncio.run(failing.resolve(["file-a"]))
+    asyncio.run(failing.resolve(["file-a"]))
+    assert calls == ["file-a", "file-a"]
+    assert failing.stats()["errors"] == 2
+
+
+def test_resolve_citations_falls_back_to_the_marker_name():
+    cache = FileMetadataCache(fetch=FakeFiles({"file-a": "Lecture 1.pdf"}).fetch, local_lookup=lambda ids: {})
+    raw = [
+        {"file_id": "file-a", "quote": None, "start_index": 0, "end_index": 12, "marker": "【4:0†a.pdf】"},
+        {"file_id": "file-gone", "quote": None, "start_index": 12, "end_index": 24, "marker": "【4:1†b.pdf】"}
+    ]
+
+    citations = asyncio.run(resolve_citations(raw, cache))
+
+    assert [c.filename for c in citations] == ["Lecture 1.pdf", "b.pdf"]
+    assert citations[1].start_index == 12
+    assert asyncio.run(resolve_citations([], cache)) is None
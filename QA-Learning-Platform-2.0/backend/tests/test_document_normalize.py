@@ -0,0 +1,117 @@
+import asyncio
+import io
+import os
+import sys
+
+# Add backend directory to sys.path to allow importing app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.document_normalize import (
+    DocumentNormalizer,
+    csv_to_text,
+    decode_text,
+    html_to_text,
+    normalize_document,
+    normalize_thai
+)
+
+TEST_FILES_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "..", "test_files")
+
+
+def test_csv_rows_are_labelled_by_column():
+    text = csv_to_text("Name,Role\nLily,QA Engineer\n\nJohn Doe,,extra\n", "staff.csv")
+
+    assert "Columns: Name, Role" in text
+    assert "Row 1: Name: Lily; Role: QA Engineer" in text
+    assert "Row 2: Name: John Doe; Column 3: extra" in text
+
+
+def test_csv_delimiter_is_sniffed_and_tsv_uses_tabs():
+    assert "Row 1: a: 1; b: 2" in csv_to_text("a;b\n1;2\n", "x.csv")
+    content, filename = normalize_document(b"a\tb\n1\t2\n", "x.tsv")
+    assert filename == "x.md"
+    assert b"Row 1: a: 1; b: 2" in content
+
+
+def test_thai_csv_in_windows_encoding_is_decoded():
+    data = "ชื่อ,ตำแหน่ง\nลิลลี่,วิศวกร\n".encode("cp874")
+    assert decode_text(data).startswith("ชื่อ")
+    content, _ = normalize_document(data, "staff.csv")
+    assert "Row 1: ชื่อ: ลิลลี่; ตำแหน่ง: วิศวกร" in content.decode("utf-8")
+
+
+def test_html_keeps_content_and_drops_page_chrome():
+    page = """<html><head><title>Lecture 3</title><style>p {}</style></head><body>
+        <nav><a href="/">Home</a><p>menu</nav>
+        <header>Site banner</header>
+        <div role="navigation">More links</div>
+        <article><header><h2>Fourier &amp; filters</h2></header>
+          <p>Low-pass <b>filters</b>   remove noise.</p>
+          <pre>def f():
+    return 1</pre>
+          <table><tr><th>a</th><th>b</th></tr><tr><td>1</td><td>2</td></tr></table>
+          <ul><li>one<li>two</ul>
+        </article>
+        <footer>(c) 2024</footer><script>track()</script></body></html>"""
+
+    text = html_to_text(page)
+
+    assert text.startswith("# Lecture 3\n")
+    assert "## Fourier & filters" in text
+    assert "Low-pass filters remove noise." in text
+    assert "def f():\n    return 1" in text
+    assert "a | b\n" in text and "1 | 2" in text
+    assert "- one\n" in text and "- two" in text
+    for chrome in ["Home", "menu", "Site banner", "More links", "(c) 2024", "track()", "p {}"]:
+        assert chrome not in text
+
+
+def test_thai_normalization():
+    # Sara am typed as nikhahit + sara aa, with and without a tone mark in between
+    assert normalize_thai("\u0e19\u0e4d\u0e32") == "\u0e19\u0e33"
+    assert normalize_thai("\u0e19\u0e4d\u0e49\u0e32") == "\u0e19\u0e49\u0e33"
+    # Tone mark typed before the upper vowel; doubled vowel; zero-width space
+    assert normalize_thai("\u0e01\u0e48\u0e34") == "\u0e01\u0e34\u0e48"
+    assert normalize_thai("\u0e01\u0e34\u0e34") == "\u0e01\u0e34"
+    assert normalize_thai("ภาพ\u200bถ่าย") == "ภาพถ่าย"
+
+
+def test_text_files_are_only_replaced_when_normalization_changes_them():
+    assert normalize_document("ภาพถ่าย\n".encode(), "notes.txt") is None
+    content, filename = normalize_document("ภาพ\u200bถ่าย\n".encode(), "notes.txt")
+    assert (content.decode(), filename) == ("ภาพถ่าย\n", "notes.txt")
+    assert normalize_document(b"%PDF-1.7", "slides.pdf") is None
+
+
+def test_sample_files_shrink_or_become_supported():
+    with open(os.path.join(TEST_FILES_DIR, "test_web.html"), "rb") as f:
+        html = f.read()
+    content, filename = normalize_document(html, "test_web.html")
+    assert filename == "test_web.md"
+    assert len(content) < len(html)
+    assert b"<p>" not in content and b"Employee Profile" in content
+
+
+def test_results_are_cached_and_large_files_use_the_process_pool():
+    normalizer = DocumentNormalizer(process_min_bytes=1000, workers=1)
+    small = b"a,b\n1,2\n"
+    large = b"a,b\n" + b"1,2\n" * 500
+
+    async def scenario():
+        first = await asyncio.gather(*(
+            normalizer.process(io.BytesIO(small), "small-hash", f"copy{i}.csv", len(small)) for i in range(3)
+        ))
+        big = await normalizer.process(io.BytesIO(large), "large-hash", "big.csv", len(large))
+        return first, big
+
+    try:
+        first, big = asyncio.run(scenario())
+    finally:
+        normalizer.close()
+
+    assert [r.filename for r in first] == ["copy0.md", "copy1.md", "copy2.md"]
+    assert b"Row 500: a: 1; b: 2" in big.content
+    stats = normalizer.stats()
+    assert stats["processed"] == 2
+    assert stats["cache_hits"] == 2
+    assert stats["in_process_pool"] == 1
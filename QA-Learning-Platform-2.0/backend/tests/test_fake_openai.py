@@ -0,0 +1,94 @@
+import asyncio
+import os
+import sys
+
+import httpx
+from openai import AsyncOpenAI
+
+# Add backend directory to sys.path to allow importing app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+os.environ.setdefault("OPENAI_API_KEY", "fake")
+os.environ.setdefault("ASSISTANT_ID", "asst_fake")
+
+from fake_openai import Profile, create_app
+from app.services.openai_service import OpenAIService
+
+
+def make_service(profile: Profile) -> OpenAIService:
+    """OpenAIService whose SDK client talks to the fake server in-process"""
+    service = OpenAIService()
+    transport = httpx.ASGITransport(app=create_app(profile))
+    service.client = AsyncOpenAI(
+        api_key="fake",
+        base_url="http://fake/v1",
+        http_client=httpx.AsyncClient(transport=transport),
+        max_retries=0
+    )
+    return service
+
+
+def test_polled_run_returns_the_answer():
+    async def scenario():
+        service = make_service(Profile("test", run_seconds=0.05))
+        thread_id = await service.create_thread()
+        await service.send_message(thread_id, "What is a Fourier transform?")
+        run_id = await service.create_and_run(thread_id)
+
+        assert await service.wait_for_run_completion(thread_id, run_id, timeout=10)
+        response = await service.get_run_response(thread_id, run_id)
+        assert "What is a Fourier transform?" in response["content"]
+
+        messages = await service.get_thread_messages(thread_id)
+        assert [m["role"] for m in messages] == ["user", "assistant"]
+        assert await service.delete_thread(thread_id)
+
+    asyncio.run(scenario())
+
+
+def test_streamed_run_yields_deltas_and_ids():
+    async def scenario():
+        service = make_service(Profile("test", stream_chunks=4))
+        thread_id = await service.create_thread(initial_messages=[{"role": "user", "content": "hello"}])
+        run_info = {}
+        chunks = [text async for text in service.stream_run(thread_id, run_info)]
+
+        assert len(chunks) == 4
+        assert "hello" in "".join(chunks)
+        assert run_info["run_id"].startswith("run_")
+        assert run_info["message_id"].startswith("msg_")
+
+    asyncio.run(scenario())
+
+
+def test_failed_run_is_reported():
+    async def scenario():
+        service = make_service(Profile("test", run_failure_rate=1.0))
+        thread_id = await service.create_thread(initial_messages=[{"role": "user", "content": "hello"}])
+        run_id = await service.create_and_run(thread_id)
+        assert await service.wait_for_run_completion(thread_id, run_id, timeout=10) is False
+
+    asyncio.run(scenario())
+
+
+def test_answers_cite_uploaded_files():
+    async def scenario():
+        service = make_service(Profile("test", run_seconds=0.05, stream_chunks=3))
+        file_id = await service.upload_file(b"lecture notes", "lecture1.pdf")
+        assert await service.retrieve_file(file_id) == {"filename": "lecture1.pdf", "bytes": 13}
+
+        thread_id = await service.create_thread(initial_messages=[{"role": "user", "content": "hello"}])
+        run_id = await service.create_and_run(thread_id)
+        assert await service.wait_for_run_completion(thread_id, run_id, timeout=10)
+        response = await service.get_run_response(thread_id, run_id)
+        [citation] = response["citations"]
+        assert citation["file_id"] == file_id
+        assert response["content"][citation["start_index"]:citation["end_index"]] == citation["marker"]
+
+        run_info = {}
+        text = "".join([chunk async for chunk in service.stream_run(thread_id, run_info)])
+        [citation] = run_info["citations"]
+        assert text[citation["start_index"]:citation["end_index"]] == "【4:0†lecture1.pdf】"
+
+    asyncio.run(scenario())
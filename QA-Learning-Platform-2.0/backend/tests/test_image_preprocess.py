@@ -0,0 +1,127 @@
+import asyncio
+import io
+import os
+import sys
+
+import pytest
+
+# Add backend directory to sys.path to allow importing app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+Image = pytest.importorskip("PIL.Image")
+
+from app.services.image_preprocess import ImagePreprocessor
+
+CODE_PNG = os.path.join(os.path.dirname(__file__), "..", "..", "..", "test_files", "code.png")
+
+
+def encode(image, fmt, **options) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, fmt, **options)
+    return buffer.getvalue()
+
+
+def phone_photo(size=(4000, 3000), orientation=None) -> bytes:
+    image = Image.linear_gradient("L").resize(size).convert("RGB")
+    exif = Image.Exif()
+    exif[0x010F] = "PhoneMaker"  # Make
+    if orientation:
+        exif[0x0112] = orientation
+    return encode(image, "JPEG", quality=95, exif=exif)
+
+
+def process(preprocessor, data, name="photo.jpg"):
+    return asyncio.run(preprocessor.process(io.BytesIO(data), name + str(len(data)), name, len(data)))
+
+
+def test_large_photo_is_downscaled_and_stripped():
+    preprocessor = ImagePreprocessor(max_dimension=1024, output_format="webp")
+    data = phone_photo()
+
+    result = process(preprocessor, data)
+
+    assert (result.width, result.height) == (1024, 768)
+    assert result.filename == "photo.webp"
+    assert result.content_type == "image/webp"
+    assert result.size < len(data)
+    with Image.open(io.BytesIO(result.content)) as out:
+        assert out.format == "WEBP"
+        assert not out.getexif()
+
+
+def test_exif_orientation_is_applied_before_stripping():
+    preprocessor = ImagePreprocessor(max_dimension=1024, output_format="jpeg")
+    # Orientation 6: stored landscape, displayed rotated 90 degrees (portrait)
+    result = process(preprocessor, phone_photo(orientation=6))
+
+    assert (result.width, result.height) == (768, 1024)
+    assert result.filename == "photo.jpg"
+
+
+def test_small_image_without_metadata_is_kept():
+    preprocessor = ImagePreprocessor()
+    data = encode(Image.linear_gradient("L").resize((1024, 768)), "PNG")
+    assert len(data) < preprocessor.min_bytes
+
+    result = process(preprocessor, data, "small.png")
+
+    assert result.content is None
+    assert result.size == len(data)
+    assert preprocessor.stats()["kept_original"] == 1
+
+
+def test_image_that_would_grow_is_kept():
+    preprocessor = ImagePreprocessor(min_bytes=0)
+    # Already heavily compressed: re-encoding at IMAGE_QUALITY would only grow it
+    data = encode(Image.effect_noise((256, 256), 64).convert("RGB"), "JPEG", quality=20)
+
+    assert process(preprocessor, data, "small.jpg").content is None
+
+
+def test_transparency_is_flattened_for_jpeg_and_kept_for_webp():
+    image = Image.new("RGBA", (3000, 100), (255, 0, 0, 0))
+    data = encode(image, "PNG")
+
+    jpeg = process(ImagePreprocessor(max_dimension=300, output_format="jpeg"), data, "a.png")
+    webp = process(ImagePreprocessor(max_dimension=300, output_format="webp"), data, "a.png")
+
+    with Image.open(io.BytesIO(jpeg.content)) as out:
+        assert out.mode == "RGB"
+        assert out.getpixel((0, 0)) == (255, 255, 255)
+    with Image.open(io.BytesIO(webp.content)) as out:
+        assert out.mode == "RGBA"
+
+
+def test_results_are_cached_by_content_hash():
+    preprocessor = ImagePreprocessor(max_dimension=1024, output_format="webp")
+    data = phone_photo()
+
+    async def scenario():
+        first = await asyncio.gather(*(
+            preprocessor.process(io.BytesIO(data), "same-hash", f"copy{i}.jpg", len(data)) for i in range(3)
+        ))
+        again = await preprocessor.process(io.BytesIO(data), "same-hash", "again.jpg", len(data))
+        return first, again
+
+    first, again = asyncio.run(scenario())
+
+    assert preprocessor.stats()["processed"] == 1
+    assert preprocessor.stats()["cache_hits"] == 3
+    assert [r.filename for r in first] == ["copy0.webp", "copy1.webp", "copy2.webp"]
+    assert again.content == first[0].content
+
+
+def test_unreadable_image_is_uploaded_unchanged():
+    preprocessor = ImagePreprocessor()
+    result = process(preprocessor, b"\x89PNG\r\n\x1a\nnot really a png", "broken.png")
+    assert result.content is None
+    assert preprocessor.stats()["errors"] == 1
+
+
+@pytest.mark.skipif(not os.path.exists(CODE_PNG), reason="test_files/code.png not present")
+def test_screenshot_is_smaller_after_preprocessing():
+    with open(CODE_PNG, "rb") as f:
+        data = f.read()
+    result = process(ImagePreprocessor(), data, "code.png")
+    assert max(result.width, result.height) <= 2048
+    assert result.size < len(data)
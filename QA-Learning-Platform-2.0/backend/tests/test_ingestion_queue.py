@@ -0,0 +1,128 @@
+import asyncio
+import os
+import sys
+
+import httpx
+from openai import AsyncOpenAI
+
+# Add backend directory to sys.path to allow importing app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+os.environ.setdefault("OPENAI_API_KEY", "fake")
+os.environ.setdefault("ASSISTANT_ID", "asst_fake")
+
+from fake_openai import Profile, create_app
+from app.services import ingestion_queue as ingestion_queue_module
+from app.services.http_client import http_pool
+from app.services.ingestion_queue import IngestionQueue, COMPLETED, FAILED
+from app.services.openai_service import OpenAIService, openai_service
+from app.services.upload_index import UploadIndex, upload_index
+from app.services.vector_store_batcher import VectorStoreBatcher
+
+
+def run_with_fake(scenario):
+    """Run scenario(service, fake, index) against an in-process fake server"""
+    app = create_app(Profile("test"))
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app))
+    service = OpenAIService()
+    service.client = AsyncOpenAI(api_key="fake", base_url="http://fake/v1", http_client=client, max_retries=0)
+    service.api_base = "http://fake/v1"
+    index = UploadIndex(":memory:")
+
+    openai_service.override(service)
+    upload_index.override(index)
+    http_pool._client = client
+    try:
+        asyncio.run(scenario(service, app.state.fake, index))
+    finally:
+        http_pool._client = None
+        for provider in (openai_service, upload_index):
+            provider.override(None)
+
+
+async def upload(service, index, name: str) -> str:
+    content = f"{name} contents".encode()
+    file_id = await service.upload_file(content, f"{name}.txt")
+    index.record(name, file_id, f"{name}.txt", len(content))
+    return file_id
+
+
+async def vector_store(service) -> str:
+    return (await service.client.vector_stores.create(name="test")).id
+
+
+def test_concurrent_additions_share_one_file_batch():
+    async def scenario(service, fake, index):
+        store = await vector_store(service)
+        file_ids = [await upload(service, index, f"doc{i}") for i in range(5)]
+        batcher = VectorStoreBatcher(window=0.05)
+
+        results = await asyncio.gather(*(batcher.add(f, store) for f in file_ids + file_ids[:1]))
+        assert len(fake.batches) == 1
+        assert {r["batch_id"] for r in results} == set(fake.batches)
+        assert all(r["success"] and r["failed_files"] == 0 for r in results)
+        assert sorted(fake.store_files[store]) == sorted(file_ids)
+        assert batcher.stats()["files"] == 5  # The repeated file is sent once
+
+    run_with_fake(scenario)
+
+
+def test_stores_are_flushed_together_and_failures_stay_with_their_file():
+    async def scenario(service, fake, index):
+        stores = [await vector_store(service) for _ in range(3)]
+        file_id = await upload(service, index, "doc")
+        batcher = VectorStoreBatcher(window=0.05)
+
+        results = await asyncio.gather(
+            *(batcher.add(file_id, store) for store in stores),
+            batcher.add("file-missing", stores[0])
+        )
+        # One file_batches call per store, all submitted by a single window
+        assert len(fake.batches) == 3
+        assert batcher.stats()["flushes"] == 1
+        assert [r["failed_files"] for r in results] == [0, 0, 0, 1]
+        assert results[0]["batch_id"] == results[3]["batch_id"]
+
+    run_with_fake(scenario)
+
+
+def test_full_batch_is_submitted_without_waiting_for_the_window():
+    async def scenario(service, fake, index):
+        store = await vector_store(service)
+        file_ids = [await upload(service, index, f"doc{i}") for i in range(2)]
+        batcher = VectorStoreBatcher(window=60, max_batch_size=2)
+
+        await asyncio.wait_for(asyncio.gather(*(batcher.add(f, store) for f in file_ids)), timeout=5)
+        assert len(fake.batches) == 1
+        assert batcher._timer is None
+
+    run_with_fake(scenario)
+
+
+def test_queue_indexes_uploads_and_skips_indexed_files(monkeypatch):
+    async def scenario(service, fake, index):
+        batcher = VectorStoreBatcher(window=0.05)
+        monkeypatch.setattr(ingestion_queue_module, "vector_store_batcher", batcher)
+        queue = IngestionQueue(concurrency=4, max_attempts=2)
+        store = await vector_store(service)
+        file_ids = [await upload(service, index, f"doc{i}") for i in range(3)]
+        try:
+            jobs = await queue.wait_for(file_ids + ["file-missing"], store, timeout=5)
+            assert [jobs[f].status for f in file_ids] == [COMPLETED] * 3
+            assert index.filter_not_in_vector_store(file_ids, store) == []
+            # A file the batch could not process is not retried
+            missing = jobs["file-missing"]
+            assert (missing.status, missing.attempts) == (FAILED, 1)
+            assert len(fake.batches) == 1
+
+            # Already indexed files complete without another batch
+            assert queue.enqueue(file_ids[0], store) is jobs[file_ids[0]]
+            queue.forget_vector_store(store)
+            assert queue.enqueue(file_ids[0], store).status == COMPLETED
+            assert len(fake.batches) == 1
+            assert queue.stats()["jobs"] == {"queued": 0, "in_progress": 0, "completed": 1, "failed": 0}
+        finally:
+            await queue.close()
+
+    run_with_fake(scenario)
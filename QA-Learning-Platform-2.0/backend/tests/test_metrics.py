@@ -0,0 +1,87 @@
+import logging
+import os
+import sys
+
+import pytest
+
+# Add backend directory to sys.path to allow importing app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.logging_config import JsonFormatter
+from app.services.metrics import Registry
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    latency = registry.histogram("stage_seconds", "Stage latency", ["stage"], buckets=[0.1, 1])
+    latency.observe(0.05, stage="run_wait")
+    latency.observe(0.5, stage="run_wait")
+    latency.observe(5, stage="run_wait")
+
+    lines = registry.render().splitlines()
+    assert "# TYPE stage_seconds histogram" in lines
+    assert 'stage_seconds_bucket{stage="run_wait",le="0.1"} 1' in lines
+    assert 'stage_seconds_bucket{stage="run_wait",le="1"} 2' in lines
+    assert 'stage_seconds_bucket{stage="run_wait",le="+Inf"} 3' in lines
+    assert 'stage_seconds_count{stage="run_wait"} 3' in lines
+    assert 'stage_seconds_sum{stage="run_wait"} 5.55' in lines
+
+
+def test_histogram_timer_observes_on_error():
+    registry = Registry()
+    latency = registry.histogram("op_seconds", "Operation latency", ["outcome"])
+    with pytest.raises(RuntimeError):
+        with latency.time(outcome="error"):
+            raise RuntimeError("boom")
+    assert latency.count(outcome="error") == 1
+
+
+def test_labels_are_validated_and_escaped():
+    registry = Registry()
+    calls = registry.counter("calls_total", "Calls", ["endpoint"])
+    with pytest.raises(ValueError):
+        calls.inc(route="x")
+    calls.inc(endpoint='a"b')
+    assert 'calls_total{endpoint="a\\"b"} 1' in registry.render()
+
+
+def test_function_gauge_is_read_at_scrape_time():
+    registry = Registry()
+    depth = [0]
+    registry.gauge("queue_depth", "Queue depth", function=lambda: depth[0])
+    depth[0] = 7
+    assert "queue_depth 7" in registry.render().splitlines()
+
+
+def test_json_formatter_includes_fields():
+    record = logging.LogRecord("app.chat", logging.WARNING, __file__, 1, "run ended", None, None)
+    record.fields = {"run_id": "run_1", "status": "failed"}
+    line = JsonFormatter().format(record)
+    assert '"msg": "run ended"' in line
+    assert '"run_id": "run_1"' in line
+    assert '"level": "warning"' in line
+
+
+def test_workers_metrics_are_merged_through_snapshots(tmp_path):
+    # Two registries on one directory stand in for two worker processes
+    workers = []
+    for pid in (os.getpid(), os.getppid()):
+        registry = Registry(str(tmp_path), worker=str(pid))
+        calls = registry.counter("calls_total", "Calls", ["endpoint"])
+        latency = registry.histogram("op_seconds", "Operation latency", buckets=[1])
+        registry.gauge("in_flight", "In flight", function=lambda: 2)
+        calls.inc(endpoint="chat")
+        latency.observe(0.5)
+        workers.append(registry)
+    workers[1].write_snapshot()
+    # A worker that has exited still counts towards the totals
+    with open(tmp_path / "999999999.json", "w") as f:
+        f.write('{"calls_total": [[["chat"], 3]], "in_flight": [[[], 5]]}')
+
+    lines = workers[0].render().splitlines()
+    assert 'calls_total{endpoint="chat"} 5' in lines
+    assert 'op_seconds_bucket{le="1"} 2' in lines
+    assert 'op_seconds_count 2' in lines
+    assert sorted(line for line in lines if line.startswith("in_flight")) == sorted(
+        f'in_flight{{worker="{pid}"}} 2' for pid in (os.getpid(), os.getppid())
+    )
@@ -0,0 +1,85 @@
+import os
+import subprocess
+import sys
+
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+# Add backend directory to sys.path to allow importing app
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+from app.services.provider import Provider
+
+
+class Counter:
+    built = 0
+
+    def __init__(self):
+        Counter.built += 1
+        self.value = 0
+
+    def increment(self) -> int:
+        self.value += 1
+        return self.value
+
+
+def test_instance_is_built_once_on_first_use():
+    Counter.built = 0
+    counter = Provider("counter", Counter)
+    assert not counter.is_built()
+    assert Counter.built == 0
+
+    assert counter.increment() == 1
+    assert counter.increment() == 2
+    assert counter.resolve() is counter.resolve()
+    assert Counter.built == 1
+
+
+def test_attribute_writes_reach_the_instance():
+    counter = Provider("counter", Counter)
+    counter.value = 41
+    assert counter.resolve().value == 41
+    assert counter.increment() == 42
+
+
+def test_override_is_seen_by_every_holder():
+    counter = Provider("counter", Counter)
+    holder = {"service": counter}
+    replacement = Counter()
+    replacement.value = 100
+
+    counter.override(replacement)
+    assert holder["service"].increment() == 101
+
+    counter.override(None)
+    assert holder["service"].increment() == 1
+
+
+def test_provider_is_a_fastapi_dependency():
+    counter = Provider("counter", Counter)
+    app = FastAPI()
+
+    @app.get("/count")
+    def count(service: Counter = Depends(counter)):
+        return {"value": service.increment()}
+
+    with TestClient(app) as client:
+        assert client.get("/count").json() == {"value": 1}
+        assert client.get("/count").json() == {"value": 2}
+
+
+def test_app_imports_without_credentials_or_side_effects(tmp_path):
+    env = {k: v for k, v in os.environ.items() if k not in ("OPENAI_API_KEY", "ASSISTANT_ID")}
+    env["SEARCH_INDEX_PATH"] = str(tmp_path / "search.db")
+    env["UPLOAD_INDEX_PATH"] = str(tmp_path / "upload.db")
+    env["SESSION_DB_PATH"] = str(tmp_path / "sessions.db")
+    snippet = (
+        "import sys, app.main; "
+        "from app.services.openai_service import openai_service; "
+        "print(openai_service.is_built(), 'openai' in sys.modules)"
+    )
+    result = subprocess.run([sys.executable, "-c", snippet], cwd=BACKEND_DIR, env=env,
+                            capture_output=True, text=True, check=True)
+    assert result.stdout.split() == ["False", "False"]
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,105 @@
+import asyncio
+import os
+import sys
+
+import httpx
+import pytest
+
+# Add backend directory to sys.path to allow importing app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.resilience import CircuitOpen, Resilience, UpstreamStatusError, RETRYABLE_STATUS
+
+
+def fault_injecting_client(statuses):
+    """httpx client whose server answers with the given statuses, then 200"""
+    remaining = list(statuses)
+
+    def handler(request):
+        status = remaining.pop(0) if remaining else 200
+        return httpx.Response(status, json={"status": status})
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+async def get(client):
+    response = await client.get("https://api.test/v1/runs/run_1")
+    if response.status_code in RETRYABLE_STATUS:
+        raise UpstreamStatusError(response)
+    return response
+
+
+@pytest.mark.asyncio
+async def test_retries_transient_statuses():
+    policy = Resilience("test", max_attempts=3, base_delay=0.001, failure_threshold=10)
+    async with fault_injecting_client([503, 502]) as client:
+        response = await policy.call(lambda: get(client))
+    assert response.status_code == 200
+    assert policy.stats()["retries"] == 2
+    assert policy.breaker.state == "closed"
+
+
+@pytest.mark.asyncio
+async def test_non_idempotent_and_client_errors_are_not_retried():
+    policy = Resilience("test", max_attempts=3, base_delay=0.001, failure_threshold=10)
+    async with fault_injecting_client([503]) as client:
+        with pytest.raises(UpstreamStatusError):
+            await policy.call(lambda: get(client), idempotent=False)
+    async with fault_injecting_client([404]) as client:
+        assert (await policy.call(lambda: get(client))).status_code == 404
+    assert policy.stats()["retries"] == 0
+
+
+@pytest.mark.asyncio
+async def test_breaker_opens_fails_fast_and_recovers():
+    policy = Resilience("test", max_attempts=1, failure_threshold=2, reset_timeout=0.05)
+    async with fault_injecting_client([500, 500, 500]) as client:
+        for _ in range(2):
+            with pytest.raises(UpstreamStatusError):
+                await policy.call(lambda: get(client))
+        assert policy.breaker.state == "open"
+        with pytest.raises(CircuitOpen):
+            await policy.call(lambda: get(client))
+
+        # After the reset timeout one probe goes through; it fails and reopens
+        await asyncio.sleep(0.06)
+        with pytest.raises(UpstreamStatusError):
+            await policy.call(lambda: get(client))
+        assert policy.breaker.state == "open"
+
+        await asyncio.sleep(0.06)
+        assert (await policy.call(lambda: get(client))).status_code == 200
+    assert policy.breaker.state == "closed"
+    assert policy.stats()["breaker"]["short_circuited"] == 1
+
+
+@pytest.mark.asyncio
+async def test_hedged_request_wins_over_slow_one():
+    policy = Resilience("test", hedge_after=0.01)
+    delays = [1.0, 0.0]
+
+    async def poll():
+        await asyncio.sleep(delays.pop(0))
+        return "done"
+
+    assert await asyncio.wait_for(policy.call(poll, hedge=True), timeout=0.5) == "done"
+    assert (policy.hedges, policy.hedge_wins) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_cancelling_a_hedged_call_cancels_its_attempt():
+    policy = Resilience("test", hedge_after=10)
+    started, cancelled = asyncio.Event(), asyncio.Event()
+
+    async def poll():
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    call = asyncio.create_task(policy.call(poll, hedge=True))
+    await started.wait()
+    call.cancel()
+    await asyncio.wait_for(cancelled.wait(), timeout=1)
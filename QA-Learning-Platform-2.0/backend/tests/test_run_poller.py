@@ -0,0 +1,77 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+# Add backend directory to sys.path to allow importing app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.run_poller import RunPoller
+
+
+def make_check(pending_polls, result="completed"):
+    """Return a check that stays pending for `pending_polls` calls"""
+    calls = {"n": 0}
+
+    async def check():
+        calls["n"] += 1
+        if calls["n"] > pending_polls:
+            return result
+        return None
+
+    return check, calls
+
+
+def test_resolves_after_backoff_and_counts_polls():
+    async def scenario():
+        poller = RunPoller(initial_interval=0.01, backoff_factor=2.0, max_interval=0.05, jitter=0.0)
+        check, calls = make_check(pending_polls=3)
+        result = await poller.wait("run:1", check, timeout=5)
+        return poller, result, calls
+
+    poller, result, calls = asyncio.run(scenario())
+    assert result == "completed"
+    assert calls["n"] == 4
+    stats = poller.stats()
+    assert stats["completed"] == 1
+    assert stats["total_polls"] == 4
+    assert stats["polls_per_completion"] == {4: 1}
+    assert stats["pending"] == 0
+
+
+def test_multiplexes_many_items_and_dedupes_keys():
+    async def scenario():
+        poller = RunPoller(initial_interval=0.01, max_interval=0.02)
+        checks = [make_check(pending_polls=i % 3) for i in range(20)]
+        futures = [poller.watch(f"run:{i}", c, timeout=5) for i, (c, _) in enumerate(checks)]
+        # Watching an already-tracked key shares the same future
+        assert poller.watch("run:0", checks[0][0], timeout=5) is futures[0]
+        return await asyncio.gather(*futures), poller
+
+    results, poller = asyncio.run(scenario())
+    assert results == ["completed"] * 20
+    assert poller.stats()["completed"] == 20
+
+
+def test_timeout_returns_timeout_result():
+    async def scenario():
+        poller = RunPoller(initial_interval=0.01, max_interval=0.01)
+        check, _ = make_check(pending_polls=10_000)
+        return await poller.wait("run:slow", check, timeout=0.05, timeout_result=False), poller
+
+    result, poller = asyncio.run(scenario())
+    assert result is False
+    assert poller.stats()["timed_out"] == 1
+
+
+def test_check_exception_propagates():
+    async def check():
+        raise RuntimeError("boom")
+
+    async def scenario():
+        poller = RunPoller(initial_interval=0.01)
+        await poller.wait("run:err", check, timeout=1)
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(scenario())
@@ -0,0 +1,86 @@
+import os
+import sys
+
+import pytest
+
+# Add backend directory to sys.path to allow importing app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.search_index import SearchIndex, decode_postings, encode_postings, extract_text, is_indexable
+
+
+def test_postings_round_trip_and_append():
+    data = encode_postings([(3, 1), (200, 4)])
+    data += encode_postings([(100000, 2)], last_id=200)
+    assert list(decode_postings(data)) == [(3, 1), (200, 4), (100000, 2)]
+
+
+def test_ranks_thai_and_english_passages(tmp_path):
+    index = SearchIndex(path=str(tmp_path / "search.db"))
+    index.add_file("file-a", "notes.md", "# Filters\n\nSharpen filter เน้นขอบของภาพ\n\nSmoothing filter ลดสัญญาณรบกวน")
+    index.add_file("file-b", "other.txt", "Fourier transform แปลงภาพไปยังโดเมนความถี่")
+
+    assert index.search("ขอบภาพ", limit=1)[0]["file_id"] == "file-a"
+    assert index.search("fourier", limit=1)[0]["file_id"] == "file-b"
+    assert index.search("fourier", file_ids=["file-a"]) == []
+    # Already indexed files are skipped
+    assert index.add_file("file-b", "other.txt", "anything") == 0
+    index.close()
+
+
+def test_persists_and_removes(tmp_path):
+    path = str(tmp_path / "search.db")
+    index = SearchIndex(path=path)
+    index.add_file("file-a", "a.txt", "Lily the Brilliant is a QA engineer")
+    index.close()
+
+    reopened = SearchIndex(path=path)
+    assert reopened.search("engineer")[0]["filename"] == "a.txt"
+    reopened.remove_file("file-a")
+    assert reopened.search("engineer") == []
+    reopened.add_file("file-c", "c.txt", "Another engineer")
+    assert [r["file_id"] for r in reopened.search("engineer")] == ["file-c"]
+    reopened.close()
+
+
+def test_extracts_html_and_json_text():
+    assert "Innovation" in extract_text(b"<html><p>Department: Innovation</p></html>", "a.html")
+    assert "<p>" not in extract_text(b"<p>x</p>", "a.html")
+    assert extract_text(b'{"role": "QA Engineer"}', "a.json") == "role: QA Engineer"
+    assert extract_text(b"\x89PNG", "a.png") is None
+
+
+def test_files_over_the_size_cap_are_not_accepted():
+    index = SearchIndex(path=":memory:", max_bytes=1000)
+    assert index.accepts(1000)
+    assert not index.accepts(1001)
+    assert index.stats()["skipped_too_large"] == 1
+
+
+def minimal_pdf(text: str) -> bytes:
+    """One-page PDF whose text layer is text"""
+    stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode()
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R "
+        b"/Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    body = b"%PDF-1.4\n"
+    offsets = []
+    for number, obj in enumerate(objects, 1):
+        offsets.append(len(body))
+        body += b"%d 0 obj\n" % number + obj + b"\nendobj\n"
+    xref = len(body)
+    body += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    body += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    body += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return body
+
+
+def test_extracts_pdf_text_layer():
+    pytest.importorskip("pypdf")
+    assert is_indexable("lecture.PDF")
+    assert "Fourier transform" in extract_text(minimal_pdf("Fourier transform of an image"), "lecture.pdf")
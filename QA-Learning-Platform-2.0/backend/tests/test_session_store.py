@@ -0,0 +1,128 @@
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime
+
+# Add backend directory to sys.path to allow importing app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models.chat import ChatSession, Citation, Message
+from app.services.session_store import SQLiteSessionStore
+
+
+def new_session(session_id):
+    now = datetime.now()
+    return ChatSession(id=session_id, thread_id=f"thread_{session_id}", messages=[], created_at=now, updated_at=now)
+
+
+def test_sessions_survive_reopen(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    store = SQLiteSessionStore(path=path, batch_size=100, flush_interval=60)
+    store.create(new_session("s1"))
+    store.append_message("s1", Message(role="user", content="สวัสดี", timestamp=datetime.now()))
+    store.append_message("s1", Message(role="assistant", content="hello"))
+    store.close()
+
+    reopened = SQLiteSessionStore(path=path)
+    session = reopened.get("s1")
+    assert session.thread_id == "thread_s1"
+    assert [(m.role, m.content) for m in session.messages] == [("user", "สวัสดี"), ("assistant", "hello")]
+    reopened.close()
+
+
+def test_citations_survive_reopen(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    store = SQLiteSessionStore(path=path)
+    store.create(new_session("s1"))
+    citation = Citation(file_id="file-a", filename="a.pdf", start_index=5, end_index=17, marker="【4:0†a.pdf】")
+    store.append_message("s1", Message(role="assistant", content="Blur 【4:0†a.pdf】", citations=[citation]))
+    store.close()
+
+    reopened = SQLiteSessionStore(path=path)
+    assert reopened.get("s1").messages[0].citations == [citation]
+    reopened.close()
+
+
+def test_lru_evicts_and_reloads_with_buffered_messages(tmp_path):
+    store = SQLiteSessionStore(path=str(tmp_path / "sessions.db"), cache_size=2, batch_size=100, flush_interval=60)
+    for session_id in ["a", "b", "c"]:
+        store.create(new_session(session_id))
+    assert list(store._cache) == ["b", "c"]
+
+    # Appending to a cold session does not load it, but the message is not lost
+    assert store.append_message("a", Message(role="user", content="late"))
+    assert "a" not in store._cache
+    assert [m.content for m in store.get("a").messages] == ["late"]
+
+    assert store.append_message("missing", Message(role="user", content="x")) is False
+    store.close()
+
+
+def test_delete_removes_session_and_pending_messages(tmp_path):
+    store = SQLiteSessionStore(path=str(tmp_path / "sessions.db"), batch_size=100, flush_interval=60)
+    store.create(new_session("s1"))
+    store.append_message("s1", Message(role="user", content="bye"))
+    assert store.delete("s1").id == "s1"
+    assert store.get("s1") is None
+    assert store.all_sessions() == {}
+    store.close()
+
+
+def test_shared_stores_see_each_others_writes(tmp_path):
+    # Two stores on one file stand in for two worker processes
+    path = str(tmp_path / "sessions.db")
+    worker_a = SQLiteSessionStore(path=path, shared=True)
+    worker_b = SQLiteSessionStore(path=path, shared=True)
+    worker_a.create(new_session("s1"))
+    assert worker_b.get("s1").messages == []
+
+    worker_a.append_message("s1", Message(role="user", content="from a"))
+    assert [m.content for m in worker_b.get("s1").messages] == ["from a"]
+    worker_a.close()
+    worker_b.close()
+
+
+def test_initial_cursor_only_fills_an_unset_cursor(tmp_path):
+    store = SQLiteSessionStore(path=str(tmp_path / "sessions.db"))
+    store.create(new_session("s1"))
+    assert store.set_thread_cursor("s1", "msg_1", only_if_unset=True)
+    assert not store.set_thread_cursor("s1", "msg_0", only_if_unset=True)
+    assert store.set_thread_cursor("s1", "msg_2")
+    assert store.get("s1").thread_cursor == "msg_2"
+    store.close()
+
+
+def test_buffered_messages_are_written_once_flush_interval_passes(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    store = SQLiteSessionStore(path=path, batch_size=32, flush_interval=0.05)
+    store.create(new_session("s1"))
+    store.append_message("s1", Message(role="user", content="last words"))
+    time.sleep(0.3)
+
+    # Read back through a fresh connection, as after a crash of this process
+    rows = sqlite3.connect(path).execute("SELECT content FROM messages WHERE session_id = 's1'").fetchall()
+    assert rows == [("last words",)]
+    store.close()
+
+
+def test_thread_seed_is_taken_once_and_cleared_by_attaching_a_thread(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    worker_a = SQLiteSessionStore(path=path, shared=True)
+    worker_b = SQLiteSessionStore(path=path, shared=True)
+    now = datetime.now()
+    seed = [{"role": "user", "content": "q"}, {"role": "assistant", "content": "a"}]
+    worker_a.create(ChatSession(id="s1", thread_seed=seed, created_at=now, updated_at=now))
+    assert worker_b.get("s1").thread_id is None
+    assert worker_b.get("s1").thread_seed == seed
+
+    assert worker_a.attach_thread("s1", "thread_1")
+    assert not worker_b.attach_thread("s1", "thread_2")
+    session = worker_b.get("s1")
+    assert (session.thread_id, session.thread_seed) == ("thread_1", None)
+
+    worker_a.set_thread_seed("s1", seed)
+    assert worker_b.take_thread_seed("s1") == seed
+    assert worker_a.take_thread_seed("s1") is None
+    worker_a.close()
+    worker_b.close()
@@ -0,0 +1,90 @@
+import asyncio
+import os
+import sys
+from datetime import datetime
+
+import httpx
+from openai import AsyncOpenAI
+
+# Add backend directory to sys.path to allow importing app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+os.environ.setdefault("OPENAI_API_KEY", "fake")
+os.environ.setdefault("ASSISTANT_ID", "asst_fake")
+
+from fake_openai import Profile, create_app
+from app.models.chat import Message
+from app.services.openai_service import OpenAIService, openai_service
+from app.services.session_service import SessionService
+from app.services.session_store import MemorySessionStore
+
+
+def run_with_fake(scenario):
+    """Run scenario(service, sessions) with a session service backed by the fake API"""
+    service = OpenAIService()
+    service.client = AsyncOpenAI(
+        api_key="fake",
+        base_url="http://fake/v1",
+        http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=create_app(Profile("test")))),
+        max_retries=0
+    )
+    openai_service.override(service)
+    try:
+        asyncio.run(scenario(service, SessionService(store=MemorySessionStore())))
+    finally:
+        openai_service.override(None)
+
+
+def record(sessions, session_id, role, content):
+    sessions.add_message_to_session(session_id, Message(role=role, content=content, timestamp=datetime.now()))
+
+
+def test_sync_after_the_cursor_appends_only_newer_messages():
+    async def scenario(service, sessions):
+        thread_id = await service.create_thread()
+        session = await sessions.create_session(thread_id=thread_id)
+        message_id = await service.send_message(thread_id, "question")
+        record(sessions, session.id, "user", "question")
+        sessions.set_thread_cursor(session.id, message_id)
+        await service.send_message(thread_id, "answer from another client", role="assistant")
+
+        assert await sessions.sync_from_thread(session.id) == 1
+        assert [m.content for m in sessions.get_session(session.id).messages] == ["question", "answer from another client"]
+        assert await sessions.sync_from_thread(session.id) == 0
+
+    run_with_fake(scenario)
+
+
+def test_sync_without_a_cursor_skips_messages_already_recorded():
+    async def scenario(service, sessions):
+        # e.g. a thread created with the first message whose run then failed
+        thread_id = await service.create_thread(initial_messages=[{"role": "user", "content": "question"}])
+        session = await sessions.create_session(thread_id=thread_id)
+        record(sessions, session.id, "user", "question")
+        await service.send_message(thread_id, "question", role="user")
+
+        # The repeated question is a new message; the first one is already recorded
+        assert await sessions.sync_from_thread(session.id) == 1
+        assert [m.content for m in sessions.get_session(session.id).messages] == ["question", "question"]
+        assert sessions.get_session(session.id).thread_cursor is not None
+        assert await sessions.sync_from_thread(session.id) == 0
+        assert len(sessions.get_session(session.id).messages) == 2
+
+    run_with_fake(scenario)
+
+
+def test_initial_message_cursor_does_not_overwrite_a_later_one():
+    async def scenario(service, sessions):
+        thread_id = await service.create_thread(initial_messages=[{"role": "user", "content": "question"}])
+        session = await sessions.create_session(thread_id=thread_id)
+        assert await sessions.record_initial_messages(session.id, thread_id, 1)
+        first = sessions.get_session(session.id).thread_cursor
+        assert first == (await service.get_thread_messages(thread_id))[0]["id"]
+
+        answer_id = await service.send_message(thread_id, "answer", role="assistant")
+        sessions.set_thread_cursor(session.id, answer_id)
+        assert not await sessions.record_initial_messages(session.id, thread_id, 1)
+        assert sessions.get_session(session.id).thread_cursor == answer_id
+
+    run_with_fake(scenario)
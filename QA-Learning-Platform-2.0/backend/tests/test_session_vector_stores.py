@@ -0,0 +1,167 @@
+import asyncio
+import os
+import sys
+
+import httpx
+from openai import AsyncOpenAI
+
+# Add backend directory to sys.path to allow importing app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+os.environ.setdefault("OPENAI_API_KEY", "fake")
+os.environ.setdefault("ASSISTANT_ID", "asst_fake")
+os.environ.setdefault("VECTOR_STORE_BATCH_WINDOW", "0.01")
+
+from fake_openai import Profile, create_app
+from app.services.http_client import http_pool
+from app.services.ingestion_queue import ingestion_queue, COMPLETED
+from app.services.openai_service import OpenAIService, openai_service
+from app.services.search_index import SearchIndex, search_index
+from app.services.session_vector_stores import SessionVectorStores
+from app.services.upload_index import UploadIndex, upload_index
+
+
+def run_with_fake(scenario):
+    """
+    Run scenario(service, fake, index) with the app's OpenAI service, REST
+    pool and indexes pointed at one in-process fake server
+    """
+    app = create_app(Profile("test", run_seconds=0.01))
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app))
+    service = OpenAIService()
+    service.client = AsyncOpenAI(api_key="fake", base_url="http://fake/v1", http_client=client, max_retries=0)
+    service.api_base = "http://fake/v1"
+    index = UploadIndex(":memory:")
+
+    openai_service.override(service)
+    upload_index.override(index)
+    search_index.override(SearchIndex(":memory:"))
+    http_pool._client = client
+
+    async def main():
+        try:
+            await scenario(service, app.state.fake, index)
+        finally:
+            await ingestion_queue.close()
+
+    try:
+        asyncio.run(main())
+    finally:
+        http_pool._client = None
+        for provider in (openai_service, upload_index, search_index):
+            provider.override(None)
+
+
+async def upload(service, index, content: bytes, filename: str, kind: str = "file") -> str:
+    file_id = await service.upload_file(content, filename)
+    index.record(filename, file_id, filename, len(content), kind=kind)
+    return file_id
+
+
+async def cited_file(service, thread_id: str) -> str:
+    run_id = await service.create_and_run(thread_id)
+    assert await service.wait_for_run_completion(thread_id, run_id, timeout=10)
+    [citation] = (await service.get_run_response(thread_id, run_id))["citations"]
+    return citation["file_id"]
+
+
+def test_attachments_stay_in_their_session_and_are_reaped_with_it():
+    async def scenario(service, fake, index):
+        stores = SessionVectorStores(ttl=3600, reap_interval=0)
+        thread_a = await service.create_thread(initial_messages=[{"role": "user", "content": "a"}])
+        thread_b = await service.create_thread(initial_messages=[{"role": "user", "content": "b"}])
+        file_a = await upload(service, index, b"notes a", "a.txt")
+        file_b = await upload(service, index, b"notes b", "b.txt")
+
+        # Concurrent first attachments in one session share one store
+        store_a, again, _ = await asyncio.gather(*(stores.for_thread(thread_a) for _ in range(3)))
+        assert store_a == again
+        store_b = await stores.for_thread(thread_b)
+        assert len(fake.vector_stores) == 2
+        assert fake.thread_stores[thread_a] == [store_a]
+        assert fake.vector_stores[store_a]["expires_after"] == {"anchor": "last_active_at", "days": 2}
+
+        for file_id, store in [(file_a, store_a), (file_b, store_b)]:
+            jobs = await ingestion_queue.wait_for([file_id], store, timeout=10)
+            assert jobs[file_id].status == COMPLETED
+        assert fake.store_files[store_a] == [file_a]
+
+        # The shared store is never written to, and answers only cite the session's own files
+        assert index.vector_store_file_count(service.vector_store_id) == 0
+        assert service.vector_store_id not in fake.store_files
+        assert await cited_file(service, thread_a) == file_a
+        assert await cited_file(service, thread_b) == file_b
+
+        assert (await stores.reap())["stores"] == 0
+        index._conn.execute("UPDATE session_vector_stores SET last_active_at = 0 WHERE thread_id = ?", (thread_a,))
+        result = await stores.reap()
+
+        assert (result["stores"], result["files"]) == (1, 1)
+        assert store_a not in fake.vector_stores and file_a not in fake.files
+        assert fake.thread_stores[thread_a] == []
+        assert index.lookup("a.txt") is None
+        assert store_b in fake.vector_stores and file_b in fake.files
+        # The next attachment in the reopened session gets a fresh store
+        assert await stores.for_thread(thread_a) not in (store_a, store_b)
+
+    run_with_fake(scenario)
+
+
+def test_shared_files_outlive_all_but_their_last_store():
+    async def scenario(service, fake, index):
+        stores = SessionVectorStores(ttl=3600, reap_interval=0)
+        threads = [await service.create_thread() for _ in range(2)]
+        shared = await upload(service, index, b"syllabus", "syllabus.pdf")
+        for thread_id in threads:
+            store = await stores.for_thread(thread_id)
+            await ingestion_queue.wait_for([shared], store, timeout=10)
+
+        assert await stores.release(threads[0])
+        assert shared in fake.files
+        assert await stores.release(threads[1])
+        assert shared not in fake.files
+        assert not fake.vector_stores
+        assert await stores.release(threads[1]) is False
+        assert stores.stats()["released"] == 2
+
+    run_with_fake(scenario)
+
+
+def test_old_uploads_never_sent_in_a_chat_are_deleted_but_images_kept():
+    async def scenario(service, fake, index):
+        stores = SessionVectorStores(ttl=3600, reap_interval=0)
+        abandoned = await upload(service, index, b"draft", "draft.txt")
+        image = await upload(service, index, b"\x89PNG", "photo.png", kind="image")
+        recent = await upload(service, index, b"fresh", "fresh.txt")
+        index._conn.execute("UPDATE uploads SET created_at = 0 WHERE file_id IN (?, ?)", (abandoned, image))
+
+        assert (await stores.reap())["files"] == 1
+        assert abandoned not in fake.files
+        assert image in fake.files and recent in fake.files
+
+    run_with_fake(scenario)
+
+
+def test_files_reused_by_a_dedup_hit_are_not_reaped():
+    async def scenario(service, fake, index):
+        stores = SessionVectorStores(ttl=3600, reap_interval=0)
+        thread_id = await service.create_thread()
+        reused = await upload(service, index, b"handout", "handout.pdf")
+        store = await stores.for_thread(thread_id)
+        await ingestion_queue.wait_for([reused], store, timeout=10)
+        index._conn.execute("UPDATE uploads SET created_at = 0")
+
+        # Another session uploads the same content and gets the existing file
+        assert index.lookup("handout.pdf")["file_id"] == reused
+        assert await stores.release(thread_id)
+        assert (await stores.reap())["files"] == 0
+        assert reused in fake.files
+
+        # Once unused for the ttl it is collected, and lookups then miss
+        index._conn.execute("UPDATE uploads SET last_used_at = 0")
+        assert (await stores.reap())["files"] == 1
+        assert reused not in fake.files
+        assert index.lookup("handout.pdf") is None
+
+    run_with_fake(scenario)
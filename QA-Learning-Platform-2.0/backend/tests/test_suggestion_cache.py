@@ -0,0 +1,42 @@
+import asyncio
+import os
+import sys
+
+# Add backend directory to sys.path to allow importing app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.suggestion_cache import SuggestionCache
+
+
+def test_failed_loads_are_not_retried_until_the_failure_ttl_passes():
+    async def main():
+        cache = SuggestionCache(ttl=0, failure_ttl=60)
+        calls = []
+
+        async def failing():
+            calls.append(1)
+            raise RuntimeError("assistant unavailable")
+
+        # Concurrent visitors during an outage cost one load between them
+        results = await asyncio.gather(*(cache.get("key", failing) for _ in range(5)))
+        assert results == [None] * 5
+        assert await cache.get("key", failing) is None
+        assert len(calls) == 1
+        assert (cache.stats()["failures"], cache.stats()["negative_hits"]) == (1, 1)
+
+        # Once the failure expires the next visitor loads again
+        cache.failure_ttl = 0
+
+        async def loader():
+            return ["question"]
+
+        assert await cache.get("key", loader) == ["question"]
+
+        # A failed refresh keeps serving the stale entry without reloading on every hit
+        cache.failure_ttl = 60
+        assert await cache.get("key", failing) == ["question"]
+        await asyncio.sleep(0)
+        assert await cache.get("key", failing) == ["question"]
+        assert len(calls) == 2
+
+    asyncio.run(main())
@@ -0,0 +1,104 @@
+import asyncio
+import os
+import sys
+
+import httpx
+from openai import AsyncOpenAI
+
+# Add backend directory to sys.path to allow importing app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+os.environ.setdefault("OPENAI_API_KEY", "fake")
+os.environ.setdefault("ASSISTANT_ID", "asst_fake")
+
+from fake_openai import Profile, create_app
+from app.models.chat import SendMessageRequest
+from app.routers import chat
+from app.services import session_service as session_service_module
+from app.services.openai_service import OpenAIService, openai_service
+from app.services.session_service import SessionService, session_service
+from app.services.session_store import MemorySessionStore
+from app.services.thread_pool import ThreadPool
+
+
+def run_with_fake(scenario):
+    """Run scenario(fake) with the app's OpenAI service pointed at an in-process fake"""
+    app = create_app(Profile("test"))
+    service = OpenAIService()
+    service.client = AsyncOpenAI(
+        api_key="fake",
+        base_url="http://fake/v1",
+        http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=app)),
+        max_retries=0
+    )
+    openai_service.override(service)
+    try:
+        asyncio.run(scenario(app.state.fake))
+    finally:
+        openai_service.override(None)
+
+
+async def filled(pool: ThreadPool):
+    for _ in range(100):
+        if len(pool._idle) >= pool.size:
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("pool was not refilled")
+
+
+def test_acquire_hands_out_pooled_threads_and_refills():
+    async def scenario(fake):
+        pool = ThreadPool(size=2, reap_interval=60)
+        assert pool.acquire() is None  # Empty before the first fill
+        pool.start()
+        await filled(pool)
+
+        thread_id = pool.acquire()
+        assert thread_id in fake.threads
+        await filled(pool)
+        assert thread_id not in [t for t, _ in pool._idle]
+        stats = pool.stats()
+        assert (stats["hits"], stats["misses"], stats["created"]) == (1, 1, 3)
+
+        # Unused threads are deleted on shutdown; the handed-out one is kept
+        await pool.close()
+        assert set(fake.threads) == {thread_id}
+        assert pool.stats()["reaped"] == 2
+
+    run_with_fake(scenario)
+
+
+def test_reaper_replaces_threads_idle_for_too_long():
+    async def scenario(fake):
+        pool = ThreadPool(size=2, max_idle=0, reap_interval=60)
+        pool.start()
+        await filled(pool)
+        old = {t for t, _ in pool._idle}
+
+        await pool._reap()
+        await filled(pool)
+        assert not old & set(fake.threads)
+        assert not old & {t for t, _ in pool._idle}
+        assert pool.stats()["reaped"] == 2
+        await pool.close()
+
+    run_with_fake(scenario)
+
+
+def test_chat_without_a_pooled_thread_counts_one_miss(monkeypatch):
+    async def scenario(fake):
+        pool = ThreadPool(size=2, reap_interval=60)
+        pool.lazy_create = False
+        monkeypatch.setattr(chat, "thread_pool", pool)
+        monkeypatch.setattr(session_service_module, "thread_pool", pool)
+        session_service.override(SessionService(store=MemorySessionStore()))
+        try:
+            _, session, message_posted = await chat._resolve_session(SendMessageRequest(message="hi"), None)
+        finally:
+            session_service.override(None)
+        assert session.thread_id in fake.threads and not message_posted
+        assert (pool.hits, pool.misses) == (0, 1)
+        await pool.close()
+
+    run_with_fake(scenario)
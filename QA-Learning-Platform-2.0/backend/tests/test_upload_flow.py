@@ -34,7 +34,7 @@ def session_id():
 @pytest.mark.parametrize("filename, question, expected_keywords", [
     ("test_doc.txt", "What is Lily's employee ID?", ["998877"]),
     ("test_data.json", "What are Lily's skills?", ["Testing", "Python", "RAG"]),
-    pytest.param("test_sheet.csv", "What is John Doe's role?", ["Developer"], marks=pytest.mark.skip(reason="CSV not supported for file_search")),
+    ("test_sheet.csv", "What is John Doe's role?", ["Developer"]),
     ("test_web.html", "What is the title of the page?", ["Employee Profile"]),
     pytest.param("code.png", "Describe the code in this image.", ["code", "python"], marks=pytest.mark.skip(reason="PNG not supported for file_search")), 
     ("A Spy'S Guide To Thinking PDF.pdf", "What is the title of this document?", ["spy", "guide", "thinking"]),
@@ -1,14 +1,11 @@
 import React, { useState, useEffect } from 'react';
 import { Button } from './Button';
 
-interface ChatSession {
+interface ChatSessionSummary {
   id: string;
-  thread_id: string;
-  messages: Array<{
-    role: string;
-    content: string;
-    timestamp: string;
-  }>;
+  thread_id: string | null;
+  title: string | null;
+  message_count: number;
   created_at: string;
   updated_at: string;
 }
@@ -28,8 +25,10 @@ export const ChatHistorySidebar: React.FC<ChatHistorySidebarProps> = ({
   onSelectSession,
   isDarkMode
 }) => {
-  const [sessions, setSessions] = useState<ChatSession[]>([]);
+  const [sessions, setSessions] = useState<ChatSessionSummary[]>([]);
   const [loading, setLoading] = useState(false);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     if (isOpen) {
@@ -44,6 +43,7 @@ export const ChatHistorySidebar: React.FC<ChatHistorySidebarProps> = ({
       if (response.ok) {
         const data = await response.json();
         setSessions(data.sessions || []);
+        setNextCursor(data.next_cursor || null);
       }
     } catch (error) {
       console.error('Failed to fetch chat history:', error);
@@ -51,14 +51,29 @@ export const ChatHistorySidebar: React.FC<ChatHistorySidebarProps> = ({
     setLoading(false);
   };
 
+  const fetchMoreChatHistory = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const response = await fetch(`${process.env.REACT_APP_API_URL}/sessions?cursor=${encodeURIComponent(nextCursor)}`);
+      if (response.ok) {
+        const data = await response.json();
+        setSessions(prev => [...prev, ...(data.sessions || [])]);
+        setNextCursor(data.next_cursor || null);
+      }
+    } catch (error) {
+      console.error('Failed to fetch chat history:', error);
+    }
+    setLoadingMore(false);
+  };
+
   const formatDate = (dateString: string) => {
     const date = new Date(dateString);
     return date.toLocaleDateString() + ' ' + date.toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' });
   };
 
-  const getSessionPreview = (session: ChatSession) => {
-    const userMessages = session.messages.filter(msg => msg.role === 'user');
-    return userMessages.length > 0 ? userMessages[0].content.slice(0, 50) + (userMessages[0].content.length > 50 ? '...' : '') : 'New Chat';
+  const getSessionPreview = (session: ChatSessionSummary) => {
+    return session.title ? session.title.slice(0, 50) + (session.title.length > 50 ? '...' : '') : 'New Chat';
   };
 
   if (!isOpen) return null;
@@ -131,12 +146,23 @@ export const ChatHistorySidebar: React.FC<ChatHistorySidebarProps> = ({
                         {formatDate(session.updated_at)}
                       </p>
                       <p className="text-xs text-[#6B6662] dark:text-[#A8A29E] mt-1">
-                        {session.messages.length} messages
+                        {session.message_count} messages
                       </p>
                     </div>
                   </div>
                 </button>
               ))}
+              {nextCursor && (
+                <Button
+                  variant="ghost"
+                  size="sm"
+                  onClick={fetchMoreChatHistory}
+                  disabled={loadingMore}
+                  className="w-full text-[#6B6662] hover:text-[#D4A574] dark:text-[#A8A29E] dark:hover:text-[#D4A574] transition-colors"
+                >
+                  {loadingMore ? 'Loading...' : 'Load more'}
+                </Button>
+              )}
             </div>
           )}
         </div>
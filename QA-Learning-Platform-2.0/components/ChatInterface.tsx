@@ -118,18 +118,23 @@ export const ChatInterface: React.FC<ChatInterfaceProps> = ({ user, onLogout, is
 
   const handleSelectSession = async (sessionId: string) => {
     try {
-      // Load messages from selected session
-      const response = await fetch(`${process.env.REACT_APP_API_URL}/sessions/${sessionId}/messages`);
-      if (response.ok) {
+      // Load messages from selected session, following next_cursor through every page
+      const loadedMessages: Message[] = [];
+      let cursor: string | null = null;
+      do {
+        const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
+        const response = await fetch(`${process.env.REACT_APP_API_URL}/sessions/${sessionId}/messages${query}`);
+        if (!response.ok) return;
         const data = await response.json();
-        const loadedMessages: Message[] = data.messages.map((msg: any) => ({
+        loadedMessages.push(...data.messages.map((msg: any) => ({
           id: Date.now().toString() + Math.random(),
           role: msg.role === 'user' ? Role.User : Role.Assistant,
           content: msg.content,
           createdAt: new Date(msg.timestamp).getTime()
-        }));
-        setMessages(loadedMessages);
-      }
+        })));
+        cursor = data.next_cursor;
+      } while (cursor);
+      setMessages(loadedMessages);
     } catch (error) {
       console.error('Failed to load session messages:', error);
     }
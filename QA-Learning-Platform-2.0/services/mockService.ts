@@ -46,7 +46,9 @@ export const uploadFile = async (file: File): Promise<UploadFileResponse> => {
   const formData = new FormData();
   formData.append('file', file);
 
-  const response = await fetch(`${API_BASE_URL}/upload`, {
+  // Within a session, indexing starts right away in the session's vector store
+  const query = currentSessionId ? `?session_id=${encodeURIComponent(currentSessionId)}` : '';
+  const response = await fetch(`${API_BASE_URL}/upload${query}`, {
     method: 'POST',
     body: formData,
   });